@@ -0,0 +1,261 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Case, IntegerField, JSONField, OuterRef, Prefetch, Subquery, Value, When
+from django.db.models.functions import JSONObject
+from django.utils import timezone
+
+from .location_tree import get_location_tree
+from .models import Accommodation, AccommodationImage, LocalizeAccommodation
+from .partitioning import get_registry
+
+FALLBACK_LANGUAGE = 'en'
+
+# Django cache alias holding serialized payloads shared by every process
+DETAIL_CACHE_ALIAS = getattr(settings, 'ACCOMMODATION_DETAIL_CACHE', 'default')
+DETAIL_CACHE_TIMEOUT = getattr(settings, 'ACCOMMODATION_DETAIL_CACHE_TIMEOUT', 300)
+
+# The in-process tier only sees this process's invalidations, so its entries
+# are trusted for a few seconds before the shared cache is consulted again
+L1_SIZE = getattr(settings, 'ACCOMMODATION_DETAIL_L1_SIZE', 1024)
+L1_TTL = getattr(settings, 'ACCOMMODATION_DETAIL_L1_TTL', 5)
+
+
+def detail_language(language):
+    """
+    Language a payload is stored under: the requested one if it has a
+    partition, otherwise the fallback (its payload would be identical).
+    """
+    if language and language in get_registry().language_partitions:
+        return language
+    return FALLBACK_LANGUAGE
+
+
+def detail_queryset(language):
+    """
+    Published accommodations with their location joined and the localized
+    row in ``language`` (or the fallback) as a JSON subquery, so one query
+    covers all three. The ``language IN (...)`` condition prunes the
+    subquery to at most two partitions. Images are prefetched in a second query.
+    """
+    localized = (
+        LocalizeAccommodation.objects
+        .filter(accommodation=OuterRef('pk'), language__in=[language, FALLBACK_LANGUAGE])
+        .order_by(Case(When(language=language, then=Value(0)), default=Value(1), output_field=IntegerField()))
+        .values(row=JSONObject(language='language', description='description', policy='policy'))[:1]
+    )
+    images = AccommodationImage.objects.only(
+        'id', 'accommodation_id', 'image', 'width', 'height', 'variants', 'placeholder'
+    ).order_by('id')
+    return (
+        Accommodation.objects
+        .filter(published=True)
+        .select_related('location')
+        .defer('amenity_ids', 'location__center', 'location__path')
+        .annotate(localized_row=Subquery(localized, output_field=JSONField()))
+        .prefetch_related(Prefetch('accommodation_images', queryset=images))
+    )
+
+
+def _image_payload(image):
+    return {
+        'id': image.id,
+        'url': image.image.url if image.image else None,
+        'width': image.width,
+        'height': image.height,
+        'placeholder': image.placeholder or None,
+        'srcset': {image_format: image.srcset(image_format) for image_format in image.variants},
+    }
+
+
+def build_detail(accommodation_id, language):
+    """
+    Serializable payload of one published accommodation in ``language``, or
+    ``None``. The location chain comes from the in-memory Location tree.
+    """
+    tree = get_location_tree()
+    accommodation = next(iter(detail_queryset(language).filter(pk=accommodation_id)[:1]), None)
+    if accommodation is None:
+        return None
+
+    location = accommodation.location
+    localized = accommodation.localized_row
+    chain = []
+    for location_id in tree.lineage(location.id):
+        node = tree.get(location_id)
+        chain.append({'id': location_id, 'title': node.title, 'location_type': node.location_type})
+
+    return {
+        'id': accommodation.id,
+        'feed': accommodation.feed,
+        'title': accommodation.title,
+        'country_code': accommodation.country_code,
+        'bedroom_count': accommodation.bedroom_count,
+        'review_score': str(accommodation.review_score),
+        'usd_rate': str(accommodation.usd_rate),
+        'latitude': accommodation.center.y,
+        'longitude': accommodation.center.x,
+        'amenities': accommodation.amenities,
+        'updated_at': accommodation.updated_at.isoformat(),
+        'location': {
+            'id': location.id,
+            'title': location.title,
+            'location_type': location.location_type,
+            'country_code': location.country_code,
+        },
+        'location_chain': chain,
+        'images': [_image_payload(image) for image in accommodation.accommodation_images.all()],
+        'language': language,
+        'localized': {
+            'language': localized['language'],
+            'description': localized['description'],
+            'policy': localized['policy'],
+            'fallback': localized['language'] != language,
+        } if localized else None,
+    }
+
+
+def make_etag(payload, tree_version):
+    """
+    Strong ETag from the accommodation's ``updated_at``, plus the Location tree
+    version (the location chain) and the language of the representation.
+    """
+    updated_at = datetime.fromisoformat(payload['updated_at'])
+    return f'"{int(updated_at.timestamp() * 1_000_000):x}-{tree_version}-{payload["language"]}"'
+
+
+class LocalLRU:
+    """
+    Small thread-safe LRU of ``key -> (expires_at, value)``.
+    """
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def discard(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_local = LocalLRU(L1_SIZE, L1_TTL)
+
+# Bumped by set-based writes that cannot name the accommodations they touched
+GENERATION_KEY = 'accommodation-detail:generation'
+
+
+def _cache_key(generation, tree_version, accommodation_id, language):
+    return f"accommodation-detail:{generation}:{tree_version}:{accommodation_id}:{language}"
+
+
+def get_detail(accommodation_id, language):
+    """
+    ``(payload, etag)`` for an accommodation, or ``(None, None)``, served from
+    the in-process LRU, then the shared cache, then the database.
+    """
+    shared = caches[DETAIL_CACHE_ALIAS]
+    language = detail_language(language)
+    tree_version = get_location_tree().version
+    local_key = (tree_version, accommodation_id, language)
+
+    cached = _local.get(local_key)
+    if cached is None:
+        key = _cache_key(shared.get(GENERATION_KEY, 0), tree_version, accommodation_id, language)
+        cached = shared.get(key)
+        if cached is None:
+            payload = build_detail(accommodation_id, language)
+            if payload is None:
+                return None, None
+            cached = (payload, make_etag(payload, tree_version))
+            shared.set(key, cached, DETAIL_CACHE_TIMEOUT)
+        _local.put(local_key, cached)
+    return cached
+
+
+def _discard(accommodation_ids):
+    shared = caches[DETAIL_CACHE_ALIAS]
+    generation = shared.get(GENERATION_KEY, 0)
+    tree_version = get_location_tree().version
+    languages = set(get_registry().language_partitions) | {FALLBACK_LANGUAGE}
+    entries = [
+        (accommodation_id, language)
+        for accommodation_id in accommodation_ids
+        for language in languages
+    ]
+    _local.discard([(tree_version, accommodation_id, language) for accommodation_id, language in entries])
+    shared.delete_many([
+        _cache_key(generation, tree_version, accommodation_id, language)
+        for accommodation_id, language in entries
+    ])
+
+
+def invalidate_detail(*accommodation_ids):
+    """
+    Drop cached payloads of these accommodations in every language, now and
+    again after commit so a concurrent reader cannot re-cache the old rows.
+    """
+    _discard(accommodation_ids)
+    transaction.on_commit(lambda: _discard(accommodation_ids))
+
+
+def touch_accommodation(accommodation_id):
+    """
+    Advance ``updated_at`` (and so the ETag) after a change to an image or
+    localized row, and drop the cached payloads.
+    """
+    Accommodation.objects.filter(pk=accommodation_id).update(updated_at=timezone.now())
+    invalidate_detail(accommodation_id)
+
+
+def bump_detail_generation():
+    """
+    Invalidate every cached payload at once, e.g. after a bulk update or a
+    feed ingestion. Other processes' in-process entries expire within ``L1_TTL``.
+    """
+    shared = caches[DETAIL_CACHE_ALIAS]
+    shared.add(GENERATION_KEY, 0, None)
+    try:
+        shared.incr(GENERATION_KEY)
+    except ValueError:
+        # Evicted between add() and incr()
+        shared.set(GENERATION_KEY, 1, None)
+    _local.clear()
+
+
+def clear_detail_cache():
+    """
+    Empty this process's tier; shared entries are keyed by the Location tree
+    version and generation, or expire after ``DETAIL_CACHE_TIMEOUT``.
+    """
+    _local.clear()
@@ -1,12 +1,23 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.views.main import ChangeList
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import render
+from django.urls import path, reverse
+from django.utils.html import format_html
 from leaflet.admin import LeafletGeoAdmin
-from .models import Location, Accommodation, AccommodationImage, LocalizeAccommodation
+from .models import Location, Accommodation, AccommodationImage, BulkJob, LocalizeAccommodation
 from import_export.admin import ImportExportModelAdmin
-from .resources import LocationResource
+from .bulk_actions import apply_bulk_update, start_bulk_job
+from .forms import ReassignUserForm
+from .pagination import EstimatedCountPaginator
+from .permissions import get_permission_context
+from .resources import BulkLocationResource, LocationResource
+from .search import search_localized
 
 @admin.register(Location)
 class LocationAdmin(ImportExportModelAdmin, LeafletGeoAdmin):
-    resource_class = LocationResource
+    resource_classes = [LocationResource, BulkLocationResource]
     list_display = ('id', 'title', 'location_type', 'country_code', 'parent', 'created_at')
     search_fields = ('title', 'country_code', 'state_abbr', 'city')
     list_filter = ('location_type', 'country_code')
@@ -20,35 +31,109 @@ class AccommodationImageInline(admin.TabularInline):
     fields = ('image',)  # Fields to display in the inline
     readonly_fields = ('uploaded_at',)
 
+class LocationAutocompleteFilter(admin.SimpleListFilter):
+    """
+    Location filter backed by the admin autocomplete view, so the sidebar
+    never renders the whole Location table; only the selected one is loaded.
+    """
+    title = 'location'
+    parameter_name = 'location__id__exact'
+    template = 'admin/properties/location_autocomplete_filter.html'
+
+    def lookups(self, request, model_admin):
+        location = Location.objects.filter(pk=self.value()).only('id', 'title', 'location_type').first() if self.value() else None
+        return [(location.pk, str(location))] if location else []
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(location_id=self.value())
+        return queryset
+
+
+class AccommodationChangeList(ChangeList):
+    """
+    Changelist that skips loading the geometry columns it never displays.
+    """
+    def get_queryset(self, request, exclude_parameters=None):
+        return super().get_queryset(request, exclude_parameters).defer('center', 'location__center')
+
+
 @admin.register(Accommodation)
 class AccommodationAdmin(LeafletGeoAdmin):
-    list_display = ('id', 'title', 'country_code', 'bedroom_count', 'review_score', 'usd_rate', 'center', 'location', 'published', 'created_at', 'updated_at')
-    list_filter = ('published', 'location')
+    list_display = ('id', 'title', 'country_code', 'bedroom_count', 'review_score', 'usd_rate', 'location_display', 'published', 'created_at', 'updated_at')
+    list_filter = ('published', LocationAutocompleteFilter)
     search_fields = ('title', 'country_code', 'location__title')
+    autocomplete_fields = ('location',)
     ordering = ('-created_at',)
     inlines = [AccommodationImageInline]
+    actions = ['publish', 'unpublish', 'reassign_user']
+    # Exact counts over every feed partition are too slow at this size
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    change_list_template = 'admin/properties/accommodation/change_list.html'
+
+    class Media:
+        js = (
+            'admin/js/vendor/jquery/jquery.js',
+            'admin/js/vendor/select2/select2.full.js',
+            'admin/js/jquery.init.js',
+            'admin/js/autocomplete.js',
+            'properties/js/location_autocomplete_filter.js',
+        )
+        css = {
+            'screen': (
+                'admin/css/vendor/select2/select2.css',
+                'admin/css/autocomplete.css',
+            ),
+        }
 
     settings_overrides = {
         'DEFAULT_CENTER': (0, 0),
         'DEFAULT_ZOOM': 6,
     }
 
+    @admin.display(description="Location", ordering='location__title')
+    def location_display(self, obj):
+        return obj.location_label()
+
+    def get_changelist(self, request, **kwargs):
+        return AccommodationChangeList
+
+    def get_urls(self):
+        urls = [
+            path('map/', self.admin_site.admin_view(self.map_view), name='properties_accommodation_map'),
+        ]
+        return urls + super().get_urls()
+
+    def map_view(self, request):
+        """
+        Overview map of all published accommodations, drawn from vector tiles.
+        """
+        if not self.has_view_or_change_permission(request):
+            raise PermissionDenied
+        return render(request, 'admin/properties/accommodation/map.html', {
+            **self.admin_site.each_context(request),
+            'title': "Accommodation map",
+            'opts': self.model._meta,
+        })
+
     def get_queryset(self, request):
         """
         Limit queryset to show only accommodations created by the logged-in user for Property Owners,
         but allow superusers to see all accommodations.
         """
         qs = super().get_queryset(request)
-        if not request.user.is_superuser and request.user.groups.filter(name='Property Owners').exists():
-            return qs.filter(user_id=request.user)
-        return qs
+        return get_permission_context(request).scope(qs)
 
     def save_model(self, request, obj, form, change):
         """
         Automatically assign the logged-in user as the creator if not set.
         """
         if not obj.user_id:
-            obj.user_id = request.user
+            obj.user = request.user
         super().save_model(request, obj, form, change)
 
     def has_change_permission(self, request, obj=None):
@@ -56,9 +141,10 @@ class AccommodationAdmin(LeafletGeoAdmin):
         Allow Property Owner users to edit only their own accommodations,
         but allow superusers to edit any accommodation.
         """
-        if request.user.is_superuser:
+        context = get_permission_context(request)
+        if context.is_superuser:
             return True
-        if obj and obj.user_id != request.user:
+        if not context.can_modify(obj):
             return False
         return super().has_change_permission(request, obj)
     
@@ -80,23 +166,124 @@ class AccommodationAdmin(LeafletGeoAdmin):
         Allow Property Owner users to delete only their own accommodations,
         but allow superusers to delete any accommodation.
         """
-        if request.user.is_superuser:
+        context = get_permission_context(request)
+        if context.is_superuser:
             return True
-        if obj and obj.user_id != request.user:
+        if not context.can_modify(obj):
             return False
         return super().has_delete_permission(request, obj)
 
+    def delete_queryset(self, request, queryset):
+        """
+        Bulk delete action: drop rows the user may not delete from the
+        selection in one query instead of checking each object.
+        """
+        super().delete_queryset(request, get_permission_context(request).modifiable(queryset))
+
+    def _run_bulk_action(self, request, queryset, action, changes):
+        """
+        Apply ``changes`` with set-based UPDATEs. A hand-picked page of rows is
+        updated inline; "select all" over a filter becomes a background job.
+        """
+        queryset = get_permission_context(request).modifiable(queryset)
+        if request.POST.get('select_across') != '1':
+            updated = apply_bulk_update(queryset, changes)
+            self.message_user(request, f"{updated} accommodations updated.", messages.SUCCESS)
+            return None
+
+        job = start_bulk_job(action, queryset, changes, request.user)
+        url = reverse('admin:properties_bulkjob_change', args=[job.pk])
+        self.message_user(
+            request,
+            format_html('Queued <a href="{}">bulk job #{}</a>; the bulk job worker runs it in the background.', url, job.pk),
+            messages.INFO,
+        )
+        return None
+
+    @admin.action(description="Publish selected accommodations", permissions=['change'])
+    def publish(self, request, queryset):
+        return self._run_bulk_action(request, queryset, 'publish', {'published': True})
+
+    @admin.action(description="Unpublish selected accommodations", permissions=['change'])
+    def unpublish(self, request, queryset):
+        return self._run_bulk_action(request, queryset, 'unpublish', {'published': False})
+
+    @admin.action(description="Reassign selected accommodations to another user", permissions=['reassign'])
+    def reassign_user(self, request, queryset):
+        form = ReassignUserForm(request.POST if 'apply' in request.POST else None)
+        if form.is_valid():
+            changes = {'user_id': form.cleaned_data['user'].pk}
+            return self._run_bulk_action(request, queryset, 'reassign_user', changes)
+
+        # Re-post the selection (or the select-across flag) with the chosen user
+        return render(request, 'admin/properties/accommodation/reassign_user.html', {
+            **self.admin_site.each_context(request),
+            'title': "Reassign accommodations",
+            'opts': self.model._meta,
+            'form': form,
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across', '0'),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        })
+
+    def has_reassign_permission(self, request):
+        """
+        Only superusers may hand accommodations to another owner.
+        """
+        return get_permission_context(request).is_superuser
+
+
+@admin.register(BulkJob)
+class BulkJobAdmin(admin.ModelAdmin):
+    """
+    Read-only progress view of background bulk actions.
+    """
+    list_display = ('id', 'action', 'status', 'progress_display', 'rows_updated', 'attempts', 'created_by',
+                    'created_at', 'finished_at')
+    list_filter = ('status', 'action')
+    list_select_related = ('created_by',)
+    readonly_fields = ('action', 'changes', 'status', 'progress_display', 'partitions_total', 'partitions_done',
+                       'rows_updated', 'attempts', 'error', 'created_by', 'created_at', 'started_at', 'finished_at')
+
+    @admin.display(description="Progress")
+    def progress_display(self, obj):
+        return f"{obj.progress:.0%} ({obj.partitions_done}/{obj.partitions_total} partitions)"
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if get_permission_context(request).is_superuser:
+            return qs
+        return qs.filter(created_by=request.user)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 
 @admin.register(AccommodationImage)
 class AccommodationImageAdmin(admin.ModelAdmin):
     """
     Admin interface for the AccommodationImage model.
     """
-    list_display = ('accommodation', 'image', 'uploaded_at')
+    list_display = ('accommodation', 'image', 'width', 'height', 'processed_at', 'uploaded_at')
+    list_select_related = ('accommodation',)
+    readonly_fields = ('width', 'height', 'variants', 'processed_at')
     search_fields = ('accommodation__title',)
 
 @admin.register(LocalizeAccommodation)
 class LocalizeAccommodationAdmin(admin.ModelAdmin):
     list_display = ('id', 'accommodation', 'language', 'description')
     list_filter = ('language',)
-    search_fields = ('description', 'language')
+    search_fields = ('description',)
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Match descriptions through the indexed ``search_vector`` instead of
+        ``ILIKE`` over every partition; a language filter prunes to its partition.
+        """
+        if not search_term.strip():
+            return queryset, False
+        language = request.GET.get('language__exact')
+        return search_localized(search_term, language=language, queryset=queryset), False
@@ -0,0 +1,224 @@
+import logging
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .accommodation_detail import bump_detail_generation
+from .facets import refresh_feed_rollups
+from .models import Accommodation, BulkJob
+from .partitioning import get_registry
+from .tiles import get_tile_cache
+
+logger = logging.getLogger(__name__)
+
+# Columns an admin bulk action may write
+BULK_COLUMNS = ('published', 'user_id')
+
+# Jobs a worker may pick up; "running" ones whose worker is gone are resumed
+RUNNABLE_STATUSES = ('pending', 'running')
+
+
+def feed_partition_bounds():
+    """
+    One ``(label, condition, params)`` per feed partition, the conditions
+    matching exactly the rows stored in that partition so the planner prunes
+    every other one. The last entry covers the default partition.
+    """
+    ranges = get_registry().feed_ranges
+    bounds = [
+        (table, "a.feed >= %s AND a.feed < %s", [lower, upper])
+        for lower, upper, table in ranges
+    ]
+    if ranges:
+        outside = ' OR '.join("(a.feed >= %s AND a.feed < %s)" for _ in ranges)
+        params = [bound for lower, upper, _ in ranges for bound in (lower, upper)]
+        bounds.append(('default', f"NOT ({outside})", params))
+    else:
+        bounds.append(('default', "TRUE", []))
+    return bounds
+
+
+def selection_partition_bounds(selection):
+    """
+    Bounds of the feed partitions holding rows of a stored ``{feed: [ids]}``
+    selection, as ``(label, condition, params, selection_sql, selection_params)``
+    with only that partition's ids, so a job never touches other partitions.
+    """
+    ranges = get_registry().feed_ranges
+    grouped = {}
+    for feed, ids in selection.items():
+        feed = int(feed)
+        label = next((table for lower, upper, table in ranges if lower <= feed < upper), 'default')
+        pair_ids, pair_feeds = grouped.setdefault(label, ([], []))
+        pair_ids.extend(ids)
+        pair_feeds.extend([feed] * len(ids))
+    return [
+        (label, condition, params,
+         "SELECT * FROM unnest(%s::text[], %s::smallint[])", list(grouped[label]))
+        for label, condition, params in feed_partition_bounds()
+        if label in grouped
+    ]
+
+
+def update_partition(selection, selection_params, changes, condition, condition_params):
+    """
+    Apply ``changes`` to the ``(id, feed)`` pairs returned by the ``selection``
+    SQL inside one partition with a single UPDATE, skipping rows that already
+    hold the values. Returns ``{feed: rows_updated}``.
+    """
+    unknown = set(changes) - set(BULK_COLUMNS)
+    if unknown:
+        raise ValueError(f"Cannot bulk update {', '.join(sorted(unknown))}.")
+
+    columns = sorted(changes)
+    assignments = ', '.join(f"{column} = %s" for column in columns)
+    changed = ' OR '.join(f"a.{column} IS DISTINCT FROM %s" for column in columns)
+    values = [changes[column] for column in columns]
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH updated AS (
+                UPDATE {Accommodation._meta.db_table} AS a
+                SET {assignments}, updated_at = now()
+                WHERE {condition}
+                  AND (a.id, a.feed) IN ({selection})
+                  AND ({changed})
+                RETURNING a.feed
+            )
+            SELECT feed, count(*) FROM updated GROUP BY feed
+            """,
+            [*values, *condition_params, *selection_params, *values],
+        )
+        return dict(cursor.fetchall())
+
+
+def update_partitions(partitions, changes, job=None):
+    """
+    Run ``update_partition`` for each ``(label, condition, params,
+    selection_sql, selection_params)`` entry, each in its own transaction so
+    locks are short and progress is visible. Facet rollups of touched feeds,
+    map tiles and cached detail pages are refreshed when ``published``
+    changes. Returns the number of rows updated.
+    """
+    if job is not None:
+        BulkJob.objects.filter(pk=job.pk).update(partitions_total=len(partitions))
+
+    total = 0
+    for label, condition, params, selection, selection_params in partitions:
+        with transaction.atomic():
+            updated = update_partition(selection, selection_params, changes, condition, params)
+            if 'published' in changes:
+                for feed in updated:
+                    refresh_feed_rollups(feed)
+        rows = sum(updated.values())
+        total += rows
+        if job is not None:
+            BulkJob.objects.filter(pk=job.pk).update(
+                partitions_done=F('partitions_done') + 1,
+                rows_updated=F('rows_updated') + rows,
+            )
+        logger.info("Bulk update %s: %d rows in partition %s.", changes, rows, label)
+
+    if 'published' in changes and total:
+        # Map tiles and detail pages only show published accommodations
+        get_tile_cache().clear()
+        bump_detail_generation()
+    return total
+
+
+def apply_bulk_update(queryset, changes, job=None):
+    """
+    Update every row of ``queryset`` with one statement per feed partition.
+    Returns the number of rows updated.
+    """
+    selection, selection_params = queryset.order_by().values_list('id', 'feed').query.sql_with_params()
+    partitions = [
+        (label, condition, params, selection, selection_params)
+        for label, condition, params in feed_partition_bounds()
+    ]
+    return update_partitions(partitions, changes, job=job)
+
+
+def stored_selection(queryset):
+    """
+    The ``(id, feed)`` pairs of ``queryset`` as ``{feed: [ids]}``, grouped in
+    the database in one query.
+    """
+    sql, params = queryset.order_by().values_list('id', 'feed').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT s.feed, array_agg(s.id ORDER BY s.id) FROM ({sql}) AS s (id, feed) GROUP BY s.feed",
+            params,
+        )
+        return {str(feed): ids for feed, ids in cursor.fetchall()}
+
+
+def _job_lock(job_id, acquire):
+    """
+    Take or release the session-level advisory lock marking a job as owned by
+    a live worker; it is released automatically if the worker dies.
+    """
+    function = 'pg_try_advisory_lock' if acquire else 'pg_advisory_unlock'
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {function}(hashtext(%s))", [f"bulk-job:{job_id}"])
+        return cursor.fetchone()[0]
+
+
+def run_bulk_job(job):
+    """
+    Run the job and record its outcome. Each partition commits on its own and
+    skips rows already holding the values, so an interrupted job is simply
+    run again from the first partition.
+    """
+    BulkJob.objects.filter(pk=job.pk).update(
+        status='running', started_at=timezone.now(), attempts=F('attempts') + 1, partitions_done=0,
+    )
+    try:
+        if job.selection is None:
+            raise ValueError("The job has no stored selection.")
+        update_partitions(selection_partition_bounds(job.selection), job.changes, job=job)
+        BulkJob.objects.filter(pk=job.pk).update(status='done', finished_at=timezone.now())
+    except Exception as exc:
+        logger.exception("Bulk job %s failed.", job.pk)
+        BulkJob.objects.filter(pk=job.pk).update(status='failed', error=str(exc), finished_at=timezone.now())
+
+
+def run_pending_jobs():
+    """
+    Run every pending job, and every running job whose worker is gone, oldest
+    first. Jobs locked by another live worker are skipped.
+    Returns the number of jobs run.
+    """
+    ran = 0
+    job_ids = BulkJob.objects.filter(status__in=RUNNABLE_STATUSES).order_by('created_at').values_list('pk', flat=True)
+    for job_id in list(job_ids):
+        if not _job_lock(job_id, acquire=True):
+            continue
+        try:
+            # Another worker may have finished it before we got the lock
+            job = BulkJob.objects.filter(pk=job_id, status__in=RUNNABLE_STATUSES).first()
+            if job is None:
+                continue
+            if job.status == 'running':
+                logger.warning("Resuming bulk job %s; its worker stopped.", job_id)
+            run_bulk_job(job)
+            ran += 1
+        finally:
+            _job_lock(job_id, acquire=False)
+    return ran
+
+
+def start_bulk_job(action, queryset, changes, user):
+    """
+    Record a job with the ids it selects for the ``run_bulk_jobs`` worker;
+    ``queryset`` must already be narrowed to what ``user`` may modify.
+    Returns the job.
+    """
+    return BulkJob.objects.create(
+        action=action,
+        changes=changes,
+        selection=stored_selection(queryset),
+        created_by=user,
+    )
@@ -0,0 +1,163 @@
+import csv
+import io
+import json
+import zlib
+
+from django.db.models import Prefetch
+
+from .models import Accommodation, LocalizeAccommodation
+
+EXPORT_FORMATS = ('csv', 'jsonl', 'geojson')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'geojson': 'application/geo+json',
+}
+
+CSV_COLUMNS = (
+    'id', 'feed', 'title', 'country_code', 'bedroom_count', 'review_score', 'usd_rate',
+    'longitude', 'latitude', 'amenities', 'published', 'created_at', 'updated_at',
+    'location_id', 'location_title', 'location_type', 'localized',
+)
+
+# Encoded text is handed out in pieces of roughly this size
+BUFFER_SIZE = 64 * 1024
+
+
+def export_queryset(feed=None, country_code=None, published_only=False):
+    """
+    Accommodations with their location joined and localized rows prefetched
+    per iterator chunk, in a stable order.
+    """
+    queryset = (
+        Accommodation.objects
+        .select_related('location')
+        .defer('location__center', 'location__path', 'amenity_ids')
+        .prefetch_related(Prefetch(
+            'localized',
+            queryset=LocalizeAccommodation.objects.only('accommodation_id', 'language', 'description', 'policy'),
+        ))
+        .order_by('id')
+    )
+    if feed is not None:
+        queryset = queryset.filter(feed=feed)
+    if country_code:
+        queryset = queryset.filter(country_code=country_code.upper())
+    if published_only:
+        queryset = queryset.filter(published=True)
+    return queryset
+
+
+def export_record(accommodation):
+    """
+    Plain JSON-serializable dict of one accommodation, its location and
+    localized rows.
+    """
+    location = accommodation.location
+    return {
+        'id': accommodation.id,
+        'feed': accommodation.feed,
+        'title': accommodation.title,
+        'country_code': accommodation.country_code,
+        'bedroom_count': accommodation.bedroom_count,
+        'review_score': str(accommodation.review_score),
+        'usd_rate': str(accommodation.usd_rate),
+        'center': [accommodation.center.x, accommodation.center.y] if accommodation.center else None,
+        'amenities': accommodation.amenities,
+        'published': accommodation.published,
+        'created_at': accommodation.created_at.isoformat(),
+        'updated_at': accommodation.updated_at.isoformat(),
+        'location': {
+            'id': location.id,
+            'title': location.title,
+            'location_type': location.location_type,
+            'country_code': location.country_code,
+        } if location else None,
+        'localized': [
+            {'language': row.language, 'description': row.description, 'policy': row.policy}
+            for row in accommodation.localized.all()
+        ],
+    }
+
+
+def _csv_row(record):
+    location = record['location'] or {}
+    center = record['center'] or (None, None)
+    localized = {row['language']: {'description': row['description'], 'policy': row['policy']} for row in record['localized']}
+    return [
+        record['id'], record['feed'], record['title'], record['country_code'], record['bedroom_count'],
+        record['review_score'], record['usd_rate'], center[0], center[1],
+        json.dumps(record['amenities']) if record['amenities'] is not None else '',
+        't' if record['published'] else 'f', record['created_at'], record['updated_at'],
+        location.get('id', ''), location.get('title', ''), location.get('location_type', ''),
+        json.dumps(localized, ensure_ascii=False) if localized else '',
+    ]
+
+
+def _geojson_feature(record):
+    center = record.pop('center')
+    return {
+        'type': 'Feature',
+        'id': f"{record['feed']}:{record['id']}",
+        'geometry': {'type': 'Point', 'coordinates': center} if center else None,
+        'properties': record,
+    }
+
+
+def iter_export(queryset, export_format, chunk_size=2000):
+    """
+    Yield the encoded export as text pieces. Rows are read through a
+    server-side cursor ``chunk_size`` at a time, so memory stays flat.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{export_format}'.")
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if export_format == 'csv':
+        writer.writerow(CSV_COLUMNS)
+    elif export_format == 'geojson':
+        buffer.write('{"type": "FeatureCollection", "features": [\n')
+
+    first = True
+    for accommodation in queryset.iterator(chunk_size=chunk_size):
+        record = export_record(accommodation)
+        if export_format == 'csv':
+            writer.writerow(_csv_row(record))
+        elif export_format == 'jsonl':
+            buffer.write(json.dumps(record, ensure_ascii=False))
+            buffer.write('\n')
+        else:
+            if not first:
+                buffer.write(',\n')
+            buffer.write(json.dumps(_geojson_feature(record), ensure_ascii=False))
+        first = False
+
+        if buffer.tell() >= BUFFER_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if export_format == 'geojson':
+        buffer.write('\n]}\n')
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def encode_stream(chunks, compress=False):
+    """
+    UTF-8 encode text pieces, gzip-compressing them on the fly if asked.
+    """
+    if not compress:
+        for chunk in chunks:
+            yield chunk.encode('utf-8')
+        return
+
+    # wbits=31 writes a gzip header and trailer
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,182 @@
+from collections import Counter, defaultdict
+
+from django.db import connection, transaction
+from psycopg2.extras import execute_values
+
+from .models import Accommodation, AccommodationFacetRollup, Amenity
+
+FACETS = ('country', 'location', 'bedrooms', 'amenity')
+
+# Bedroom counts at or above this share one bucket
+BEDROOM_BUCKET_MAX = 5
+
+ACCOMMODATION_TABLE = Accommodation._meta.db_table
+ROLLUP_TABLE = AccommodationFacetRollup._meta.db_table
+
+# Live aggregate for one feed, in (feed, facet, key, count) form
+LIVE_AGGREGATE_SQL = f"""
+    SELECT feed, 'country' AS facet, country_code::text AS key, count(*) AS count
+    FROM {ACCOMMODATION_TABLE} WHERE published AND feed = %(feed)s
+    GROUP BY feed, country_code
+  UNION ALL
+    SELECT feed, 'location', location_id::text, count(*)
+    FROM {ACCOMMODATION_TABLE} WHERE published AND feed = %(feed)s
+    GROUP BY feed, location_id
+  UNION ALL
+    SELECT feed, 'bedrooms',
+           CASE WHEN bedroom_count >= {BEDROOM_BUCKET_MAX} THEN '{BEDROOM_BUCKET_MAX}+' ELSE bedroom_count::text END,
+           count(*)
+    FROM {ACCOMMODATION_TABLE} WHERE published AND feed = %(feed)s
+    GROUP BY 1, 3
+  UNION ALL
+    SELECT feed, 'amenity', amenity_id::text, count(*)
+    FROM {ACCOMMODATION_TABLE}, unnest(amenity_ids) AS amenity_id
+    WHERE published AND feed = %(feed)s
+    GROUP BY feed, amenity_id
+"""
+
+
+def bedroom_bucket(bedroom_count):
+    return f"{BEDROOM_BUCKET_MAX}+" if bedroom_count >= BEDROOM_BUCKET_MAX else str(bedroom_count)
+
+
+def facet_keys(state):
+    """
+    ``(feed, facet, key)`` triples an accommodation contributes, given a dict
+    with ``feed``, ``published``, ``country_code``, ``location_id``,
+    ``bedroom_count`` and ``amenity_ids``. Unpublished rows contribute nothing.
+    """
+    if not state or not state['published']:
+        return []
+    feed = state['feed']
+    keys = [
+        (feed, 'country', state['country_code']),
+        (feed, 'location', state['location_id']),
+        (feed, 'bedrooms', bedroom_bucket(state['bedroom_count'])),
+    ]
+    keys.extend((feed, 'amenity', str(amenity_id)) for amenity_id in set(state['amenity_ids'] or ()))
+    return keys
+
+
+def facet_state(accommodation):
+    return {
+        'feed': accommodation.feed,
+        'published': accommodation.published,
+        'country_code': accommodation.country_code,
+        'location_id': accommodation.location_id,
+        'bedroom_count': accommodation.bedroom_count,
+        'amenity_ids': accommodation.amenity_ids,
+    }
+
+
+def stored_facet_state(accommodation):
+    """
+    The row as currently stored, or ``None`` for a new accommodation.
+    Also carries ``center`` so map tiles at the old position can be dropped.
+    """
+    # Ids are only unique within a feed; the feed also prunes to one partition
+    return (
+        Accommodation.objects
+        .filter(pk=accommodation.pk, feed=accommodation.feed)
+        .values('feed', 'published', 'country_code', 'location_id', 'bedroom_count', 'amenity_ids', 'center')
+        .first()
+    )
+
+
+def apply_delta(old_state, new_state):
+    """
+    Incrementally adjust the rollups for a single changed row; either state
+    may be ``None`` (insert or delete).
+    """
+    delta = Counter()
+    for key in facet_keys(old_state):
+        delta[key] -= 1
+    for key in facet_keys(new_state):
+        delta[key] += 1
+    changes = [key + (count,) for key, count in delta.items() if count]
+    if not changes:
+        return
+
+    with connection.cursor() as cursor:
+        execute_values(
+            cursor.cursor,
+            f"""
+            INSERT INTO {ROLLUP_TABLE} AS r (feed, facet, key, count) VALUES %s
+            ON CONFLICT (feed, facet, key) DO UPDATE SET count = r.count + EXCLUDED.count
+            """,
+            changes,
+        )
+        cursor.execute(
+            f"DELETE FROM {ROLLUP_TABLE} WHERE feed = ANY(%s) AND count <= 0",
+            [sorted({feed for feed, _, _, _ in changes})],
+        )
+
+
+def refresh_feed_rollups(feed):
+    """
+    Recompute one feed's rollups from its (partition-pruned) live rows.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {ROLLUP_TABLE} WHERE feed = %s", [feed])
+        cursor.execute(
+            f"INSERT INTO {ROLLUP_TABLE} (feed, facet, key, count) {LIVE_AGGREGATE_SQL}",
+            {'feed': feed},
+        )
+        return cursor.rowcount
+
+
+def rollup_mismatches(feed):
+    """
+    Compare one feed's rollups with a live aggregate. Returns
+    ``[(facet, key, live_count, rollup_count), ...]`` for every difference.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH live AS ({LIVE_AGGREGATE_SQL}),
+                 rolled AS (SELECT facet, key, count FROM {ROLLUP_TABLE} WHERE feed = %(feed)s)
+            SELECT COALESCE(live.facet, rolled.facet), COALESCE(live.key, rolled.key), live.count, rolled.count
+            FROM live
+            FULL OUTER JOIN rolled ON rolled.facet = live.facet AND rolled.key = live.key
+            WHERE live.count IS DISTINCT FROM rolled.count
+            ORDER BY 1, 2
+            """,
+            {'feed': feed},
+        )
+        return cursor.fetchall()
+
+
+def facet_counts(facets=FACETS, feeds=None, limit=100):
+    """
+    Facet counts summed over feeds, read from the rollups only. The top
+    ``limit`` keys per facet are picked in SQL with a window function.
+    Returns ``{facet: {key: count}}`` with amenity ids resolved to names.
+    """
+    feed_condition = 'AND feed = ANY(%(feeds)s)' if feeds else ''
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT facet, key, total FROM (
+                SELECT facet, key, SUM(count) AS total,
+                       row_number() OVER (PARTITION BY facet ORDER BY SUM(count) DESC, key) AS rank
+                FROM {ROLLUP_TABLE}
+                WHERE facet = ANY(%(facets)s) AND count > 0 {feed_condition}
+                GROUP BY facet, key
+            ) ranked
+            WHERE rank <= %(limit)s
+            ORDER BY facet, rank
+            """,
+            {'facets': list(facets), 'feeds': list(feeds or ()), 'limit': limit},
+        )
+        rows = cursor.fetchall()
+
+    result = defaultdict(dict)
+    for facet, key, total in rows:
+        result[facet][key] = total
+
+    if 'amenity' in result:
+        names = Amenity.objects.names_for([int(key) for key in result['amenity']])
+        result['amenity'] = {
+            names.get(int(key), key): total for key, total in result['amenity'].items()
+        }
+    return {facet: result.get(facet, {}) for facet in facets}
@@ -50,3 +50,9 @@ class SignUpForm(forms.ModelForm):
         if commit:
             user.save()
         return user
+
+class ReassignUserForm(forms.Form):
+    """
+    Intermediate form of the "reassign user" admin action.
+    """
+    user = forms.ModelChoiceField(queryset=User.objects.order_by('username'), label="New owner")
@@ -0,0 +1,69 @@
+import math
+
+from django.contrib.gis.db.models.functions import GeometryDistance
+from django.contrib.gis.geos import Point, Polygon
+from django.contrib.gis.measure import D
+
+from .models import Accommodation
+
+# Meters per degree of latitude
+METERS_PER_DEGREE = 111_320
+
+# Keyset orderings per search mode
+ID_ORDERING = (('id', False), ('feed', False))
+NEAREST_ORDERING = (('distance', False), ('id', False), ('feed', False))
+
+LIST_FIELDS = (
+    'id', 'feed', 'title', 'country_code', 'bedroom_count', 'review_score',
+    'usd_rate', 'center', 'location',
+)
+
+
+def published_accommodations():
+    return Accommodation.objects.filter(published=True).only(*LIST_FIELDS)
+
+
+def radius_envelope(lat, lng, radius):
+    """
+    Bounding box (in degrees) that contains the circle, used as an indexable
+    ``&&`` prefilter before the exact spherical distance check.
+    """
+    dlat = radius / METERS_PER_DEGREE
+    dlng = radius / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+    return Polygon.from_bbox((
+        max(lng - dlng, -180), max(lat - dlat, -90),
+        min(lng + dlng, 180), min(lat + dlat, 90),
+    ))
+
+
+def within_radius(queryset, lat, lng, radius):
+    point = Point(lng, lat, srid=4326)
+    envelope = radius_envelope(lat, lng, radius)
+    envelope.srid = 4326
+    return queryset.filter(center__bboverlaps=envelope).filter(center__distance_lte=(point, D(m=radius)))
+
+
+def within_bbox(queryset, bbox):
+    polygon = Polygon.from_bbox(bbox)
+    polygon.srid = 4326
+    return queryset.filter(center__bboverlaps=polygon).filter(center__intersects=polygon)
+
+
+def nearest(queryset, lat, lng):
+    """
+    Annotate the ``<->`` distance so ordering by it uses the GiST index (K-NN).
+    """
+    return queryset.annotate(distance=GeometryDistance('center', Point(lng, lat, srid=4326)))
+
+
+def geo_search(params):
+    """
+    Return ``(queryset, ordering)`` for validated ``GeoSearchParamsSerializer`` data.
+    """
+    queryset = published_accommodations()
+    mode = params['mode']
+    if mode == 'radius':
+        return within_radius(queryset, params['lat'], params['lng'], params['radius']), ID_ORDERING
+    if mode == 'bbox':
+        return within_bbox(queryset, params['bbox']), ID_ORDERING
+    return nearest(queryset, params['lat'], params['lng']), NEAREST_ORDERING
@@ -0,0 +1,256 @@
+import atexit
+import base64
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.utils import timezone
+from PIL import Image, ImageFilter, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Target widths of the resized variants; never upscaled
+VARIANT_WIDTHS = tuple(getattr(settings, 'IMAGE_VARIANT_WIDTHS', (320, 640, 1280)))
+
+# (format key, Pillow format, extension, save options)
+VARIANT_FORMATS = (
+    ('webp', 'WEBP', 'webp', {'quality': 80, 'method': 4}),
+    ('jpeg', 'JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+
+PLACEHOLDER_WIDTH = 16
+
+# Source images larger than this are refused rather than decoded
+Image.MAX_IMAGE_PIXELS = getattr(settings, 'IMAGE_MAX_PIXELS', 80_000_000)
+
+
+def variant_name(name, width, extension):
+    """
+    Storage name of a variant, next to the original:
+    ``.../photo-1a2b3c4d.jpg`` -> ``.../photo-1a2b3c4d_640w.webp``.
+    """
+    stem = os.path.splitext(name)[0]
+    return f"{stem}_{width}w.{extension}"
+
+
+def _flatten(image):
+    """
+    JPEG has no alpha channel; composite transparent images onto white.
+    """
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def _encode(image, pillow_format, options):
+    buffer = io.BytesIO()
+    image.save(buffer, pillow_format, **options)
+    return buffer.getvalue()
+
+
+def placeholder_data_uri(image):
+    """
+    A blurred ~16px wide JPEG as a ``data:`` URI, a few hundred bytes.
+    """
+    thumbnail = _flatten(image)
+    thumbnail.thumbnail((PLACEHOLDER_WIDTH, PLACEHOLDER_WIDTH * 4))
+    thumbnail = thumbnail.filter(ImageFilter.GaussianBlur(1))
+    data = _encode(thumbnail, 'JPEG', {'quality': 40})
+    return "data:image/jpeg;base64," + base64.b64encode(data).decode('ascii')
+
+
+def render_variants(name):
+    """
+    Generate and store the variants of one stored image. CPU bound and free
+    of database access, so it can run in a worker process.
+
+    Returns ``{'width', 'height', 'variants', 'placeholder'}``.
+    """
+    with default_storage.open(name, 'rb') as fp:
+        image = Image.open(fp)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    width, height = image.size
+    widths = sorted({min(target, width) for target in VARIANT_WIDTHS})
+    sources = {
+        'JPEG': _flatten(image),
+        # WebP keeps transparency
+        'WEBP': image.convert('RGBA' if 'A' in image.getbands() else 'RGB'),
+    }
+    variants = {}
+    for key, pillow_format, extension, options in VARIANT_FORMATS:
+        source = sources[pillow_format]
+        for target in widths:
+            resized = source
+            if target < width:
+                resized = source.resize((target, max(1, round(height * target / width))), Image.LANCZOS)
+            output = variant_name(name, target, extension)
+            if default_storage.exists(output):
+                default_storage.delete(output)
+            variants.setdefault(key, {})[str(target)] = default_storage.save(
+                output, ContentFile(_encode(resized, pillow_format, options))
+            )
+
+    return {
+        'width': width,
+        'height': height,
+        'variants': variants,
+        'placeholder': placeholder_data_uri(image),
+    }
+
+
+def delete_variants(variants):
+    for names in (variants or {}).values():
+        for name in names.values():
+            default_storage.delete(name)
+
+
+def save_result(image_id, result):
+    """
+    Record a ``render_variants`` result on the image row.
+    """
+    from .accommodation_detail import touch_accommodation
+    from .models import AccommodationImage
+
+    updated = AccommodationImage.objects.filter(pk=image_id).update(processed_at=timezone.now(), **result)
+    # A queryset update sends no signals; cached detail pages list the variants
+    accommodation_id = AccommodationImage.objects.filter(pk=image_id).values_list('accommodation_id', flat=True).first()
+    if accommodation_id is not None:
+        touch_accommodation(accommodation_id)
+    return updated
+
+
+def reuse_processed_result(image):
+    """
+    Copy the variants of another row sharing the image's blob, if it has any.
+    Returns whether a result was reused.
+    """
+    from .models import AccommodationImage
+
+    if not image.blob_id:
+        return False
+    result = (
+        AccommodationImage.objects
+        .filter(blob_id=image.blob_id, processed_at__isnull=False)
+        .exclude(pk=image.pk)
+        .values('width', 'height', 'variants', 'placeholder')
+        .first()
+    )
+    if result is None:
+        return False
+    save_result(image.pk, result)
+    return True
+
+
+def process_image(image):
+    """
+    Process one AccommodationImage in the current process.
+    """
+    result = render_variants(image.image.name)
+    save_result(image.pk, result)
+    for field, value in result.items():
+        setattr(image, field, value)
+    return result
+
+
+def _init_worker():
+    """
+    Spawned (non-forked) workers need Django configured to use storage.
+    """
+    import django
+
+    django.setup()
+
+
+class ImageProcessor:
+    """
+    Process pool for image variants. Use as a context manager to own the
+    pool::
+
+        with ImageProcessor(workers=4) as processor:
+            for (image_id, name), result in processor.process_many(images):
+                ...
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = None
+
+    def __enter__(self):
+        # Forking a process that already runs threads (web server, DB
+        # connections, the pool's own manager) can copy held locks and deadlock
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+        )
+        return self
+
+    def __exit__(self, *exc_info):
+        self._executor.shutdown()
+        self._executor = None
+
+    def submit(self, name):
+        return self._executor.submit(render_variants, name)
+
+    def process_many(self, images):
+        """
+        Yield ``(image, result_or_exception)`` for ``(id, name)`` pairs, in order.
+        """
+        futures = [(image, self.submit(image[1])) for image in images]
+        for image, future in futures:
+            try:
+                yield image, future.result()
+            except Exception as exc:
+                yield image, exc
+
+
+_background = None
+_background_lock = threading.Lock()
+
+
+def _shutdown_background():
+    global _background
+    with _background_lock:
+        if _background is not None:
+            _background.__exit__(None, None, None)
+            _background = None
+
+
+def _background_processor():
+    global _background
+    with _background_lock:
+        if _background is None:
+            _background = ImageProcessor(workers=getattr(settings, 'IMAGE_PROCESSING_WORKERS', 2)).__enter__()
+            atexit.register(_shutdown_background)
+        return _background
+
+
+def _record_background_result(image_id, future):
+    try:
+        save_result(image_id, future.result())
+    except Exception:
+        logger.exception("Processing image %s failed.", image_id)
+    finally:
+        # Runs on the executor's callback thread, which owns its own connection
+        connection.close()
+
+
+def schedule_processing(image):
+    """
+    Render an image's variants in the background pool; the row is updated
+    when the worker finishes. Call after the upload has been committed.
+    """
+    future = _background_processor().submit(image.image.name)
+    future.add_done_callback(lambda done: _record_background_result(image.pk, done))
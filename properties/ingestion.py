@@ -0,0 +1,475 @@
+import csv
+import gzip
+import io
+import json
+import os
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.gis.gdal import GDALException
+from django.contrib.gis.geos import GEOSException, GEOSGeometry
+from django.core.exceptions import ValidationError
+
+from .location_resolver import get_city_index
+from .models import Accommodation, Amenity, validate_amenities
+
+# Columns of the staging table, in COPY order
+STAGING_COLUMNS = (
+    'line',
+    'id',
+    'feed',
+    'title',
+    'country_code',
+    'bedroom_count',
+    'review_score',
+    'usd_rate',
+    'center',
+    'amenities',
+    'user_id',
+    'location_id',
+    'published',
+)
+
+# Columns overwritten when an (id, feed) row already exists
+UPSERT_COLUMNS = (
+    'title',
+    'country_code',
+    'bedroom_count',
+    'review_score',
+    'usd_rate',
+    'center',
+    'amenities',
+    'user_id',
+    'location_id',
+    'published',
+    'amenity_ids',
+)
+
+STAGING_TABLE = 'accommodation_staging'
+# Nearest-city matches of staged rows that came without a location
+RESOLVED_TABLE = 'accommodation_staging_resolved'
+
+TRUE_VALUES = {'1', 'true', 't', 'yes', 'y'}
+FALSE_VALUES = {'0', 'false', 'f', 'no', 'n', ''}
+
+
+def open_feed(path):
+    """
+    Open a feed file for text reading, transparently handling ``.gz``.
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, 'r', encoding='utf-8', newline='')
+
+
+def detect_format(path):
+    name = path[:-3] if path.endswith('.gz') else path
+    extension = os.path.splitext(name)[1].lower()
+    if extension in ('.jsonl', '.ndjson', '.json'):
+        return 'jsonl'
+    if extension == '.csv':
+        return 'csv'
+    raise ValueError(f"Cannot infer feed format from '{path}'; pass it explicitly.")
+
+
+def iter_feed_rows(fp, file_format):
+    """
+    Yield ``(line_number, raw_dict)`` pairs from a JSONL or CSV stream
+    without reading the whole file into memory.
+    """
+    if file_format == 'jsonl':
+        for line_number, line in enumerate(fp, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield line_number, exc
+    elif file_format == 'csv':
+        # Line 1 is the header row
+        for line_number, row in enumerate(csv.DictReader(fp), start=2):
+            yield line_number, row
+    else:
+        raise ValueError(f"Unsupported feed format '{file_format}'.")
+
+
+def _required(raw, key):
+    value = raw.get(key)
+    if value is None or (isinstance(value, str) and not value.strip()):
+        raise ValidationError(f"'{key}' is required.")
+    return value.strip() if isinstance(value, str) else value
+
+
+def _string(raw, key, max_length):
+    value = str(_required(raw, key))
+    if len(value) > max_length:
+        raise ValidationError(f"'{key}' exceeds {max_length} characters.")
+    return value
+
+
+def _optional_string(raw, key, max_length):
+    value = raw.get(key)
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    return _string(raw, key, max_length)
+
+
+def _decimal(value, key, max_digits, decimal_places):
+    try:
+        number = Decimal(str(value))
+        # NaN survives quantize and NUMERIC would store it
+        if not number.is_finite():
+            raise ValueError(value)
+        number = number.quantize(Decimal(1).scaleb(-decimal_places))
+    except (InvalidOperation, ValueError):
+        raise ValidationError(f"'{key}' must be a number.")
+    if len(number.as_tuple().digits) > max_digits:
+        raise ValidationError(f"'{key}' has more than {max_digits} digits.")
+    return number
+
+
+def _point(longitude, latitude):
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValidationError("Coordinates are out of range.")
+    return f"SRID=4326;POINT({longitude!r} {latitude!r})"
+
+
+def _center(raw):
+    """
+    Return EWKT for the accommodation center from either ``center`` (a WKT/EWKT
+    point, transformed to WGS84 if given in another SRID) or
+    ``latitude``/``longitude`` columns.
+    """
+    center = raw.get('center')
+    if center:
+        try:
+            geometry = GEOSGeometry(str(center).strip())
+        except (GEOSException, TypeError, ValueError):
+            raise ValidationError("'center' is not valid WKT.")
+        if geometry.geom_type != 'Point' or geometry.empty:
+            raise ValidationError("'center' must be a point.")
+        if geometry.srid is None:
+            geometry.srid = 4326
+        elif geometry.srid != 4326:
+            try:
+                geometry.transform(4326)
+            except (GDALException, GEOSException):
+                raise ValidationError(f"'center' cannot be transformed from SRID {geometry.srid}.")
+        return _point(geometry.x, geometry.y)
+    try:
+        latitude = float(_required(raw, 'latitude'))
+        longitude = float(_required(raw, 'longitude'))
+    except (TypeError, ValueError):
+        raise ValidationError("'latitude' and 'longitude' must be numbers.")
+    return _point(longitude, latitude)
+
+
+def _amenities(raw):
+    amenities = raw.get('amenities')
+    if amenities in (None, ''):
+        return None
+    if isinstance(amenities, str):
+        try:
+            amenities = json.loads(amenities)
+        except json.JSONDecodeError:
+            raise ValidationError("'amenities' must be a JSON array.")
+    # Same rules as the model field validator
+    validate_amenities(amenities)
+    return json.dumps(amenities)
+
+
+def _boolean(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower() if value is not None else ''
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValidationError(f"'{value}' is not a boolean.")
+
+
+def clean_feed_row(raw, feed):
+    """
+    Validate one raw feed record and return its staging column values
+    (without the leading line number). Raises ``ValidationError``.
+    ``location_id`` may be omitted; the nearest city is resolved from the
+    coordinates after staging.
+    """
+    if not isinstance(raw, dict):
+        raise ValidationError("Row must be an object.")
+
+    bedroom_count = _required(raw, 'bedroom_count')
+    try:
+        bedroom_count = int(bedroom_count)
+    except (TypeError, ValueError):
+        raise ValidationError("'bedroom_count' must be an integer.")
+    if bedroom_count < 0:
+        raise ValidationError("'bedroom_count' must not be negative.")
+
+    review_score = raw.get('review_score')
+    review_score = _decimal(review_score, 'review_score', 3, 1) if review_score not in (None, '') else Decimal('0.0')
+
+    user_id = raw.get('user_id')
+    if user_id in (None, ''):
+        user_id = None
+    else:
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            raise ValidationError("'user_id' must be an integer.")
+
+    return (
+        _string(raw, 'id', 20),
+        feed,
+        _string(raw, 'title', 100),
+        _string(raw, 'country_code', 2).upper(),
+        bedroom_count,
+        review_score,
+        _decimal(_required(raw, 'usd_rate'), 'usd_rate', 10, 2),
+        _center(raw),
+        _amenities(raw),
+        user_id,
+        _optional_string(raw, 'location_id', 20),
+        _boolean(raw.get('published', False)),
+    )
+
+
+class CopyStream:
+    """
+    Minimal file-like object that renders rows to CSV on demand, so
+    ``COPY ... FROM STDIN`` can consume a generator of any length.
+    """
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        self._exhausted = False
+
+    def _encode(self, row):
+        return ['t' if value is True else 'f' if value is False else value for value in row]
+
+    def read(self, size=-1):
+        while not self._exhausted and (size < 0 or self._buffer.tell() < size):
+            row = next(self._rows, None)
+            if row is None:
+                self._exhausted = True
+                break
+            self._writer.writerow(self._encode(row))
+
+        data = self._buffer.getvalue()
+        if size < 0:
+            chunk, rest = data, ''
+        else:
+            chunk, rest = data[:size], data[size:]
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._buffer.write(rest)
+        return chunk
+
+
+class FeedIngestor:
+    """
+    Streams validated feed rows into a temporary staging table with COPY,
+    then merges them into ``properties_accommodation`` in one upsert.
+
+    Must be used inside a transaction: the staging table is dropped on commit.
+    """
+
+    def __init__(self, cursor, feed, max_errors=None):
+        self.cursor = cursor
+        self.feed = feed
+        self.max_errors = max_errors
+        self.errors = []
+        self.rejected = 0
+        self.staged = 0
+
+    def create_staging_table(self):
+        # A previous run in the same (outer) transaction may have left one behind
+        self.cursor.execute(f"DROP TABLE IF EXISTS pg_temp.{STAGING_TABLE}")
+        self.cursor.execute(
+            f"""
+            CREATE TEMP TABLE {STAGING_TABLE} (
+                line BIGINT NOT NULL,
+                id VARCHAR(20) NOT NULL,
+                feed SMALLINT NOT NULL,
+                title VARCHAR(100) NOT NULL,
+                country_code CHAR(2) NOT NULL,
+                bedroom_count INTEGER NOT NULL,
+                review_score NUMERIC(3, 1) NOT NULL,
+                usd_rate NUMERIC(10, 2) NOT NULL,
+                center GEOMETRY(Point, 4326) NOT NULL,
+                amenities JSONB,
+                user_id INTEGER,
+                location_id VARCHAR(20),
+                published BOOLEAN NOT NULL,
+                amenity_ids INTEGER[] NOT NULL DEFAULT '{{}}'
+            ) ON COMMIT DROP
+            """
+        )
+
+    def clean_rows(self, records):
+        """
+        Validate ``(line_number, raw)`` records, yielding staging rows and
+        collecting errors for the rest.
+        """
+        for line_number, raw in records:
+            try:
+                if isinstance(raw, Exception):
+                    raise ValidationError(f"Invalid JSON: {raw}")
+                row = clean_feed_row(raw, self.feed)
+            except ValidationError as exc:
+                self.rejected += 1
+                self.errors.append((line_number, '; '.join(exc.messages)))
+                if self.max_errors is not None and self.rejected > self.max_errors:
+                    raise ValidationError(f"Aborting: more than {self.max_errors} invalid rows.")
+                continue
+            self.staged += 1
+            yield (line_number,) + row
+
+    def copy_rows(self, records):
+        """
+        COPY the validated records into the staging table.
+        """
+        self.cursor.copy_expert(
+            f"COPY {STAGING_TABLE} ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            CopyStream(self.clean_rows(records)),
+        )
+
+    def resolve_locations(self, batch_size=10000):
+        """
+        Fill in ``location_id`` of staged rows that came without one with the
+        nearest city from the in-memory index.
+        Rows with no city in range keep a NULL and are rejected afterwards.
+
+        Coordinates are streamed through a server-side cursor in batches, the
+        resolved ``(line, location_id)`` pairs are COPYed into a second temp
+        table, and staging is updated with one join.
+        """
+        self.cursor.execute(f"DROP TABLE IF EXISTS pg_temp.{RESOLVED_TABLE}")
+        self.cursor.execute(
+            f"CREATE TEMP TABLE {RESOLVED_TABLE} (line BIGINT NOT NULL, location_id VARCHAR(20) NOT NULL) ON COMMIT DROP"
+        )
+        index = None
+        resolved = 0
+        pending = self.cursor.cursor.connection.cursor(name=f"{STAGING_TABLE}_unresolved")
+        try:
+            pending.itersize = batch_size
+            pending.execute(
+                f"SELECT line, ST_X(center), ST_Y(center) FROM {STAGING_TABLE} WHERE location_id IS NULL"
+            )
+            while True:
+                batch = pending.fetchmany(batch_size)
+                if not batch:
+                    break
+                if index is None:
+                    index = get_city_index()
+                location_ids = index.resolve_many([(lng, lat) for _, lng, lat in batch])
+                values = [(line, location_id) for (line, _, _), location_id in zip(batch, location_ids) if location_id]
+                if values:
+                    self.cursor.copy_expert(
+                        f"COPY {RESOLVED_TABLE} (line, location_id) FROM STDIN WITH (FORMAT csv)",
+                        CopyStream(values),
+                    )
+                    resolved += len(values)
+        finally:
+            pending.close()
+
+        if resolved:
+            self.cursor.execute(f"ANALYZE {RESOLVED_TABLE}")
+            self.cursor.execute(
+                f"""
+                UPDATE {STAGING_TABLE} s SET location_id = r.location_id
+                FROM {RESOLVED_TABLE} r
+                WHERE s.line = r.line
+                """
+            )
+        return resolved
+
+    def drop_dangling_references(self):
+        """
+        Remove staged rows pointing at unknown locations or users, set-based,
+        so one bad reference does not abort the whole upsert.
+        """
+        self.cursor.execute(
+            f"""
+            DELETE FROM {STAGING_TABLE} s
+            WHERE s.location_id IS NULL
+               OR NOT EXISTS (SELECT 1 FROM properties_location l WHERE l.id = s.location_id)
+               OR (s.user_id IS NOT NULL AND NOT EXISTS (SELECT 1 FROM auth_user u WHERE u.id = s.user_id))
+            RETURNING s.line, s.location_id, s.user_id
+            """
+        )
+        for line_number, location_id, user_id in self.cursor.fetchall():
+            self.rejected += 1
+            self.staged -= 1
+            if location_id is None:
+                self.errors.append((line_number, "No city within range of the coordinates."))
+            else:
+                self.errors.append((line_number, f"Unknown location '{location_id}' or user '{user_id}'."))
+
+    def intern_amenities(self):
+        """
+        Add new amenity strings to the dictionary and resolve every staged
+        row's ``amenity_ids``, all set-based.
+        """
+        amenity_table = Amenity._meta.db_table
+        self.cursor.execute(
+            f"""
+            INSERT INTO {amenity_table} (name)
+            SELECT DISTINCT amenity
+            FROM {STAGING_TABLE}, jsonb_array_elements_text(amenities) AS amenity
+            WHERE amenities IS NOT NULL
+            ON CONFLICT (name) DO NOTHING
+            """
+        )
+        self.cursor.execute(
+            f"""
+            UPDATE {STAGING_TABLE} s
+            SET amenity_ids = ARRAY(
+                SELECT DISTINCT am.id
+                FROM jsonb_array_elements_text(s.amenities) AS e (name)
+                JOIN {amenity_table} am ON am.name = e.name
+                ORDER BY am.id
+            )
+            WHERE s.amenities IS NOT NULL
+            """
+        )
+
+    def upsert(self):
+        """
+        Merge staged rows into the partitioned table keyed on ``(id, feed)``.
+        The last occurrence of a duplicated id wins; unchanged rows are not rewritten.
+        Returns the number of inserted or updated rows.
+        """
+        table = Accommodation._meta.db_table
+        columns = ', '.join(UPSERT_COLUMNS)
+        assignments = ', '.join(f"{column} = EXCLUDED.{column}" for column in UPSERT_COLUMNS)
+        changed = ' OR '.join(f"a.{column} IS DISTINCT FROM EXCLUDED.{column}" for column in UPSERT_COLUMNS)
+        self.cursor.execute(
+            f"""
+            INSERT INTO {table} AS a (id, feed, {columns}, created_at, updated_at)
+            SELECT DISTINCT ON (id) id, feed, {columns}, now(), now()
+            FROM {STAGING_TABLE}
+            ORDER BY id, line DESC
+            ON CONFLICT (id, feed) DO UPDATE
+            SET {assignments}, updated_at = EXCLUDED.updated_at
+            WHERE {changed}
+            """
+        )
+        return self.cursor.rowcount
+
+    def stage(self, records):
+        """
+        Load validated records into the staging table without touching the live table.
+        """
+        self.create_staging_table()
+        self.copy_rows(records)
+        self.resolve_locations()
+        self.drop_dangling_references()
+        self.intern_amenities()
+
+    def run(self, records):
+        self.stage(records)
+        return self.upsert()
@@ -0,0 +1,151 @@
+import functools
+import hashlib
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+UNKNOWN_LANGUAGE = 'unknown'
+
+# PostgreSQL text search configuration per language partition; Arabic and
+# any language without a stemmer use 'simple' (lowercased words, no stemming)
+TEXT_SEARCH_CONFIGS = {
+    'en': 'english',
+    'ar': 'simple',
+    'fr': 'french',
+    'de': 'german',
+}
+DEFAULT_TEXT_SEARCH_CONFIG = 'simple'
+
+
+def text_search_config(language):
+    return TEXT_SEARCH_CONFIGS.get(language, DEFAULT_TEXT_SEARCH_CONFIG)
+
+
+def search_vector_sql():
+    """
+    Generation expression of ``LocalizeAccommodation.search_vector``. The
+    configs are ``regconfig`` literals, so the expression stays immutable.
+    """
+    branches = ' '.join(
+        f"WHEN '{language}' THEN '{config}'::regconfig"
+        for language, config in TEXT_SEARCH_CONFIGS.items()
+    )
+    return (
+        f"to_tsvector(CASE language {branches} ELSE '{DEFAULT_TEXT_SEARCH_CONFIG}'::regconfig END, "
+        f"coalesce(description, ''))"
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _langdetect():
+    """
+    Import langdetect on first use rather than at startup; its language
+    profiles are loaded by the first detection after this.
+    """
+    from langdetect import DetectorFactory, detect_langs
+    from langdetect.lang_detect_exception import LangDetectException
+
+    # Set seed for consistent results
+    DetectorFactory.seed = 0
+    return detect_langs, LangDetectException
+
+
+def content_hash(text):
+    """
+    MD5 hex digest of the text, identical to PostgreSQL's ``md5(description)``
+    so stale detections can be found in SQL. Not used for security.
+    """
+    return hashlib.md5((text or '').encode('utf-8'), usedforsecurity=False).hexdigest()
+
+
+def detect_language(text):
+    """
+    Return ``(language, confidence)`` for the text, or ``('unknown', 0.0)``.
+    """
+    detect_langs, LangDetectException = _langdetect()
+    try:
+        best = detect_langs(text)[0]
+    except LangDetectException:
+        return UNKNOWN_LANGUAGE, 0.0
+    return best.lang, round(best.prob, 4)
+
+
+class LanguageDetector:
+    """
+    Batch language detection with a content-hash keyed LRU cache and an
+    optional process pool, so identical descriptions are detected once and
+    the CPU-bound work is spread over every core.
+
+    Use as a context manager to own the pool::
+
+        with LanguageDetector() as detector:
+            results = detector.detect_many(texts)
+    """
+
+    def __init__(self, workers=None, cache_size=100_000):
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._executor = None
+
+    def __enter__(self):
+        if self.workers > 1:
+            # Spawned like the image workers: a forked child would share the
+            # parent's open database connection. Detection needs no Django.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def remember(self, digest, language, confidence):
+        self.cache[digest] = (language, confidence)
+        self.cache.move_to_end(digest)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def cached(self, digest):
+        result = self.cache.get(digest)
+        if result is not None:
+            self.cache.move_to_end(digest)
+        return result
+
+    def detect_many(self, texts, digests=None):
+        """
+        Return a ``(hash, language, confidence)`` tuple for every text, in order.
+        Pass ``digests`` if the content hashes are already known.
+        """
+        if digests is None:
+            digests = [content_hash(text) for text in texts]
+        found = {}
+        missing = {}
+        for digest, text in zip(digests, texts):
+            if digest in found or digest in missing:
+                continue
+            result = self.cached(digest)
+            if result is None:
+                missing[digest] = text
+            else:
+                found[digest] = result
+        self.misses += len(missing)
+        self.hits += len(digests) - len(missing)
+
+        if missing:
+            if self._executor is not None:
+                chunksize = max(1, len(missing) // (self.workers * 4))
+                results = self._executor.map(detect_language, missing.values(), chunksize=chunksize)
+            else:
+                results = map(detect_language, missing.values())
+            for digest, result in zip(missing, results):
+                self.remember(digest, *result)
+                found[digest] = result
+
+        return [(digest,) + found[digest] for digest in digests]
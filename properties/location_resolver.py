@@ -0,0 +1,153 @@
+import math
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+
+from .location_tree import current_version
+from .models import Location
+
+# Side of a grid cell in degrees
+GRID_CELL_DEGREES = getattr(settings, 'LOCATION_GRID_CELL_DEGREES', 0.5)
+
+# Points farther than this from every city stay unassigned
+MAX_DISTANCE_METERS = getattr(settings, 'LOCATION_MAX_DISTANCE_METERS', 50_000)
+
+EARTH_RADIUS_METERS = 6_371_008.8
+METERS_PER_DEGREE = 111_320
+
+
+def haversine(lng1, lat1, lng2, lat2):
+    """
+    Great-circle distance in meters.
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(min(1.0, math.sqrt(a)))
+
+
+class CityIndex:
+    """
+    In-memory uniform grid over the centers of city-level Locations, for
+    resolving large batches of points to their nearest city without a
+    database round trip per point.
+
+    Each query scans rings of cells around the point's cell until no closer
+    city can exist in the next ring or the ring lies beyond ``max_distance``.
+    """
+
+    def __init__(self, cities, cell_degrees=GRID_CELL_DEGREES, version=None):
+        self.cell_degrees = cell_degrees
+        self.version = version
+        self.columns = max(1, math.ceil(360 / cell_degrees))
+        self.cells = defaultdict(list)
+        self.size = 0
+        for location_id, lng, lat in cities:
+            self.cells[self._cell(lng, lat)].append((lng, lat, location_id))
+            self.size += 1
+
+    @classmethod
+    def load(cls, cell_degrees=GRID_CELL_DEGREES, version=None, chunk_size=5000):
+        """
+        Build the index from every city in one streaming query.
+        """
+        rows = (
+            Location.objects
+            .filter(location_type='city')
+            .order_by()
+            .values_list('id', 'center')
+            .iterator(chunk_size=chunk_size)
+        )
+        cities = ((location_id, center.x, center.y) for location_id, center in rows if center)
+        return cls(cities, cell_degrees=cell_degrees, version=version)
+
+    def _cell(self, lng, lat):
+        return (
+            int(math.floor((lng + 180) / self.cell_degrees)) % self.columns,
+            int(math.floor((lat + 90) / self.cell_degrees)),
+        )
+
+    def _ring(self, column, row, radius):
+        """
+        Cells at Chebyshev distance ``radius`` from ``(column, row)``, wrapping
+        around the antimeridian.
+        """
+        if radius == 0:
+            yield column, row
+            return
+        for dx in range(-radius, radius + 1):
+            for dy in (-radius, radius):
+                yield (column + dx) % self.columns, row + dy
+        for dy in range(-radius + 1, radius):
+            for dx in (-radius, radius):
+                yield (column + dx) % self.columns, row + dy
+
+    def nearest(self, lng, lat, max_distance=MAX_DISTANCE_METERS):
+        """
+        ``(location_id, meters)`` of the closest city within ``max_distance``,
+        or ``(None, None)``.
+        """
+        column, row = self._cell(lng, lat)
+        limit = max_distance
+        best_id, best_distance = None, None
+        for radius in range(self.columns // 2 + 1):
+            # Unscanned cities are at least radius - 1 cells away; cells are
+            # narrowest at the highest latitude the ring reaches
+            widest_lat = min(abs(lat) + (radius + 1) * self.cell_degrees, 89.9)
+            cell_meters = self.cell_degrees * METERS_PER_DEGREE * max(math.cos(math.radians(widest_lat)), 0.01)
+            if radius and (radius - 1) * cell_meters > limit:
+                break
+            for cell in self._ring(column, row, radius):
+                for city_lng, city_lat, location_id in self.cells.get(cell, ()):
+                    distance = haversine(lng, lat, city_lng, city_lat)
+                    if distance <= limit:
+                        best_id, best_distance = location_id, distance
+                        limit = distance
+        return best_id, best_distance
+
+    def resolve_many(self, points, max_distance=MAX_DISTANCE_METERS):
+        """
+        Nearest city id (or ``None``) for each ``(lng, lat)`` point, in order.
+        Points sharing a cell are resolved together, and repeated coordinates
+        are looked up once.
+        """
+        by_cell = defaultdict(list)
+        for index, (lng, lat) in enumerate(points):
+            by_cell[self._cell(lng, lat)].append(index)
+
+        results = [None] * len(points)
+        for indexes in by_cell.values():
+            seen = {}
+            for index in indexes:
+                point = points[index]
+                if point not in seen:
+                    seen[point] = self.nearest(point[0], point[1], max_distance)[0]
+                results[index] = seen[point]
+        return results
+
+
+_lock = threading.Lock()
+_index = None
+
+
+def get_city_index():
+    """
+    This process's city index, rebuilt when the Location tree version changes.
+    """
+    global _index
+    version = current_version()
+    index = _index
+    if index is None or index.version != version:
+        with _lock:
+            if _index is None or _index.version != version:
+                _index = CityIndex.load(version=version)
+            index = _index
+    return index
+
+
+def clear_city_index():
+    global _index
+    with _lock:
+        _index = None
@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import defaultdict, namedtuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils.text import slugify
+
+from .models import Location, LocationTreeVersion
+
+# Immutable view of a single Location row held in the cached tree
+LocationNode = namedtuple('LocationNode', ['title', 'location_type', 'parent_id', 'country_code'])
+
+# Seconds between checks of the database version counter
+CHECK_INTERVAL = getattr(settings, 'LOCATION_TREE_CHECK_INTERVAL', 30)
+
+_lock = threading.Lock()
+_tree = None
+_checked_at = 0.0
+
+
+class LocationTree:
+    """
+    Read-only, versioned snapshot of the whole Location hierarchy.
+    """
+
+    def __init__(self, version, nodes, children):
+        self.version = version
+        self.nodes = nodes
+        self.children = children
+
+    @classmethod
+    def load(cls, version, chunk_size=5000):
+        """
+        Build a snapshot from a single streaming query.
+        """
+        nodes = {}
+        children = defaultdict(list)
+        rows = Location.objects.order_by('title').values_list(
+            'id', 'title', 'location_type', 'parent_id', 'country_code'
+        )
+        for location_id, title, location_type, parent_id, country_code in rows.iterator(chunk_size=chunk_size):
+            nodes[location_id] = LocationNode(title, location_type, parent_id, country_code)
+            if parent_id is not None:
+                children[parent_id].append(location_id)
+        return cls(version, nodes, dict(children))
+
+    def get(self, location_id):
+        return self.nodes.get(location_id)
+
+    def children_of(self, location_id):
+        return self.children.get(location_id, [])
+
+    def lineage(self, location_id):
+        """
+        Ids from the root down to ``location_id``; empty if the id is unknown.
+        """
+        ids = []
+        seen = set()
+        while location_id is not None and location_id not in seen:
+            node = self.nodes.get(location_id)
+            if node is None:
+                break
+            seen.add(location_id)
+            ids.append(location_id)
+            location_id = node.parent_id
+        ids.reverse()
+        return ids
+
+    def breadcrumbs(self, location_id):
+        """
+        List of ``(id, title)`` pairs from the root down to ``location_id``.
+        """
+        return [(ancestor_id, self.nodes[ancestor_id].title) for ancestor_id in self.lineage(location_id)]
+
+    def slug_path(self, location_id):
+        """
+        Slugified titles joined by "/", e.g. "united-states/new-york/new-york-city".
+        """
+        return '/'.join(slugify(self.nodes[ancestor_id].title) for ancestor_id in self.lineage(location_id))
+
+
+def current_version():
+    return LocationTreeVersion.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+
+
+def get_location_tree():
+    """
+    Return this process's snapshot, loading it lazily on first use.
+
+    The database version counter is consulted at most once every
+    ``CHECK_INTERVAL`` seconds; all other calls are served from memory.
+    """
+    global _tree, _checked_at
+    tree = _tree
+    if tree is not None and time.monotonic() - _checked_at < CHECK_INTERVAL:
+        return tree
+
+    with _lock:
+        if _tree is None or time.monotonic() - _checked_at >= CHECK_INTERVAL:
+            version = current_version()
+            if _tree is None or _tree.version != version:
+                _tree = LocationTree.load(version)
+            _checked_at = time.monotonic()
+        return _tree
+
+
+def clear_location_tree():
+    """
+    Drop this process's snapshot so the next lookup reloads it.
+    """
+    global _tree
+    with _lock:
+        _tree = None
+
+
+def bump_location_tree_version():
+    """
+    Invalidate every process's snapshot by incrementing the shared counter.
+    """
+    updated = LocationTreeVersion.objects.filter(pk=1).update(version=F('version') + 1)
+    if not updated:
+        LocationTreeVersion.objects.get_or_create(pk=1, defaults={'version': 1})
+    clear_location_tree()
+    # Other writes in this transaction may still be invisible; reload after commit too
+    transaction.on_commit(clear_location_tree)
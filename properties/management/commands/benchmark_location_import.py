@@ -0,0 +1,83 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from tablib import Dataset
+from properties.resources import BulkLocationResource, LocationResource
+
+class QueryCounter:
+    """
+    Counts executed statements without keeping them, unlike CaptureQueriesContext.
+    """
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+class Command(BaseCommand):
+    help = 'Compare row-by-row and bulk Location imports on the same file (changes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=None, help='CSV file to import; a synthetic hierarchy is generated if omitted.')
+        parser.add_argument('--rows', type=int, default=100_000, help='Size of the synthetic hierarchy.')
+        parser.add_argument('--skip-row-mode', action='store_true', help='Only time the bulk resource.')
+
+    def handle(self, *args, **options):
+        if options['file']:
+            with open(options['file'], encoding='utf-8') as fp:
+                dataset = Dataset().load(fp.read(), format='csv')
+        else:
+            dataset = self._synthetic(options['rows'])
+        self.stdout.write(f"Importing {len(dataset)} locations.")
+
+        modes = [('bulk', BulkLocationResource)]
+        if not options['skip_row_mode']:
+            modes.insert(0, ('row', LocationResource))
+        for label, resource_class in modes:
+            # Each run gets its own copy; the bulk resource reorders rows in place
+            rows = [dataset[index] for index in range(len(dataset))]
+            self._run(label, resource_class, Dataset(*rows, headers=dataset.headers))
+
+    def _run(self, label, resource_class, dataset):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with transaction.atomic(), connection.execute_wrapper(counter):
+            result = resource_class().import_data(dataset, dry_run=False, raise_errors=True)
+            elapsed = time.perf_counter() - started
+            # Leave the database as it was, so both modes see the same starting state
+            transaction.set_rollback(True)
+        if result.has_validation_errors():
+            raise CommandError(f"{label} import reported validation errors.")
+        rate = len(dataset) / elapsed if elapsed else len(dataset)
+        self.stdout.write(self.style.SUCCESS(
+            f"{label:>4}: {elapsed:.2f}s, {counter.count} queries ({rate:,.0f} rows/sec)"
+        ))
+
+    @staticmethod
+    def _synthetic(rows):
+        """
+        Countries -> states -> cities, parents first so the row-by-row
+        resource can resolve every parent.
+        """
+        dataset = Dataset(headers=['id', 'title', 'center', 'parent', 'location_type', 'country_code', 'state_abbr', 'city'])
+        countries = max(1, rows // 1000)
+        states_per_country = 9
+        cities = rows - countries - countries * states_per_country
+        if cities < 0:
+            raise CommandError('--rows must be at least 10.')
+
+        codes = [f'{country % 26 + 65:c}{country // 26 % 26 + 65:c}' for country in range(countries)]
+        for country, code in enumerate(codes):
+            dataset.append([f'C{country}', f'Country {country}', 'POINT(0 0)', '', 'country', code, '', ''])
+        for country, code in enumerate(codes):
+            for state in range(states_per_country):
+                dataset.append([f'C{country}S{state}', f'State {state}', 'POINT(0 0)', f'C{country}', 'state', code, f'S{state}', ''])
+        for number in range(cities):
+            country = number % countries
+            state = number // countries % states_per_country
+            dataset.append([
+                f'C{country}S{state}T{number}', f'City {number}', f'POINT({number % 360 - 180} {number % 170 - 85})',
+                f'C{country}S{state}', 'city', codes[country], f'S{state}', f'City {number}',
+            ])
+        return dataset
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from properties.facets import ROLLUP_TABLE, refresh_feed_rollups, rollup_mismatches
+from properties.models import Accommodation
+
+class Command(BaseCommand):
+    help = 'Compare the facet rollups against a live aggregate, optionally rebuilding drifted feeds'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--feed',
+            type=int,
+            action='append',
+            help='Feed to check (repeatable). Defaults to every feed with rows or rollups.',
+        )
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Recompute the rollups of every feed that does not match.',
+        )
+        parser.add_argument(
+            '--show',
+            type=int,
+            default=10,
+            help='Number of mismatched facet values to print per feed.',
+        )
+
+    def handle(self, *args, **options):
+        feeds = options['feed'] or self._all_feeds()
+        drifted = 0
+
+        for feed in feeds:
+            mismatches = rollup_mismatches(feed)
+            if not mismatches:
+                continue
+            drifted += 1
+            self.stdout.write(self.style.WARNING(f"Feed {feed}: {len(mismatches)} facet values differ."))
+            for facet, key, live, rolled in mismatches[:options['show']]:
+                self.stdout.write(f"  {facet}={key}: live={live or 0} rollup={rolled or 0}")
+            if options['fix']:
+                rows = refresh_feed_rollups(feed)
+                self.stdout.write(f"  rebuilt with {rows} rollup rows.")
+
+        if drifted and not options['fix']:
+            self.stdout.write(self.style.ERROR(f"{drifted} of {len(feeds)} feeds are out of date; rerun with --fix."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Checked {len(feeds)} feeds, {drifted} rebuilt."))
+
+    @staticmethod
+    def _all_feeds():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT feed FROM {Accommodation._meta.db_table} UNION SELECT feed FROM {ROLLUP_TABLE} ORDER BY 1"
+            )
+            return [row[0] for row in cursor.fetchall()]
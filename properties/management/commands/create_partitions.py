@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+from properties.partitioning import get_registry
+from properties.partitioning.partition_manager import FEED_PARTITION_SIZE
+
+class Command(BaseCommand):
+    help = 'Pre-create language and feed-range partitions ahead of ingestion'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--languages',
+            nargs='+',
+            default=[],
+            help='Language codes that need a localized accommodation partition (e.g. es it).',
+        )
+        parser.add_argument(
+            '--feeds',
+            default=None,
+            help='Feed range to cover as LOWER:UPPER (upper bound exclusive).',
+        )
+        parser.add_argument(
+            '--step',
+            type=int,
+            default=FEED_PARTITION_SIZE,
+            help='Width of each created feed range partition.',
+        )
+
+    def handle(self, *args, **options):
+        registry = get_registry()
+
+        for language in options['languages']:
+            language = language.lower()
+            existing = registry.language_partition(language)
+            try:
+                table = existing or registry.create_language_partition(language)
+            except ValueError as exc:
+                raise CommandError(str(exc))
+            status = 'exists' if existing else 'created'
+            self.stdout.write(f"{table}: {status}")
+
+        if options['feeds']:
+            try:
+                lower, upper = (int(value) for value in options['feeds'].split(':'))
+            except ValueError:
+                raise CommandError('--feeds must look like LOWER:UPPER')
+            if options['step'] <= 0:
+                raise CommandError('--step must be positive')
+
+            for start in range(lower, upper, options['step']):
+                end = min(start + options['step'], upper)
+                covered = [
+                    (existing_lower, existing_upper)
+                    for existing_lower, existing_upper, _ in registry.feed_ranges
+                    if existing_lower < end and start < existing_upper
+                ]
+                if covered:
+                    self.stdout.write(f"feeds [{start}, {end}): already covered by {covered}")
+                    continue
+                try:
+                    table = registry.create_feed_partition(start, end)
+                except ValueError as exc:
+                    raise CommandError(str(exc))
+                self.stdout.write(f"{table}: created")
+
+        self.stdout.write(self.style.SUCCESS('Partitions are in place.'))
@@ -0,0 +1,70 @@
+import os
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from properties.models import AccommodationImage, ImageBlob
+from properties.storage import blob_name, content_digest, image_storage
+
+class Command(BaseCommand):
+    help = 'Move existing accommodation images to content-addressed storage, sharing identical files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Images handled per batch.')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how much would be reclaimed.')
+
+    def handle(self, *args, **options):
+        storage = image_storage()
+        started = time.perf_counter()
+        moved = shared = missing = 0
+        reclaimed = 0
+        seen = set()
+        last_id = 0
+
+        while True:
+            # Rows without a blob predate content addressing; keyset so reruns resume
+            batch = list(
+                AccommodationImage.objects
+                .filter(blob__isnull=True, id__gt=last_id)
+                .exclude(image='')
+                .order_by('id')
+                .values_list('id', 'image')[:options['batch_size']]
+            )
+            if not batch:
+                break
+            last_id = batch[-1][0]
+
+            for image_id, name in batch:
+                if not storage.exists(name):
+                    missing += 1
+                    self.stderr.write(f"Image {image_id}: '{name}' is missing from storage.")
+                    continue
+
+                with storage.open(name, 'rb') as fp:
+                    digest, size = content_digest(fp)
+                target = blob_name(digest, os.path.splitext(name)[1])
+                duplicate = digest in seen or storage.exists(target)
+                seen.add(digest)
+                if duplicate:
+                    shared += 1
+                    reclaimed += size
+                else:
+                    moved += 1
+                if options['dry_run']:
+                    continue
+
+                if not duplicate:
+                    with storage.open(name, 'rb') as fp:
+                        storage.save(target, fp)
+                with transaction.atomic():
+                    blob = ImageBlob.objects.acquire(digest, target, size)
+                    AccommodationImage.objects.filter(pk=image_id).update(image=target, blob=blob)
+                # Legacy names were unique per upload, but check before deleting
+                if name != target and not AccommodationImage.objects.filter(image=name).exists():
+                    storage.delete(name)
+
+        elapsed = time.perf_counter() - started
+        verb = 'Would move' if options['dry_run'] else 'Moved'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {moved} unique images, {shared} duplicates share an existing file "
+            f"({reclaimed / (1024 * 1024):.1f} MB reclaimed), {missing} missing, in {elapsed:.2f}s."
+        ))
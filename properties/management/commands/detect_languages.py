@@ -0,0 +1,113 @@
+import csv
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.functions import MD5
+from psycopg2.extras import execute_values
+from properties.language_detection import UNKNOWN_LANGUAGE, LanguageDetector, content_hash
+from properties.models import LocalizeAccommodation
+
+class Command(BaseCommand):
+    help = 'Detect the language of localized descriptions in bulk and flag rows whose language disagrees'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows detected and written per batch.')
+        parser.add_argument('--workers', type=int, default=None, help='Process pool size (defaults to CPU count).')
+        parser.add_argument('--all', action='store_true', help='Re-detect every row, not just new or edited ones.')
+        parser.add_argument(
+            '--min-confidence',
+            type=float,
+            default=0.9,
+            help='Only flag mismatches detected with at least this confidence.',
+        )
+        parser.add_argument('--report', default=None, help='Write flagged rows to this CSV file.')
+
+    def handle(self, *args, **options):
+        queryset = LocalizeAccommodation.objects.all()
+        if not options['all']:
+            # Never detected, or the description changed since the last detection
+            queryset = queryset.annotate(current_hash=MD5('description')).filter(
+                Q(description_hash__isnull=True) | ~Q(description_hash=F('current_hash'))
+            )
+        rows = queryset.order_by().values_list('id', 'language', 'description').iterator(
+            chunk_size=options['batch_size']
+        )
+
+        started = time.perf_counter()
+        processed = 0
+        flagged = []
+
+        with LanguageDetector(workers=options['workers']) as detector:
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= options['batch_size']:
+                    flagged.extend(self._process(detector, batch, options['min_confidence']))
+                    processed += len(batch)
+                    batch = []
+            if batch:
+                flagged.extend(self._process(detector, batch, options['min_confidence']))
+                processed += len(batch)
+
+        elapsed = time.perf_counter() - started
+        if options['report']:
+            with open(options['report'], 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['id', 'language', 'detected_language', 'confidence'])
+                writer.writerows(flagged)
+
+        for row in flagged[:20]:
+            self.stdout.write(self.style.WARNING(
+                f"Row {row[0]}: declared '{row[1]}' but detected '{row[2]}' ({row[3]:.2f})"
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f"Detected {processed} rows in {elapsed:.2f}s "
+            f"(cache hits: {detector.hits}, detections: {detector.misses}); "
+            f"{len(flagged)} rows flagged."
+        ))
+
+    def _process(self, detector, batch, min_confidence):
+        """
+        Detect one batch, write results back in a single UPDATE and return mismatches.
+        """
+        texts = [description for _, _, description in batch]
+        digests = [content_hash(text) for text in texts]
+
+        # Reuse detections already stored for identical descriptions
+        known = (
+            LocalizeAccommodation.objects
+            .filter(description_hash__in=set(digests), detected_language__isnull=False)
+            .order_by()
+            .values_list('description_hash', 'detected_language', 'detected_confidence')
+            .distinct()
+        )
+        for digest, language, confidence in known:
+            detector.remember(digest, language, confidence)
+
+        results = detector.detect_many(texts, digests=digests)
+
+        with connection.cursor() as cursor:
+            execute_values(
+                cursor.cursor,
+                f"""
+                UPDATE {LocalizeAccommodation._meta.db_table} AS t
+                SET detected_language = v.detected_language,
+                    detected_confidence = v.detected_confidence,
+                    description_hash = v.description_hash
+                FROM (VALUES %s) AS v (id, language, detected_language, detected_confidence, description_hash)
+                WHERE t.id = v.id AND t.language = v.language
+                """,
+                [
+                    (row_id, language, detected, confidence, digest)
+                    for (row_id, language, _), (digest, detected, confidence) in zip(batch, results)
+                ],
+                template="(%s, %s, %s, %s::double precision, %s)",
+                page_size=len(batch),
+            )
+
+        return [
+            (row_id, language, detected, confidence)
+            for (row_id, language, _), (_, detected, confidence) in zip(batch, results)
+            if detected not in (UNKNOWN_LANGUAGE, language) and confidence >= min_confidence
+        ]
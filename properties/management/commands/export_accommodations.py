@@ -0,0 +1,47 @@
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from properties.export import EXPORT_FORMATS, encode_stream, export_queryset, iter_export
+
+class Command(BaseCommand):
+    help = 'Stream accommodations with their location and localized rows to CSV, JSONL or GeoJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='jsonl', help='Output format.')
+        parser.add_argument('--output', default='-', help="Output file, or '-' for stdout.")
+        parser.add_argument('--gzip', action='store_true', help='Compress the output with gzip.')
+        parser.add_argument('--feed', type=int, default=None, help='Only export this feed.')
+        parser.add_argument('--country', default=None, help='Only export this country code.')
+        parser.add_argument('--published-only', action='store_true', help='Skip unpublished accommodations.')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per server-side cursor round trip.')
+
+    def handle(self, *args, **options):
+        queryset = export_queryset(
+            feed=options['feed'],
+            country_code=options['country'],
+            published_only=options['published_only'],
+        )
+        chunks = encode_stream(
+            iter_export(queryset, options['format'], chunk_size=options['chunk_size']),
+            compress=options['gzip'],
+        )
+
+        started = time.perf_counter()
+        written = 0
+        try:
+            output = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+        except OSError as exc:
+            raise CommandError(str(exc))
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+
+        if options['output'] != '-':
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(
+                f"Wrote {written / (1024 * 1024):.1f} MB to {options['output']} in {elapsed:.2f}s."
+            ))
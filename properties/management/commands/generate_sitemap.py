@@ -1,62 +1,90 @@
-import json
+import os
+import resource
+import sys
+import time
 from django.core.management.base import BaseCommand
-from django.utils.text import slugify
-from properties.models import Location
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.conf import settings
-import os
+from properties.sitemap import LocationTreeRows, ShardedSitemapWriter, write_json_array
 
 class Command(BaseCommand):
     help = 'Generates a sitemap.json file for country, state, and city locations'
 
-    def handle(self, *args, **kwargs):
-        # Fetch all country locations
-        countries = Location.objects.filter(location_type='country').order_by('title')
-
-        sitemap_data = []
-
-        for country in countries:
-            country_slug = slugify(country.title)
-            locations = []
-
-            # Fetch locations for the country (states)
-            sub_locations = Location.objects.filter(parent=country).order_by('title')
-
-            for location in sub_locations:
-                location_slug = slugify(location.title)
-                location_entry = {
-                    location.title: location_slug
-                }
-                
-                # Check if it's a state and fetch cities under it
-                if location.location_type == 'state':
-                    # Initialize a list for cities within this state
-                    cities_list = []
-                    cities = Location.objects.filter(parent=location).order_by('title')
-                    
-                    for city in cities:
-                        city_slug = slugify(city.title)
-                        cities_list.append({
-                            city.title: f"{country_slug}/{location_slug}/{city_slug}"
-                        })
-
-                    # Add cities to the state entry if there are any
-                    if cities_list:
-                        location_entry['locations'] = cities_list
-
-                locations.append(location_entry)
-
-            # Append country with its locations (states and cities)
-            sitemap_data.append({
-                country.title: country_slug,
-                'locations': locations
-            })
-
-        # Sort the sitemap data by country title (alphabetically)
-        sitemap_data = sorted(sitemap_data, key=lambda x: list(x.keys())[0].lower())
-
-        # Output the JSON data to a file
-        output_path = os.path.join(settings.BASE_DIR, 'sitemap.json')
-        with open(output_path, 'w') as f:
-            json.dump(sitemap_data, f, indent=4)
-
-        self.stdout.write(self.style.SUCCESS(f"Sitemap generated successfully at {output_path}"))
\ No newline at end of file
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--benchmark',
+            action='store_true',
+            help='Report query count, wall time and peak RSS after generation.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Number of Location rows fetched per round trip.',
+        )
+        parser.add_argument(
+            '--sharded',
+            action='store_true',
+            help='Write one gzipped shard per country plus index.json, regenerating only changed countries.',
+        )
+        parser.add_argument(
+            '--output-dir',
+            default=None,
+            help='Directory for sharded output (defaults to BASE_DIR/sitemap).',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rewrite every shard even if its country is unchanged.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Process pool size used when many shards are dirty.',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        with CaptureQueriesContext(connection) as queries:
+            # Load the whole Location tree in a single pass
+            tree = LocationTreeRows.load(
+                chunk_size=options['chunk_size'],
+                track_changes=options['sharded'],
+            )
+
+            if options['sharded']:
+                output_path = options['output_dir'] or os.path.join(settings.BASE_DIR, 'sitemap')
+                writer = ShardedSitemapWriter(output_path, workers=options['workers'])
+                written, skipped, removed = writer.write(tree, force=options['force'])
+                count = len(tree.countries)
+                self.stdout.write(f"Shards written: {written}, unchanged: {skipped}, removed: {removed}")
+            else:
+                # Stream the JSON to a temporary file and swap it in atomically
+                output_path = os.path.join(settings.BASE_DIR, 'sitemap.json')
+                tmp_path = f"{output_path}.tmp"
+                with open(tmp_path, 'w') as f:
+                    count = write_json_array(tree.iter_entries(), f, indent=4)
+                os.replace(tmp_path, output_path)
+
+        self.stdout.write(self.style.SUCCESS(f"Sitemap generated successfully at {output_path}"))
+
+        if options['benchmark']:
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"countries={count} queries={len(queries)} "
+                f"wall_time={elapsed:.3f}s peak_rss={self._peak_rss_mb():.1f}MB"
+            )
+
+    @staticmethod
+    def _peak_rss_mb():
+        """
+        Peak resident set size of this process in megabytes.
+        ru_maxrss is reported in bytes on macOS and kilobytes elsewhere.
+        """
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == 'darwin':
+            return peak / (1024 * 1024)
+        return peak / 1024
@@ -0,0 +1,111 @@
+import csv
+import time
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from properties.accommodation_detail import bump_detail_generation
+from properties.facets import refresh_feed_rollups
+from properties.ingestion import FeedIngestor, detect_format, iter_feed_rows, open_feed
+from properties.partitioning.feed_swap import FeedPartitionSwap
+from properties.tiles import get_tile_cache
+
+
+def _refresh_derived(feed):
+    # Facet counts for this feed only, in the caller's transaction
+    refresh_feed_rollups(feed)
+    transaction.on_commit(get_tile_cache().clear)
+    transaction.on_commit(bump_detail_generation)
+
+
+class Command(BaseCommand):
+    help = 'Load a supplier feed (JSONL or CSV) into the partitioned accommodation table via COPY'
+
+    def add_arguments(self, parser):
+        parser.add_argument('feed_id', type=int, help='Feed number the rows belong to.')
+        parser.add_argument('file', help='Path to a .jsonl/.csv file, optionally gzipped.')
+        parser.add_argument(
+            '--format',
+            choices=('jsonl', 'csv'),
+            default=None,
+            help='Input format; inferred from the file extension by default.',
+        )
+        parser.add_argument(
+            '--max-errors',
+            type=int,
+            default=None,
+            help='Abort (and roll back) once more than this many rows are rejected.',
+        )
+        parser.add_argument(
+            '--replace',
+            action='store_true',
+            help='Treat the file as a full snapshot: build a new partition and swap it in.',
+        )
+        parser.add_argument(
+            '--keep-old',
+            action='store_true',
+            help='With --replace, keep the detached partition as <name>_retired instead of dropping it.',
+        )
+        parser.add_argument(
+            '--lock-timeout',
+            default='5s',
+            help='With --replace, give up if the partition swap waits longer than this for locks.',
+        )
+        parser.add_argument(
+            '--show-errors',
+            type=int,
+            default=20,
+            help='Number of rejected rows to print.',
+        )
+
+    def handle(self, *args, **options):
+        feed = options['feed_id']
+        if not 0 <= feed <= 32767:
+            raise CommandError('feed_id must fit in a SMALLINT (0-32767).')
+
+        path = options['file']
+        try:
+            file_format = options['format'] or detect_format(path)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        started = time.perf_counter()
+        swap = None
+        try:
+            with open_feed(path) as fp, transaction.atomic(), connection.cursor() as cursor:
+                ingestor = FeedIngestor(cursor, feed, max_errors=options['max_errors'])
+                if options['replace']:
+                    # Only builds the replacement; the parent is not locked until the swap
+                    ingestor.stage(iter_feed_rows(fp, file_format))
+                    swap = FeedPartitionSwap(
+                        cursor, feed,
+                        lock_timeout=options['lock_timeout'],
+                        keep_old=options['keep_old'],
+                    )
+                    upserted = swap.build()
+                else:
+                    upserted = ingestor.run(iter_feed_rows(fp, file_format))
+                    _refresh_derived(feed)
+            if swap is not None:
+                partition = swap.swap()
+                self.stdout.write(f"Swapped in a rebuilt {partition}.")
+                with transaction.atomic():
+                    _refresh_derived(feed)
+        except FileNotFoundError:
+            raise CommandError(f"File '{path}' does not exist.")
+        except ValidationError as exc:
+            raise CommandError('; '.join(exc.messages))
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        except csv.Error as exc:
+            raise CommandError(f"Malformed CSV: {exc}")
+        elapsed = time.perf_counter() - started
+
+        for line_number, message in ingestor.errors[:options['show_errors']]:
+            self.stderr.write(f"line {line_number}: {message}")
+
+        processed = ingestor.staged + ingestor.rejected
+        rate = processed / elapsed if elapsed else processed
+        self.stdout.write(self.style.SUCCESS(
+            f"Feed {feed}: {ingestor.staged} rows staged, {upserted} inserted or updated, "
+            f"{ingestor.rejected} rejected in {elapsed:.2f}s ({rate:,.0f} rows/sec)."
+        ))
@@ -0,0 +1,51 @@
+import time
+from django.core.management.base import BaseCommand
+from properties.images import ImageProcessor, save_result
+from properties.models import AccommodationImage
+
+class Command(BaseCommand):
+    help = 'Generate resized WebP/JPEG variants and placeholders for accommodation images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Images processed and saved per batch.')
+        parser.add_argument('--workers', type=int, default=None, help='Process pool size (defaults to CPU count).')
+        parser.add_argument('--all', action='store_true', help='Reprocess images that already have variants.')
+        parser.add_argument('--limit', type=int, default=None, help='Stop after this many images.')
+
+    def handle(self, *args, **options):
+        queryset = AccommodationImage.objects.exclude(image='')
+        if not options['all']:
+            # Finished images are skipped, so an interrupted run resumes where it stopped
+            queryset = queryset.filter(processed_at__isnull=True)
+
+        started = time.perf_counter()
+        processed = failed = 0
+        last_id = 0
+
+        with ImageProcessor(workers=options['workers']) as processor:
+            while options['limit'] is None or processed + failed < options['limit']:
+                size = options['batch_size']
+                if options['limit'] is not None:
+                    size = min(size, options['limit'] - processed - failed)
+                # Keyset over ids, so failed images are not retried forever within a run
+                batch = list(
+                    queryset.filter(id__gt=last_id).order_by('id').values_list('id', 'image')[:size]
+                )
+                if not batch:
+                    break
+                last_id = batch[-1][0]
+
+                for (image_id, name), result in processor.process_many(batch):
+                    if isinstance(result, Exception):
+                        failed += 1
+                        self.stderr.write(f"Image {image_id} ({name}): {result}")
+                        continue
+                    save_result(image_id, result)
+                    processed += 1
+
+                self.stdout.write(f"Processed {processed} images, {failed} failed...")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {processed} images in {elapsed:.2f}s; {failed} failed."
+        ))
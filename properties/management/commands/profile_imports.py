@@ -0,0 +1,78 @@
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# "import time:       412 |       1893 |     django.db.models"
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+TARGETS = {
+    'wsgi': 'mysite.wsgi',
+    'asgi': 'mysite.asgi',
+}
+
+def parse_importtime(lines):
+    """
+    Parse ``python -X importtime`` output into
+    ``(module, self_us, cumulative_us, depth)`` tuples.
+    """
+    entries = []
+    for line in lines:
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            # The first level is indented by one space, each nested level by two more
+            depth = max(len(indent) - 1, 0) // 2
+            entries.append((module, int(self_us), int(cumulative_us), depth))
+    return entries
+
+class Command(BaseCommand):
+    help = 'Profile startup imports of the WSGI/ASGI application using python -X importtime'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', choices=sorted(TARGETS), default='wsgi', help='Entry point to import.')
+        parser.add_argument('--top', type=int, default=25, help='Number of modules and packages to list.')
+        parser.add_argument(
+            '--sort',
+            choices=('self', 'cumulative'),
+            default='self',
+            help='Rank modules by their own import time or including their dependencies.',
+        )
+
+    def handle(self, *args, **options):
+        module = TARGETS[options['target']]
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'mysite.settings'))
+        # A fresh interpreter, so nothing is already imported
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+        entries = parse_importtime(result.stderr.splitlines())
+        if not entries:
+            raise CommandError('No -X importtime output was captured.')
+
+        total_us = sum(self_us for _, self_us, _, _ in entries)
+        self.stdout.write(self.style.SUCCESS(
+            f"{module}: {len(entries)} modules imported in {total_us / 1000:.1f}ms"
+        ))
+
+        key = 1 if options['sort'] == 'self' else 2
+        self.stdout.write(f"\nTop modules by {options['sort']} time:")
+        for name, self_us, cumulative_us, _ in sorted(entries, key=lambda entry: entry[key], reverse=True)[:options['top']]:
+            self.stdout.write(f"  {self_us / 1000:8.1f}ms self {cumulative_us / 1000:8.1f}ms cumulative  {name}")
+
+        packages = defaultdict(int)
+        for name, self_us, _, _ in entries:
+            packages[name.split('.')[0]] += self_us
+        self.stdout.write("\nTop packages by self time:")
+        for name, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:options['top']]:
+            self.stdout.write(f"  {self_us / 1000:8.1f}ms {100 * self_us / total_us:5.1f}%  {name}")
@@ -0,0 +1,107 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from psycopg2.extras import execute_values
+from properties.accommodation_detail import bump_detail_generation
+from properties.facets import refresh_feed_rollups
+from properties.location_resolver import MAX_DISTANCE_METERS, CityIndex
+from properties.models import PATH_SEPARATOR, Accommodation
+
+class Command(BaseCommand):
+    help = 'Reassign accommodations to the nearest city-level Location using an in-memory grid index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--feed', type=int, action='append', help='Feed to process (repeatable). Defaults to all.')
+        parser.add_argument('--country', help='Only accommodations with this country code.')
+        parser.add_argument(
+            '--max-distance',
+            type=float,
+            default=MAX_DISTANCE_METERS,
+            help='Leave accommodations farther than this many meters from every city unchanged.',
+        )
+        parser.add_argument('--batch-size', type=int, default=10000, help='Accommodations resolved and written per batch.')
+        parser.add_argument('--dry-run', action='store_true', help='Report changes without writing them.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        index = CityIndex.load()
+        self.stdout.write(f"Indexed {index.size} cities in {time.perf_counter() - started:.2f}s.")
+
+        queryset = Accommodation.objects.order_by()
+        if options['feed']:
+            queryset = queryset.filter(feed__in=options['feed'])
+        if options['country']:
+            queryset = queryset.filter(country_code=options['country'].upper())
+        rows = queryset.values_list('id', 'feed', 'center', 'location_id', 'location__path').iterator(chunk_size=options['batch_size'])
+
+        scanned = changed = unresolved = 0
+        feeds = set()
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= options['batch_size']:
+                changed_rows, missed = self._resolve(index, batch, options['max_distance'])
+                self._write(changed_rows, options['dry_run'])
+                scanned += len(batch)
+                changed += len(changed_rows)
+                unresolved += missed
+                feeds.update(feed for _, feed, _ in changed_rows)
+                batch = []
+                self.stdout.write(f"Scanned {scanned} accommodations, {changed} reassigned...")
+        if batch:
+            changed_rows, missed = self._resolve(index, batch, options['max_distance'])
+            self._write(changed_rows, options['dry_run'])
+            scanned += len(batch)
+            changed += len(changed_rows)
+            unresolved += missed
+            feeds.update(feed for _, feed, _ in changed_rows)
+
+        if not options['dry_run']:
+            # The location facet counts of touched feeds moved
+            for feed in sorted(feeds):
+                refresh_feed_rollups(feed)
+            if changed:
+                # Cached detail pages show the old location chain
+                bump_detail_generation()
+
+        elapsed = time.perf_counter() - started
+        verb = 'Would reassign' if options['dry_run'] else 'Reassigned'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {changed} of {scanned} accommodations in {elapsed:.2f}s; "
+            f"{unresolved} had no city within {options['max_distance']:.0f} m."
+        ))
+
+    @staticmethod
+    def _resolve(index, batch, max_distance):
+        """
+        ``[(id, feed, new_location_id)]`` for rows whose nearest city differs
+        from their current location, and the number of rows with no city in range.
+        Rows already placed in that city or below it (e.g. a district) keep
+        their location.
+        """
+        location_ids = index.resolve_many([(center.x, center.y) for _, _, center, _, _ in batch], max_distance)
+        changed_rows = []
+        missed = 0
+        for (accommodation_id, feed, _, current, current_path), location_id in zip(batch, location_ids):
+            if location_id is None:
+                missed += 1
+            elif location_id != current and location_id not in (current_path or '').split(PATH_SEPARATOR):
+                changed_rows.append((accommodation_id, feed, location_id))
+        return changed_rows, missed
+
+    @staticmethod
+    def _write(changed_rows, dry_run):
+        if dry_run or not changed_rows:
+            return
+        with transaction.atomic(), connection.cursor() as cursor:
+            execute_values(
+                cursor.cursor,
+                f"""
+                UPDATE {Accommodation._meta.db_table} AS a
+                SET location_id = v.location_id, updated_at = now()
+                FROM (VALUES %s) AS v (id, feed, location_id)
+                WHERE a.id = v.id AND a.feed = v.feed::smallint
+                """,
+                changed_rows,
+                page_size=len(changed_rows),
+            )
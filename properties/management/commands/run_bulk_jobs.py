@@ -0,0 +1,20 @@
+import time
+from django.core.management.base import BaseCommand
+from properties.bulk_actions import run_pending_jobs
+
+class Command(BaseCommand):
+    help = 'Run bulk admin jobs, resuming ones whose worker stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run the jobs waiting now, then exit.')
+        parser.add_argument('--poll-interval', type=float, default=5.0, help='Seconds to wait between checks for new jobs.')
+
+    def handle(self, *args, **options):
+        while True:
+            ran = run_pending_jobs()
+            if ran:
+                self.stdout.write(f"Ran {ran} bulk jobs.")
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
+        self.stdout.write(self.style.SUCCESS('No bulk jobs waiting.'))
@@ -0,0 +1,44 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0005_alter_localizeaccommodation_accommodation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='location',
+            name='path',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['path'], name='location_path_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunSQL(
+            sql="""
+            -- Backfill the materialized path for existing rows
+            WITH RECURSIVE tree (id, path, depth) AS (
+                SELECT id, id || '/', 0
+                FROM properties_location
+                WHERE parent_id IS NULL
+              UNION ALL
+                SELECT child.id, tree.path || child.id || '/', tree.depth + 1
+                FROM properties_location child
+                JOIN tree ON child.parent_id = tree.id
+            )
+            UPDATE properties_location AS location
+            SET path = tree.path, depth = tree.depth
+            FROM tree
+            WHERE location.id = tree.id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+def create_version_row(apps, schema_editor):
+    LocationTreeVersion = apps.get_model('properties', 'LocationTreeVersion')
+    LocationTreeVersion.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0006_location_path'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocationTreeVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Location tree version',
+            },
+        ),
+        migrations.RunPython(create_version_row, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0007_locationtreeversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='localizeaccommodation',
+            name='detected_language',
+            field=models.CharField(blank=True, editable=False, max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='localizeaccommodation',
+            name='detected_confidence',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='localizeaccommodation',
+            name='description_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=32, null=True),
+        ),
+    ]
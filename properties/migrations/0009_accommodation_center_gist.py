@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0008_localizeaccommodation_language_detection'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+            -- Created on the partitioned parent, so every feed partition
+            -- (current and future) gets its own GiST index
+            CREATE INDEX IF NOT EXISTS idx_accommodation_center
+                ON properties_accommodation USING GIST (center);
+            """,
+            reverse_sql="""
+            DROP INDEX IF EXISTS idx_accommodation_center;
+            """
+        )
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0009_accommodation_center_gist'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+            -- Keyset order of the search API: review_score DESC, id, feed
+            CREATE INDEX IF NOT EXISTS idx_accommodation_search_score
+                ON properties_accommodation (review_score DESC, id, feed)
+                WHERE published;
+
+            -- Same order within a country, the most common facet
+            CREATE INDEX IF NOT EXISTS idx_accommodation_search_country_score
+                ON properties_accommodation (country_code, review_score DESC, id, feed)
+                WHERE published;
+
+            -- Range facets
+            CREATE INDEX IF NOT EXISTS idx_accommodation_search_rate
+                ON properties_accommodation (usd_rate)
+                WHERE published;
+            CREATE INDEX IF NOT EXISTS idx_accommodation_search_bedrooms
+                ON properties_accommodation (bedroom_count)
+                WHERE published;
+
+            -- JSONB containment on amenities (amenities @> '["WiFi"]')
+            CREATE INDEX IF NOT EXISTS idx_accommodation_amenities
+                ON properties_accommodation USING GIN (amenities jsonb_path_ops);
+            """,
+            reverse_sql="""
+            DROP INDEX IF EXISTS idx_accommodation_search_score;
+            DROP INDEX IF EXISTS idx_accommodation_search_country_score;
+            DROP INDEX IF EXISTS idx_accommodation_search_rate;
+            DROP INDEX IF EXISTS idx_accommodation_search_bedrooms;
+            DROP INDEX IF EXISTS idx_accommodation_amenities;
+            """
+        )
+    ]
@@ -0,0 +1,57 @@
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0010_accommodation_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Amenity',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'verbose_name': 'Amenity',
+                'verbose_name_plural': 'Amenities',
+            },
+        ),
+        migrations.AddField(
+            model_name='accommodation',
+            name='amenity_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.RunSQL(
+            sql="""
+            -- Intern existing amenity strings
+            INSERT INTO properties_amenity (name)
+            SELECT DISTINCT amenity
+            FROM properties_accommodation, jsonb_array_elements_text(amenities) AS amenity
+            WHERE jsonb_typeof(amenities) = 'array'
+            ON CONFLICT (name) DO NOTHING;
+
+            UPDATE properties_accommodation a
+            SET amenity_ids = ARRAY(
+                SELECT DISTINCT am.id
+                FROM jsonb_array_elements_text(a.amenities) AS e (name)
+                JOIN properties_amenity am ON am.name = e.name
+                ORDER BY am.id
+            )
+            WHERE jsonb_typeof(a.amenities) = 'array';
+
+            -- Amenity filters now use the int array; one GIN index per partition
+            CREATE INDEX IF NOT EXISTS idx_accommodation_amenity_ids
+                ON properties_accommodation USING GIN (amenity_ids);
+            DROP INDEX IF EXISTS idx_accommodation_amenities;
+            """,
+            reverse_sql="""
+            CREATE INDEX IF NOT EXISTS idx_accommodation_amenities
+                ON properties_accommodation USING GIN (amenities jsonb_path_ops);
+            DROP INDEX IF EXISTS idx_accommodation_amenity_ids;
+            """
+        ),
+    ]
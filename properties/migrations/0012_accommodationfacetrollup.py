@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0011_amenity_accommodation_amenity_ids'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccommodationFacetRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('feed', models.PositiveSmallIntegerField()),
+                ('facet', models.CharField(choices=[('country', 'Country'), ('location', 'Location'), ('bedrooms', 'Bedrooms'), ('amenity', 'Amenity')], max_length=20)),
+                ('key', models.CharField(max_length=100)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Accommodation facet rollup',
+                'indexes': [models.Index(fields=['facet', 'key'], name='facet_rollup_facet_key_idx')],
+                'constraints': [models.UniqueConstraint(fields=('feed', 'facet', 'key'), name='unique_facet_rollup_feed_facet_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+import django.contrib.postgres.search
+from django.db import migrations, models
+from django.db.models.expressions import RawSQL
+
+SEARCH_VECTOR_SQL = (
+    "to_tsvector(CASE language WHEN 'en' THEN 'english'::regconfig WHEN 'ar' THEN 'simple'::regconfig "
+    "WHEN 'fr' THEN 'french'::regconfig WHEN 'de' THEN 'german'::regconfig ELSE 'simple'::regconfig END, "
+    "coalesce(description, ''))"
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0015_imageblob'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=f"""
+            -- Added on the partitioned parent, so every language partition
+            -- (including ones created later) gets the column
+            ALTER TABLE properties_localizeaccommodation
+                ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED;
+
+            -- Partitioned index: one GIN index per language partition
+            CREATE INDEX IF NOT EXISTS idx_localize_search_vector
+                ON properties_localizeaccommodation USING GIN (search_vector);
+            """,
+            reverse_sql="""
+            DROP INDEX IF EXISTS idx_localize_search_vector;
+            ALTER TABLE properties_localizeaccommodation DROP COLUMN IF EXISTS search_vector;
+            """,
+            state_operations=[
+                migrations.AddField(
+                    model_name='localizeaccommodation',
+                    name='search_vector',
+                    field=models.GeneratedField(
+                        db_persist=True,
+                        expression=RawSQL(SEARCH_VECTOR_SQL, ()),
+                        output_field=django.contrib.postgres.search.SearchVectorField(),
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -1,14 +1,70 @@
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models import F, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Concat, Substr
 from django.contrib.gis.db import models as geomodels
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
-from django.utils.text import slugify
-from uuid import uuid4
 import os
-from langdetect import detect, DetectorFactory
-from langdetect.lang_detect_exception import LangDetectException
-# Set seed for consistent results
-DetectorFactory.seed = 0
+from .language_detection import detect_language, search_vector_sql
+from .storage import blob_name, content_digest, image_storage
+
+# Separator between ancestor ids in Location.path
+PATH_SEPARATOR = '/'
+
+class LocationQuerySet(models.QuerySet):
+    """
+    Hierarchy lookups backed by the materialized ``path`` column.
+    """
+
+    def descendants(self, location, include_self=False):
+        """
+        All locations below ``location`` in a single prefix scan on ``path``.
+        """
+        qs = self.filter(path__startswith=location.path)
+        if not include_self:
+            qs = qs.exclude(pk=location.pk)
+        return qs
+
+    def ancestors(self, location, include_self=False):
+        """
+        All locations above ``location``, root first, resolved by primary key.
+        """
+        ids = location.path_ids()
+        if not include_self:
+            ids = ids[:-1]
+        return self.filter(pk__in=ids).order_by('depth')
+
+    def rebuild_paths(self):
+        """
+        Recompute ``path``/``depth`` for the whole table with one recursive
+        set-based UPDATE. Moved rows get a new ``updated_at``, since their
+        sitemap URLs change. Returns the number of rows that changed.
+        """
+        table = self.model._meta.db_table
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH RECURSIVE tree (id, path, depth) AS (
+                    SELECT id, id || %s, 0
+                    FROM {table}
+                    WHERE parent_id IS NULL
+                  UNION ALL
+                    SELECT child.id, tree.path || child.id || %s, tree.depth + 1
+                    FROM {table} child
+                    JOIN tree ON child.parent_id = tree.id
+                )
+                UPDATE {table} AS location
+                SET path = tree.path, depth = tree.depth, updated_at = now()
+                FROM tree
+                WHERE location.id = tree.id
+                  AND (location.path IS DISTINCT FROM tree.path OR location.depth IS DISTINCT FROM tree.depth)
+                """,
+                [PATH_SEPARATOR, PATH_SEPARATOR],
+            )
+            return cursor.rowcount
 
 class Location(models.Model):
     """
@@ -32,16 +88,77 @@ class Location(models.Model):
     country_code = models.CharField(max_length=2)  # ISO country code
     state_abbr = models.CharField(max_length=3, null=True, blank=True)  # State abbreviation
     city = models.CharField(max_length=30, null=True, blank=True)  # City name
+    path = models.CharField(max_length=255, default='', editable=False)  # Materialized path of ancestor ids, e.g. "US/US_NY/US_NY_NYC/"
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)  # Number of ancestors
     created_at = models.DateTimeField(auto_now_add=True)  # Creation timestamp
     updated_at = models.DateTimeField(auto_now=True)  # Last update timestamp
 
+    objects = LocationQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Location"
         verbose_name_plural = "Locations"
+        indexes = [
+            # varchar_pattern_ops lets "path LIKE 'prefix%'" use the index regardless of collation
+            models.Index(fields=['path'], name='location_path_idx', opclasses=['varchar_pattern_ops']),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.location_type})"
 
+    def path_ids(self):
+        """
+        Ids on the path from the root down to this location.
+        """
+        return [part for part in self.path.split(PATH_SEPARATOR) if part]
+
+    def descendants(self, include_self=False):
+        return Location.objects.descendants(self, include_self=include_self)
+
+    def ancestors(self, include_self=False):
+        return Location.objects.ancestors(self, include_self=include_self)
+
+    def save(self, *args, **kwargs):
+        """
+        Keep ``path``/``depth`` in sync with ``parent`` and, on reparent,
+        rewrite the whole subtree with a single UPDATE.
+        """
+        old_path = self.path
+        if self.parent_id:
+            parent_path = Location.objects.filter(pk=self.parent_id).values_list('path', flat=True).first()
+            if not parent_path:
+                parent_path = f"{self.parent_id}{PATH_SEPARATOR}"
+        else:
+            parent_path = ''
+        self.path = f"{parent_path}{self.pk}{PATH_SEPARATOR}"
+        self.depth = self.path.count(PATH_SEPARATOR) - 1
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'parent' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'path', 'depth'}
+
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            if old_path and old_path != self.path:
+                depth_delta = self.depth - (old_path.count(PATH_SEPARATOR) - 1)
+                Location.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                    path=Concat(Value(self.path), Substr('path', len(old_path) + 1)),
+                    depth=F('depth') + depth_delta,
+                )
+
+class LocationTreeVersion(models.Model):
+    """
+    Single-row counter bumped whenever a Location changes. Worker processes
+    compare it with the version of their cached tree to detect staleness.
+    """
+    version = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Location tree version"
+
+    def __str__(self):
+        return f"Location tree v{self.version}"
+
 def validate_amenities(value):
     """
     Custom validator to ensure each amenity in the JSON array is a string
@@ -55,6 +172,89 @@ def validate_amenities(value):
         if len(amenity) > 100:
             raise ValidationError(f"Amenity '{amenity}' exceeds 100 characters.")
 
+class AmenityManager(models.Manager):
+    """
+    Interns amenity strings to small integer ids, with a process-local cache
+    so repeated names resolve without a query.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._ids = {}
+        self._names = {}
+
+    def clear_cache(self):
+        self._ids = {}
+        self._names = {}
+
+    def _remember(self, pairs):
+        """
+        Cache ``(id, name)`` pairs, but only once they are known to be
+        committed: inside a transaction the rows may still roll back.
+        """
+        def store():
+            for amenity_id, name in pairs:
+                self._ids[name] = amenity_id
+                self._names[amenity_id] = name
+
+        if transaction.get_connection(self.db).in_atomic_block:
+            transaction.on_commit(store, using=self.db)
+        else:
+            store()
+
+    def ids_for(self, names, create=False):
+        """
+        Map names to ids (sorted, de-duplicated). Unknown names are created
+        when ``create`` is true and skipped otherwise.
+        """
+        names = set(names)
+        found = {name: self._ids[name] for name in names if name in self._ids}
+        missing = [name for name in names if name not in found]
+        if missing:
+            if create:
+                self.bulk_create([self.model(name=name) for name in missing], ignore_conflicts=True)
+            pairs = list(self.filter(name__in=missing).values_list('id', 'name'))
+            self._remember(pairs)
+            found.update((name, amenity_id) for amenity_id, name in pairs)
+        return sorted(found.values())
+
+    def names_for(self, ids):
+        """
+        Map ids back to names; returns a dict.
+        """
+        found = {amenity_id: self._names[amenity_id] for amenity_id in ids if amenity_id in self._names}
+        missing = [amenity_id for amenity_id in ids if amenity_id not in found]
+        if missing:
+            pairs = list(self.filter(id__in=missing).values_list('id', 'name'))
+            self._remember(pairs)
+            found.update(pairs)
+        return found
+
+class Amenity(models.Model):
+    """
+    Dictionary of amenity strings; accommodations reference them by id.
+    """
+    id = models.AutoField(primary_key=True)
+    name = models.CharField(max_length=100, unique=True)
+
+    objects = AmenityManager()
+
+    class Meta:
+        verbose_name = "Amenity"
+        verbose_name_plural = "Amenities"
+
+    def __str__(self):
+        return self.name
+
+class AccommodationQuerySet(models.QuerySet):
+
+    def in_location_subtree(self, location):
+        """
+        Accommodations located in ``location`` or anywhere below it,
+        resolved with one join against the indexed Location path.
+        """
+        return self.filter(location__path__startswith=location.path)
+
 class Accommodation(models.Model):
     """
     Accommodation model to store details of various properties.
@@ -76,11 +276,14 @@ class Accommodation(models.Model):
         blank=True, 
         validators=[validate_amenities]
     )
+    amenity_ids = ArrayField(models.IntegerField(), default=list, blank=True, editable=False)  # Interned Amenity ids, GIN indexed
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)  # ForeignKey to Django's auth_user
     published = models.BooleanField(default=False)  # Boolean to indicate if the accommodation is published
     created_at = models.DateTimeField(auto_now_add=True)  # Creation timestamp
     updated_at = models.DateTimeField(auto_now=True)  # Last update timestamp
 
+    objects = AccommodationQuerySet.as_manager()
+
     # Make id and feed together form the primary key
     class Meta:
         constraints = [
@@ -88,20 +291,137 @@ class Accommodation(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.title} - {self.location.title}"
+        # Location title from the cached tree, so listing rows never queries Location
+        from .location_tree import get_location_tree
+        node = get_location_tree().get(self.location_id)
+        return f"{self.title} - {node.title if node else self.location_id}"
+
+    def location_label(self):
+        """
+        Location chain from the root down, e.g. "United States / New York /
+        New York City", read from the cached Location tree.
+        """
+        from .location_tree import get_location_tree
+        titles = [title for _, title in get_location_tree().breadcrumbs(self.location_id)]
+        return ' / '.join(titles) or self.location_id
+
+    def save(self, *args, **kwargs):
+        """
+        Keep ``amenity_ids`` in sync with the free-form ``amenities`` list.
+        """
+        amenities = self.amenities if isinstance(self.amenities, list) else []
+        self.amenity_ids = Amenity.objects.ids_for(amenities, create=True)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'amenities' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'amenity_ids'}
+        super().save(*args, **kwargs)
+
+class AccommodationFacetRollup(models.Model):
+    """
+    Pre-aggregated count of published accommodations per feed and facet value.
+    Summing over feeds gives the facet counts shown next to search results.
+    """
+    FACET_CHOICES = [
+        ('country', 'Country'),
+        ('location', 'Location'),
+        ('bedrooms', 'Bedrooms'),
+        ('amenity', 'Amenity'),
+    ]
+
+    feed = models.PositiveSmallIntegerField()  # Feed the counts belong to
+    facet = models.CharField(max_length=20, choices=FACET_CHOICES)  # Facet name
+    key = models.CharField(max_length=100)  # Facet value (country code, location id, bedroom bucket, amenity id)
+    count = models.IntegerField(default=0)  # Number of published accommodations
+
+    class Meta:
+        verbose_name = "Accommodation facet rollup"
+        constraints = [
+            models.UniqueConstraint(fields=['feed', 'facet', 'key'], name='unique_facet_rollup_feed_facet_key')
+        ]
+        indexes = [
+            models.Index(fields=['facet', 'key'], name='facet_rollup_facet_key_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.facet}={self.key} (feed {self.feed}): {self.count}"
+
+class ImageBlobManager(models.Manager):
+    def acquire(self, digest, name, size):
+        """
+        Take a reference to the blob with this digest, recording it on first use.
+        One upsert, so concurrent uploads of the same content agree on one row.
+        """
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {self.model._meta.db_table} AS b (sha256, name, size, ref_count, created_at)
+                VALUES (%s, %s, %s, 1, now())
+                ON CONFLICT (sha256) DO UPDATE SET ref_count = b.ref_count + 1
+                """,
+                [digest, name, size],
+            )
+        return self.get(pk=digest)
+
+    def release(self, digest, variants=None):
+        """
+        Drop a reference; the last one deletes the row and, after commit, the
+        file and its resized ``variants`` (which are named after the blob).
+        """
+        self.filter(pk=digest).update(ref_count=F('ref_count') - 1)
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {self.model._meta.db_table} WHERE sha256 = %s AND ref_count <= 0 RETURNING name",
+                [digest],
+            )
+            row = cursor.fetchone()
+        if row is not None:
+            transaction.on_commit(lambda: self._delete_file(digest, row[0], variants), using=self.db)
+
+    def lock(self, digest):
+        """
+        Serialize uploads and deletions of one digest's file until the
+        transaction ends, so a file is never deleted after an upload decided
+        not to write it because it already existed.
+        """
+        with connections[self.db].cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [f"image-blob:{digest}"])
+
+    def _delete_file(self, digest, name, variants):
+        from .images import delete_variants
+
+        with transaction.atomic(using=self.db):
+            self.lock(digest)
+            # The same content may have been uploaded again in the meantime
+            if not self.filter(pk=digest).exists():
+                image_storage().delete(name)
+                delete_variants(variants)
+
+class ImageBlob(models.Model):
+    """
+    A stored image file identified by the SHA-256 of its content, shared by
+    every AccommodationImage with identical bytes.
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)  # Hex digest of the content
+    name = models.CharField(max_length=255, unique=True)  # Storage name of the file
+    size = models.PositiveBigIntegerField()  # Size in bytes
+    ref_count = models.PositiveIntegerField(default=0)  # Number of AccommodationImage rows using it
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ImageBlobManager()
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} references)"
 
 def upload_accommodation_image(instance, filename):
     """
     Custom upload handler for accommodation images.
-    Renames the file to a slugified version with a unique identifier.
+    Names the file after the SHA-256 of its content, so identical uploads
+    map to a single stored file.
     """
-    ext = os.path.splitext(filename)[1].lower()
-    unique_id = uuid4().hex[:8]
-    slugified_name = slugify(os.path.splitext(filename)[0])
-    new_filename = f"{slugified_name}-{unique_id}{ext}"
-    upload_path = "accommodations/images/"
-    upload_path = f"accommodations/{instance.accommodation.id}/images/"
-    return os.path.join(upload_path, new_filename)
+    digest = getattr(instance, '_content_hash', None)
+    if digest is None:
+        digest, _ = content_digest(instance.image)
+    return blob_name(digest, os.path.splitext(filename)[1])
 
 class AccommodationImage(models.Model):
     accommodation = models.ForeignKey(
@@ -109,12 +429,57 @@ class AccommodationImage(models.Model):
         on_delete=models.CASCADE,
         related_name='accommodation_images'
     )
-    image = models.ImageField(upload_to=upload_accommodation_image)  # Use custom upload function
+    image = models.ImageField(upload_to=upload_accommodation_image, storage=image_storage)  # Use custom upload function
+    blob = models.ForeignKey(ImageBlob, on_delete=models.PROTECT, null=True, blank=True, editable=False, related_name='images')  # Shared stored file
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)  # Original width in pixels
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)  # Original height in pixels
+    variants = models.JSONField(default=dict, blank=True, editable=False)  # {format: {width: storage name}}
+    placeholder = models.TextField(blank=True, editable=False)  # Tiny blurred preview as a data URI
+    processed_at = models.DateTimeField(null=True, blank=True, db_index=True, editable=False)  # Set once variants exist
 
     def __str__(self):
         return f"Image for {self.accommodation.title}"
 
+    def save(self, *args, **kwargs):
+        """
+        New uploads are hashed while streaming and linked to the blob with the
+        same content; the file itself is only written if no such blob exists.
+        """
+        if not self.image or self.image._committed:
+            return super().save(*args, **kwargs)
+
+        digest, size = content_digest(self.image)
+        self._content_hash = digest
+        # Variants of a replaced image are stale
+        self.processed_at = None
+        self.variants = {}
+        self.placeholder = ''
+        name = upload_accommodation_image(self, self.image.name)
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = AccommodationImage.objects.filter(pk=self.pk).values_list('blob_id', 'variants').first()
+            # Held until commit, so a concurrent release cannot delete the
+            # file that storage skips writing because it already exists
+            ImageBlob.objects.lock(digest)
+            self.blob = ImageBlob.objects.acquire(digest, name, size)
+            super().save(*args, **kwargs)
+            if previous and previous[0]:
+                ImageBlob.objects.release(*previous)
+
+    def srcset(self, image_format='webp'):
+        """
+        ``srcset`` attribute value for the resized variants of one format.
+        """
+        from django.core.files.storage import default_storage
+
+        variants = self.variants.get(image_format, {})
+        return ', '.join(
+            f"{default_storage.url(name)} {width}w"
+            for width, name in sorted(variants.items(), key=lambda item: int(item[0]))
+        )
+
 class LocalizeAccommodation(models.Model):
     """
     Localized details for Accommodation, supporting multiple languages.
@@ -124,6 +489,14 @@ class LocalizeAccommodation(models.Model):
     language = models.CharField(max_length=2)  # Language code (ISO 639-1, e.g., 'en', 'ar')
     description = models.TextField()  # Localized description
     policy = models.JSONField(null=True, blank=True)  # JSON field for policies
+    detected_language = models.CharField(max_length=10, null=True, blank=True, editable=False)  # Language detected from the description
+    detected_confidence = models.FloatField(null=True, blank=True, editable=False)  # Detector probability (0-1)
+    description_hash = models.CharField(max_length=32, null=True, blank=True, db_index=True, editable=False)  # md5 of the description that was detected
+    search_vector = models.GeneratedField(  # Description lexemes, stemmed with the language's text search config
+        expression=RawSQL(search_vector_sql(), ()),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
 
     class Meta:
         unique_together = ('accommodation', 'language')
@@ -137,12 +510,63 @@ class LocalizeAccommodation(models.Model):
         """
         Detect the language of the description field.
         """
-        try:
-            detected_lang = detect(self.description)
-            return detected_lang
-        except LangDetectException:
-            return "unknown"
+        detected_lang, _ = detect_language(self.description)
+        return detected_lang
+
+    @property
+    def language_mismatch(self):
+        """
+        True when a stored detection disagrees with the declared language.
+        """
+        return self.detected_language not in (None, 'unknown', self.language)
+
+
+
+  
+class BulkJob(models.Model):
+    """
+    A set-based admin action over many accommodations, run by the
+    ``run_bulk_jobs`` worker one feed partition at a time, with its progress.
+    """
+    ACTION_CHOICES = [
+        ('publish', 'Publish'),
+        ('unpublish', 'Unpublish'),
+        ('reassign_user', 'Reassign user'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
 
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)  # Admin action that created the job
+    changes = models.JSONField(default=dict)  # Column values written by the UPDATE
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    partitions_total = models.PositiveIntegerField(default=0)  # Feed partitions to update
+    partitions_done = models.PositiveIntegerField(default=0)  # Feed partitions already updated
+    rows_updated = models.PositiveBigIntegerField(default=0)  # Rows changed so far
+    error = models.TextField(blank=True)  # Failure reason, if any
+    selection = models.JSONField(null=True, editable=False)  # Selected accommodation ids by feed
+    attempts = models.PositiveIntegerField(default=0)  # Times a worker started the job; more than one means it was resumed
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='bulk_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        ordering = ['-created_at']
 
-  
\ No newline at end of file
+    def __str__(self):
+        return f"{self.get_action_display()} #{self.pk} ({self.status})"
+
+    @property
+    def progress(self):
+        """
+        Share of partitions processed, between 0 and 1.
+        """
+        if self.status == 'done':
+            return 1.0
+        if not self.partitions_total:
+            return 0.0
+        return self.partitions_done / self.partitions_total
@@ -0,0 +1,140 @@
+import base64
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import ValidationError
+
+# Below this many (estimated) rows the admin paginator counts exactly
+EXACT_COUNT_THRESHOLD = getattr(settings, 'ADMIN_EXACT_COUNT_THRESHOLD', 10000)
+
+
+def encode_cursor(values):
+    """
+    Opaque, URL-safe token for the sort key of the last row on a page.
+    """
+    payload = json.dumps([str(value) if isinstance(value, Decimal) else value for value in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, fields):
+    """
+    Inverse of ``encode_cursor``, checking each value against the model
+    field of its ordering column; raises a DRF ``ValidationError`` on bad input.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise ValidationError({'cursor': 'Invalid cursor.'})
+    if not isinstance(values, list) or len(values) != len(fields):
+        raise ValidationError({'cursor': 'Invalid cursor.'})
+    cleaned = []
+    for field, value in zip(fields, values):
+        if value is None or isinstance(value, (bool, list, dict)):
+            raise ValidationError({'cursor': 'Invalid cursor.'})
+        try:
+            cleaned.append(field.clean(value, None))
+        except DjangoValidationError:
+            raise ValidationError({'cursor': 'Invalid cursor.'})
+    return cleaned
+
+
+def ordering_fields(queryset, ordering):
+    """
+    Model fields (or annotation output fields) of the ordering columns.
+    """
+    annotations = queryset.query.annotations
+    return [
+        annotations[name].output_field if name in annotations else queryset.model._meta.get_field(name)
+        for name, _ in ordering
+    ]
+
+
+def keyset_filter(ordering, values):
+    """
+    Build the "rows after this sort key" condition for keyset pagination.
+
+    ``ordering`` is a sequence of ``(field, descending)`` pairs and ``values``
+    the sort key of the last row seen. Expands the row comparison
+    ``(a, b, c) > (x, y, z)`` into ``a > x OR (a = x AND b > y) OR ...`` so
+    mixed sort directions work.
+    """
+    condition = Q()
+    equal = Q()
+    for (field, descending), value in zip(ordering, values):
+        lookup = 'lt' if descending else 'gt'
+        condition |= equal & Q(**{f"{field}__{lookup}": value})
+        equal &= Q(**{field: value})
+    return condition
+
+
+def order_by_fields(ordering):
+    return [f"-{field}" if descending else field for field, descending in ordering]
+
+
+def paginate_keyset(queryset, ordering, limit, cursor=None):
+    """
+    Return ``(rows, next_cursor)`` for one page of ``queryset`` ordered by
+    ``ordering``. Fetches one extra row to know whether another page exists.
+    """
+    if cursor:
+        values = decode_cursor(cursor, ordering_fields(queryset, ordering))
+        queryset = queryset.filter(keyset_filter(ordering, values))
+    rows = list(queryset.order_by(*order_by_fields(ordering))[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, field) for field, _ in ordering])
+    return rows, next_cursor
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for very large tables. The total comes from planner statistics,
+    ``pg_class.reltuples`` summed over partitions when unfiltered or the
+    EXPLAIN row estimate when filtered, and ``COUNT(*)`` only runs when the
+    estimate is below ``EXACT_COUNT_THRESHOLD`` or unavailable.
+    """
+    exact_count_threshold = EXACT_COUNT_THRESHOLD
+
+    @cached_property
+    def count(self):
+        estimate = self.estimated_count()
+        if estimate is None or estimate < self.exact_count_threshold:
+            return super().count
+        return estimate
+
+    def estimated_count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return None
+        with connections[queryset.db].cursor() as cursor:
+            if not queryset.query.where:
+                table = queryset.model._meta.db_table
+                # Partitioned parents carry no statistics of their own
+                cursor.execute(
+                    """
+                    SELECT SUM(reltuples), bool_or(reltuples < 0)
+                    FROM pg_class
+                    WHERE relkind <> 'p'
+                      AND (oid = %s::regclass
+                           OR oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = %s::regclass))
+                    """,
+                    [table, table],
+                )
+                total, unanalyzed = cursor.fetchone()
+                return None if total is None or unanalyzed else int(total)
+
+            sql, params = queryset.order_by().query.sql_with_params()
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
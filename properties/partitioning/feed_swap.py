@@ -0,0 +1,227 @@
+import re
+from uuid import uuid4
+
+from django.db import connection, transaction
+
+from properties.ingestion import STAGING_TABLE, UPSERT_COLUMNS
+from properties.models import Accommodation
+
+from .partition_manager import feed_range_bound, get_registry
+
+INDEX_DEF_RE = re.compile(r"^CREATE (UNIQUE )?INDEX \S+ ON ONLY \S+ ")
+
+# Postgres truncates identifiers longer than this
+MAX_IDENTIFIER_LENGTH = 63
+
+
+def _identifier(name):
+    return name[:MAX_IDENTIFIER_LENGTH]
+
+
+class FeedPartitionSwap:
+    """
+    Replaces the contents of one feed by building its range partition off to
+    the side and swapping it in with ``DETACH``/``ATTACH``.
+
+    :meth:`build` loads, indexes, constrains and analyses the replacement
+    table from the ingestion staging table. It must run inside the ingestion
+    transaction, takes no lock on the parent and copies rows of other feeds
+    that share the range without blocking anyone. Once that transaction has
+    committed, :meth:`swap` runs its own short transaction: the old partition
+    is locked in ``SHARE`` mode (within ``lock_timeout``), sibling rows written
+    since the copy are caught up and the partitions are exchanged.
+
+    ``DETACH`` takes an ``ACCESS EXCLUSIVE`` lock on the parent that is held
+    until commit, so reads of the whole table wait for the catch-up and the
+    catalog swap, but nothing else. Derived data such as the facet rollups
+    must be refreshed after :meth:`swap` returns, not inside it.
+    """
+
+    def __init__(self, cursor, feed, lock_timeout='5s', keep_old=False):
+        self.cursor = cursor
+        self.feed = feed
+        self.lock_timeout = lock_timeout
+        self.keep_old = keep_old
+        self.parent = Accommodation._meta.db_table
+        self.built = None
+
+    def find_partition(self):
+        """
+        Return ``(table, lower, upper)`` of the range partition holding the feed,
+        carving one out of the default partition if necessary.
+        """
+        found = get_registry().feed_partition(self.feed, create=True)
+        if found is None:
+            raise ValueError(f"No feed range partition could be created for feed {self.feed}")
+        lower, upper, table = found
+        return table, lower, upper
+
+    def _columns(self):
+        self.cursor.execute(
+            """
+            SELECT attname FROM pg_attribute
+            WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+            ORDER BY attnum
+            """,
+            [self.parent],
+        )
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def _build(self, old, new, lower, upper):
+        cursor = self.cursor
+        cursor.execute(f"CREATE TABLE {new} (LIKE {self.parent} INCLUDING DEFAULTS)")
+
+        if self._has_siblings(lower, upper):
+            # Keep sibling feeds of the same range; later writes are caught up in _swap
+            columns = ', '.join(self._columns())
+            cursor.execute(
+                f"INSERT INTO {new} ({columns}) SELECT {columns} FROM {old} WHERE feed <> %s",
+                [self.feed],
+            )
+
+        columns = ', '.join(UPSERT_COLUMNS)
+        snapshot_columns = ', '.join(f"s.{column}" for column in UPSERT_COLUMNS)
+        cursor.execute(
+            f"""
+            INSERT INTO {new} (id, feed, {columns}, created_at, updated_at)
+            SELECT DISTINCT ON (s.id) s.id, s.feed, {snapshot_columns},
+                   COALESCE(o.created_at, now()), now()
+            FROM {STAGING_TABLE} s
+            LEFT JOIN {old} o ON o.id = s.id AND o.feed = s.feed
+            ORDER BY s.id, s.line DESC
+            """
+        )
+        loaded = cursor.rowcount
+
+        self._copy_constraints_and_indexes(new)
+        # Lets ATTACH skip the validation scan of the new table
+        cursor.execute(
+            f"ALTER TABLE {new} ADD CONSTRAINT {_identifier(new + '_bound')} "
+            f"CHECK (feed IS NOT NULL AND feed >= {lower:d} AND feed < {upper:d})"
+        )
+        cursor.execute(f"ANALYZE {new}")
+        return loaded
+
+    def _has_siblings(self, lower, upper):
+        return (lower, upper) != (self.feed, self.feed + 1)
+
+    def _catch_up_siblings(self, old, new):
+        """
+        Re-sync sibling rows that were inserted, changed or deleted in the old
+        partition since they were copied. Must run with its writers blocked.
+        """
+        cursor = self.cursor
+        columns = self._columns()
+        column_list = ', '.join(columns)
+        old_row = ', '.join(f"o.{column}" for column in columns)
+        new_row = ', '.join(f"n.{column}" for column in columns)
+        cursor.execute(
+            f"""
+            DELETE FROM {new} n
+            WHERE n.feed <> %s AND NOT EXISTS (
+                SELECT 1 FROM {old} o
+                WHERE o.id = n.id AND o.feed = n.feed AND ROW({old_row}) IS NOT DISTINCT FROM ROW({new_row})
+            )
+            """,
+            [self.feed],
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO {new} ({column_list})
+            SELECT {old_row} FROM {old} o
+            WHERE o.feed <> %s AND NOT EXISTS (SELECT 1 FROM {new} n WHERE n.id = o.id AND n.feed = o.feed)
+            """,
+            [self.feed],
+        )
+
+    def _copy_constraints_and_indexes(self, new):
+        """
+        Recreate the parent's keys, foreign keys and indexes on the new table
+        so ATTACH adopts them instead of building anything under lock.
+        """
+        cursor = self.cursor
+        cursor.execute(
+            """
+            SELECT conname, contype, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'f')
+            ORDER BY contype DESC
+            """,
+            [self.parent],
+        )
+        for number, (name, _, definition) in enumerate(cursor.fetchall()):
+            cursor.execute(
+                f"ALTER TABLE {new} ADD CONSTRAINT {_identifier(f'{new}_c{number}')} {definition}"
+            )
+
+        cursor.execute(
+            """
+            SELECT pg_get_indexdef(i.indexrelid)
+            FROM pg_index i
+            WHERE i.indrelid = %s::regclass
+              AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+            """,
+            [self.parent],
+        )
+        for number, (definition,) in enumerate(cursor.fetchall()):
+            match = INDEX_DEF_RE.match(definition)
+            if not match:
+                continue
+            name = _identifier(f'{new}_i{number}')
+            cursor.execute(INDEX_DEF_RE.sub(f"CREATE {match.group(1) or ''}INDEX {name} ON {new} ", definition))
+
+    def _swap(self, old, new, lower, upper):
+        """
+        Exchange the partitions; the only step that needs a strong lock on the parent.
+        """
+        cursor = self.cursor
+        retired = _identifier(f"{old}_retired")
+        cursor.execute("SET LOCAL lock_timeout = %s", [self.lock_timeout])
+        if self._has_siblings(lower, upper):
+            cursor.execute(f"LOCK TABLE {old} IN SHARE MODE")
+            self._catch_up_siblings(old, new)
+        cursor.execute(f"ALTER TABLE {self.parent} DETACH PARTITION {old}")
+        cursor.execute(f"DROP TABLE IF EXISTS {retired}")
+        cursor.execute(f"ALTER TABLE {old} RENAME TO {retired}")
+        cursor.execute(f"ALTER TABLE {new} RENAME TO {old}")
+        cursor.execute(
+            f"ALTER TABLE {self.parent} ATTACH PARTITION {old} {feed_range_bound(lower, upper)}"
+        )
+        cursor.execute(f"ALTER TABLE {old} DROP CONSTRAINT {_identifier(new + '_bound')}")
+        return retired
+
+    def build(self):
+        """
+        Build the replacement partition from the staging table. Returns the
+        number of feed rows loaded.
+        """
+        old, lower, upper = self.find_partition()
+        # Index and constraint names derive from this, so it must be unique per run
+        new = _identifier(f"{old}_{uuid4().hex[:8]}")
+        loaded = self._build(old, new, lower, upper)
+        self.built = (old, new, lower, upper)
+        return loaded
+
+    def swap(self):
+        """
+        Swap the built partition in, in a transaction of its own, and return
+        its name. The built table is dropped if the swap fails.
+        """
+        if self.built is None:
+            raise ValueError("build() must run before swap()")
+        old, new, lower, upper = self.built
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                self.cursor = cursor
+                retired = self._swap(old, new, lower, upper)
+        except Exception:
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {new}")
+            raise
+        finally:
+            self.built = None
+        if not self.keep_old:
+            # Detached already, so dropping it no longer holds up the parent
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE {retired}")
+        return old
@@ -1,27 +1,395 @@
-from django.db import connections
+import json
+import re
+import threading
+import time
+from collections import defaultdict
 
-PARTITION_TABLES = {
-    'en': 'localize_accommodation_en',
-    'ar': 'localize_accommodation_ar',
-    'fr': 'localize_accommodation_fr',
-    'de': 'localize_accommodation_de',
-}
+from django.conf import settings
+from django.db import connections, transaction
+from psycopg2.extras import Json, execute_values
 
-def insert_into_partition(instance):
+ACCOMMODATION_TABLE = 'properties_accommodation'
+LOCALIZE_TABLE = 'properties_localizeaccommodation'
+
+# Width of feed ranges created on demand, aligned to multiples of this size
+FEED_PARTITION_SIZE = getattr(settings, 'FEED_PARTITION_SIZE', 1000)
+
+# Range bounds must be valid values of the SMALLINT feed column, so a range
+# ending past SMALLINT_MAX is written as ``TO (MAXVALUE)`` and kept in memory
+# with this exclusive upper bound
+SMALLINT_MAX = 32767
+FEED_UPPER_LIMIT = SMALLINT_MAX + 1
+
+RANGE_BOUND_RE = re.compile(r"FOR VALUES FROM \('?(-?\d+)'?\) TO \((?:'?(-?\d+)'?|MAXVALUE)\)")
+LIST_BOUND_RE = re.compile(r"FOR VALUES IN \((.*)\)")
+LANGUAGE_RE = re.compile(r"^[a-z]{2}$")
+
+
+def _list_values(bound):
+    return [value.strip().strip("'").strip() for value in bound.split(',')]
+
+
+def feed_range_bound(lower, upper):
     """
-    Insert the instance into the correct partition based on the language.
+    ``FOR VALUES`` clause of the feed range partition ``[lower, upper)``.
     """
-    language = instance.language
-    table_name = PARTITION_TABLES.get(language)
+    upper_sql = 'MAXVALUE' if upper >= FEED_UPPER_LIMIT else f"{upper:d}"
+    return f"FOR VALUES FROM ({lower:d}) TO ({upper_sql})"
+
+
+class PartitionRegistry:
+    """
+    In-process view of the partitions that actually exist, discovered from
+    ``pg_inherits``/``pg_class``.
+
+    Lookups are served from memory. A miss refreshes the cache once (another
+    process may have created the partition) and, when asked to, creates the
+    partition under a transaction-scoped advisory lock.
+
+    Partitions created inside a caller's transaction only exist once it
+    commits, so a cache filled by that transaction is provisional and is
+    re-read by any lookup made outside of it or after it rolled back.
+    """
+
+    def __init__(self, using='default'):
+        self.using = using
+        self._lock = threading.Lock()
+        self._languages = None
+        self._feed_ranges = None
+        self._feed_default = None
+        # on_commit callback of the transaction whose uncommitted view is cached
+        self._provisional = None
+
+    def _pending_commit(self):
+        """
+        The latest on_commit callback of this registry still queued on the
+        current connection, i.e. the last partition this transaction created
+        (Django drops the callback if its savepoint rolls back).
+        """
+        connection = connections[self.using]
+        if not connection.in_atomic_block:
+            return None
+        for _, func, _ in reversed(connection.run_on_commit):
+            if getattr(func, 'partition_registry', None) is self:
+                return func
+        return None
+
+    def _fetch(self, cursor, parent):
+        cursor.execute(
+            """
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = %s::regclass
+            """,
+            [parent],
+        )
+        return cursor.fetchall()
+
+    def refresh(self):
+        """
+        Reload partition names and bounds from the catalog.
+        """
+        languages = {}
+        feed_ranges = []
+        feed_default = None
+        provisional = self._pending_commit()
+        with connections[self.using].cursor() as cursor:
+            for table, bound in self._fetch(cursor, LOCALIZE_TABLE):
+                match = LIST_BOUND_RE.search(bound)
+                if match:
+                    for language in _list_values(match.group(1)):
+                        languages[language] = table
+            for table, bound in self._fetch(cursor, ACCOMMODATION_TABLE):
+                match = RANGE_BOUND_RE.search(bound)
+                if match:
+                    upper = int(match.group(2)) if match.group(2) is not None else FEED_UPPER_LIMIT
+                    feed_ranges.append((int(match.group(1)), upper, table))
+                elif bound == 'DEFAULT':
+                    feed_default = table
+        feed_ranges.sort()
+        with self._lock:
+            self._languages = languages
+            self._feed_ranges = feed_ranges
+            self._feed_default = feed_default
+            self._provisional = provisional
+
+    def clear(self):
+        """
+        Forget cached partitions; the next lookup re-reads the catalog.
+        """
+        with self._lock:
+            self._languages = None
+            self._feed_ranges = None
+            self._feed_default = None
+            self._provisional = None
+
+    def _ensure_loaded(self):
+        if self._languages is None:
+            self.refresh()
+        elif self._provisional is not None and self._pending_commit() is not self._provisional:
+            # Read outside the transaction that created a partition, or after its rollback
+            self.refresh()
+
+    def _created(self):
+        """
+        Publish a partition created by this connection: right away in
+        autocommit, otherwise provisionally until the transaction commits.
+        """
+        if connections[self.using].in_atomic_block:
+            def committed():
+                self.refresh()
+
+            committed.partition_registry = self
+            transaction.on_commit(committed, using=self.using)
+        self.refresh()
+
+    @property
+    def language_partitions(self):
+        """
+        Mapping of language code to partition table name.
+        """
+        self._ensure_loaded()
+        return dict(self._languages)
+
+    @property
+    def feed_ranges(self):
+        """
+        Sorted ``(lower, upper, table)`` tuples of the feed range partitions.
+        """
+        self._ensure_loaded()
+        return list(self._feed_ranges)
+
+    def _find_feed_range(self, feed):
+        for lower, upper, table in self._feed_ranges:
+            if lower <= feed < upper:
+                return lower, upper, table
+        return None
+
+    def language_partition(self, language, create=False):
+        """
+        Return the partition table for ``language``, optionally creating it.
+        Returns ``None`` if it does not exist and ``create`` is false.
+        """
+        self._ensure_loaded()
+        table = self._languages.get(language)
+        if table is None:
+            self.refresh()
+            table = self._languages.get(language)
+        if table is None and create:
+            table = self.create_language_partition(language)
+        return table
+
+    def feed_partition(self, feed, create=False):
+        """
+        Return ``(lower, upper, table)`` of the range partition for ``feed``.
+
+        Feeds without a range fall into the default partition; with ``create``
+        an aligned range of ``FEED_PARTITION_SIZE`` feeds (shrunk to fit between
+        existing ranges) is created and the feed's rows are moved into it.
+        Returns ``None`` when no range exists and ``create`` is false.
+        """
+        self._ensure_loaded()
+        found = self._find_feed_range(feed)
+        if found is None:
+            self.refresh()
+            found = self._find_feed_range(feed)
+        if found is None and create:
+            lower = feed - feed % FEED_PARTITION_SIZE
+            upper = min(lower + FEED_PARTITION_SIZE, FEED_UPPER_LIMIT)
+            for existing_lower, existing_upper, _ in self._feed_ranges:
+                if existing_upper <= feed:
+                    lower = max(lower, existing_upper)
+                elif existing_lower > feed:
+                    upper = min(upper, existing_lower)
+            self.create_feed_partition(lower, upper)
+            found = self._find_feed_range(feed)
+        return found
+
+    def _advisory_lock(self, cursor, parent):
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [f"partition:{parent}"])
+
+    def create_language_partition(self, language):
+        """
+        Create the list partition for ``language`` if it does not exist yet.
+        """
+        if not LANGUAGE_RE.match(language):
+            raise ValueError(f"Invalid language code '{language}'")
+        table = f"{LOCALIZE_TABLE}_{language}"
+        try:
+            with transaction.atomic(using=self.using), connections[self.using].cursor() as cursor:
+                self._advisory_lock(cursor, LOCALIZE_TABLE)
+                cursor.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} "
+                    f"PARTITION OF {LOCALIZE_TABLE} FOR VALUES IN ('{language}')"
+                )
+        except Exception:
+            self.clear()
+            raise
+        self._created()
+        return table
 
-    if table_name:
-        with connections['default'].cursor() as cursor:
+    def create_feed_partition(self, lower, upper):
+        """
+        Create the range partition ``[lower, upper)`` for feeds, moving any rows
+        already sitting in the default partition into it. No-op if it exists.
+        """
+        if not 0 <= lower < upper <= FEED_UPPER_LIMIT:
+            raise ValueError(f"Invalid feed range [{lower}, {upper})")
+        try:
+            return self._create_feed_partition(lower, upper)
+        except Exception:
+            # The re-read under the lock cached state that was rolled back
+            self.clear()
+            raise
+
+    def _create_feed_partition(self, lower, upper):
+        table = f"{ACCOMMODATION_TABLE}_feed_{lower}_{upper}"
+        with transaction.atomic(using=self.using), connections[self.using].cursor() as cursor:
+            self._advisory_lock(cursor, ACCOMMODATION_TABLE)
+            # Re-read under the lock; another process may have won the race
+            self.refresh()
+            for existing_lower, existing_upper, existing_table in self._feed_ranges:
+                if (existing_lower, existing_upper) == (lower, upper):
+                    return existing_table
+                if existing_lower < upper and lower < existing_upper:
+                    raise ValueError(
+                        f"Feed range [{lower}, {upper}) overlaps {existing_table} "
+                        f"[{existing_lower}, {existing_upper})"
+                    )
+
+            cursor.execute(f"CREATE TABLE {table} (LIKE {ACCOMMODATION_TABLE} INCLUDING DEFAULTS)")
+            if self._feed_default:
+                cursor.execute(
+                    """
+                    SELECT attname FROM pg_attribute
+                    WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+                    ORDER BY attnum
+                    """,
+                    [ACCOMMODATION_TABLE],
+                )
+                columns = ', '.join(row[0] for row in cursor.fetchall())
+                cursor.execute(
+                    f"""
+                    WITH moved AS (
+                        DELETE FROM {self._feed_default}
+                        WHERE feed >= %s AND feed < %s
+                        RETURNING {columns}
+                    )
+                    INSERT INTO {table} ({columns}) SELECT {columns} FROM moved
+                    """,
+                    [lower, upper],
+                )
             cursor.execute(
-                f"""
-                INSERT INTO {table_name} (accommodation_id, language, description, policy)
-                VALUES (%s, %s, %s, %s)
-                """,
-                [instance.accommodation_id, instance.language, instance.description, instance.policy]
+                f"ALTER TABLE {ACCOMMODATION_TABLE} ATTACH PARTITION {table} {feed_range_bound(lower, upper)}"
             )
-    else:
-        raise ValueError(f"No partition defined for language '{language}'")
+        self._created()
+        return table
+
+
+_registries = {}
+
+
+def get_registry(using='default'):
+    """
+    Return the process-wide registry for a database alias.
+    """
+    registry = _registries.get(using)
+    if registry is None:
+        registry = _registries.setdefault(using, PartitionRegistry(using))
+    return registry
+
+
+def insert_into_partition(instance):
+    """
+    Insert the instance into the correct partition based on the language,
+    creating the language partition on first use.
+    """
+    language = instance.language
+    table_name = get_registry().language_partition(language, create=True)
+
+    with connections['default'].cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table_name} (accommodation_id, language, description, policy)
+            VALUES (%s, %s, %s, %s)
+            """,
+            [
+                instance.accommodation_id,
+                instance.language,
+                instance.description,
+                json.dumps(instance.policy) if instance.policy is not None else None,
+            ]
+        )
+
+
+def _insert_batch(cursor, table_name, rows):
+    """
+    Send one multi-row INSERT into a language partition. ``policy`` is
+    passed through psycopg2's ``Json`` adapter and cast server-side.
+    """
+    execute_values(
+        cursor,
+        f"INSERT INTO {table_name} (accommodation_id, language, description, policy) VALUES %s",
+        rows,
+        template="(%s, %s, %s, %s::jsonb)",
+        page_size=len(rows),
+    )
+
+
+def bulk_insert_into_partitions(instances, batch_size=1000):
+    """
+    Insert LocalizeAccommodation instances straight into their language
+    partitions with multi-row INSERTs, grouped by language.
+
+    ``instances`` may be any iterable (e.g. a generator); at most
+    ``batch_size`` rows per language are buffered. Rows for languages without
+    a partition go through ``insert_into_partition`` one at a time, which
+    creates the partition; later rows of that language are then batched.
+    Everything is inserted in one transaction, so a row that fails (e.g. an
+    invalid language code) rolls back the batches already flushed.
+
+    Returns ``{partition: {'rows': int, 'seconds': float}}``.
+    """
+    registry = get_registry()
+    stats = defaultdict(lambda: {'rows': 0, 'seconds': 0.0})
+    pending = defaultdict(list)
+
+    with transaction.atomic(using='default'), connections['default'].cursor() as cursor:
+        # execute_values needs the raw psycopg2 cursor
+        raw_cursor = cursor.cursor
+
+        def flush(table_name):
+            rows = pending.pop(table_name, None)
+            if not rows:
+                return
+            started = time.perf_counter()
+            _insert_batch(raw_cursor, table_name, rows)
+            stats[table_name]['rows'] += len(rows)
+            stats[table_name]['seconds'] += time.perf_counter() - started
+
+        partitions = registry.language_partitions
+        for instance in instances:
+            table_name = partitions.get(instance.language)
+            if table_name is None:
+                started = time.perf_counter()
+                insert_into_partition(instance)
+                partitions = registry.language_partitions
+                table_name = partitions[instance.language]
+                stats[table_name]['rows'] += 1
+                stats[table_name]['seconds'] += time.perf_counter() - started
+                continue
+
+            pending[table_name].append((
+                instance.accommodation_id,
+                instance.language,
+                instance.description,
+                Json(instance.policy) if instance.policy is not None else None,
+            ))
+            if len(pending[table_name]) >= batch_size:
+                flush(table_name)
+
+        for table_name in list(pending):
+            flush(table_name)
+
+    return {table_name: dict(values) for table_name, values in stats.items()}
@@ -1,5 +1,82 @@
+from django.db.models import Q
+from django.utils.functional import cached_property
 from rest_framework import permissions
 
+PROPERTY_OWNERS_GROUP = 'Property Owners'
+
+
+class PermissionContext:
+    """
+    Ownership facts about the requesting user, resolved at most once per
+    request and shared by the admin's queryset and permission hooks.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def is_superuser(self):
+        return self.user.is_superuser
+
+    @cached_property
+    def is_property_owner(self):
+        """
+        Whether the user only sees their own accommodations.
+        """
+        if self.is_superuser or not self.user.is_authenticated:
+            return False
+        return self.user.groups.filter(name=PROPERTY_OWNERS_GROUP).exists()
+
+    def scope(self, queryset):
+        """
+        Restrict a queryset to what the user may see.
+        """
+        if self.is_property_owner:
+            return queryset.filter(user_id=self.user.pk)
+        return queryset
+
+    def visible(self, queryset):
+        """
+        Restrict a selection that may include unpublished accommodations:
+        staff see every row, everyone else published rows and their own.
+        """
+        if self.is_superuser or self.user.is_staff:
+            return queryset
+        if not self.user.is_authenticated:
+            return queryset.filter(published=True)
+        return queryset.filter(Q(published=True) | Q(user_id=self.user.pk))
+
+    def owns(self, obj):
+        return obj.user_id is not None and obj.user_id == self.user.pk
+
+    def can_modify(self, obj=None):
+        """
+        Object-level check used for change and delete: superusers may modify
+        anything, everyone else only their own accommodations.
+        """
+        return self.is_superuser or obj is None or self.owns(obj)
+
+    def modifiable(self, queryset):
+        """
+        Bulk counterpart of ``can_modify``: narrow a selection to the rows the
+        user may change, in the query rather than row by row.
+        """
+        if self.is_superuser:
+            return queryset
+        return queryset.filter(user_id=self.user.pk)
+
+
+def get_permission_context(request):
+    """
+    Return the request's ``PermissionContext``, creating it on first use.
+    """
+    context = getattr(request, '_permission_context', None)
+    if context is None or context.user is not request.user:
+        context = PermissionContext(request.user)
+        request._permission_context = context
+    return context
+
+
 class IsOwnerOrReadOnly(permissions.BasePermission):
     """
     Custom permission to allow only the owner of an object to edit it.
@@ -11,5 +88,4 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
             return True
 
         # Write permissions are only allowed to the owner of the property
-        return obj.user == request.user
-
+        return obj.user_id is not None and obj.user_id == request.user.pk
@@ -1,19 +1,161 @@
-from import_export import resources
+import re
+from collections import defaultdict
+
+from django.contrib.gis.geos import GEOSGeometry, Point
+from django.utils import timezone
+from import_export import fields, resources, widgets
+from import_export.instance_loaders import CachedInstanceLoader
+
+from .location_tree import bump_location_tree_version
 from .models import Location
 
+LOCATION_FIELDS = (
+    'id',
+    'title',
+    'center',
+    'parent',
+    'location_type',
+    'country_code',
+    'state_abbr',
+    'city',
+    'created_at',
+    'updated_at',
+)
+
+POINT_WKT_RE = re.compile(
+    r"^\s*(?:SRID=(\d+);\s*)?POINT\s*\(\s*(-?[\d.]+(?:[eE][-+]?\d+)?)\s+(-?[\d.]+(?:[eE][-+]?\d+)?)\s*\)\s*$",
+    re.IGNORECASE,
+)
+
 class LocationResource(resources.ModelResource):
     class Meta:
         model = Location
         import_id_fields = ['id']  # Use 'id' as the unique identifier for imports
-        fields = (
-            'id',
-            'title',
-            'center',
-            'parent',
-            'location_type',
-            'country_code',
-            'state_abbr',
-            'city',
-            'created_at',
-            'updated_at',
-        )  # Specify the fields to import/export
+        fields = LOCATION_FIELDS  # Specify the fields to import/export
+
+
+class PointWidget(widgets.Widget):
+    """
+    WKT/EWKT point column. Plain ``POINT(x y)`` values, the common case, are
+    parsed with a regex instead of a round trip through the GEOS WKT reader.
+    """
+
+    def clean(self, value, row=None, **kwargs):
+        if value is None or not str(value).strip():
+            return None
+        match = POINT_WKT_RE.match(str(value))
+        if match:
+            srid, x, y = match.groups()
+            return Point(float(x), float(y), srid=int(srid) if srid else 4326)
+        geometry = GEOSGeometry(str(value))
+        if geometry.srid is None:
+            geometry.srid = 4326
+        return geometry
+
+    def render(self, value, obj=None, **kwargs):
+        return value.wkt if value else ''
+
+
+class ParentIdWidget(widgets.Widget):
+    """
+    Parent location id, assigned to ``parent_id`` without fetching the parent.
+    """
+
+    def clean(self, value, row=None, **kwargs):
+        if value is None:
+            return None
+        return str(value).strip() or None
+
+    def render(self, value, obj=None, **kwargs):
+        return value or ''
+
+
+def topological_order(rows):
+    """
+    Indexes of ``(id, parent_id)`` rows ordered so every parent in the file
+    precedes its children. Raises ``ValueError`` on a cycle.
+    """
+    index_of = {location_id: index for index, (location_id, _) in enumerate(rows)}
+    children = defaultdict(list)
+    roots = []
+    for index, (location_id, parent_id) in enumerate(rows):
+        if parent_id and parent_id in index_of and parent_id != location_id:
+            children[parent_id].append(index)
+        else:
+            roots.append(index)
+
+    order = []
+    stack = list(reversed(roots))
+    while stack:
+        index = stack.pop()
+        order.append(index)
+        stack.extend(reversed(children.get(rows[index][0], ())))
+
+    if len(order) != len(rows):
+        placed = set(order)
+        stuck = sorted(rows[index][0] for index in range(len(rows)) if index not in placed)
+        raise ValueError(f"Location hierarchy contains a cycle involving: {', '.join(stuck[:10])}")
+    return order
+
+
+class BulkLocationResource(resources.ModelResource):
+    """
+    Location import for large files: rows are ordered parents-first, existing
+    rows are loaded in one query, parents are assigned by id, and rows are
+    written with ``bulk_create``/``bulk_update`` without building diffs.
+
+    Bulk writes bypass ``Location.save`` and signals, so paths are rebuilt
+    and the tree version bumped once after the import.
+    """
+    parent = fields.Field(attribute='parent_id', column_name='parent', widget=ParentIdWidget())
+    center = fields.Field(attribute='center', column_name='center', widget=PointWidget())
+
+    class Meta:
+        model = Location
+        name = "Location (bulk)"
+        import_id_fields = ['id']
+        fields = LOCATION_FIELDS
+        use_bulk = True
+        batch_size = 2000
+        skip_diff = True
+        skip_html_diff = True
+        instance_loader_class = CachedInstanceLoader
+
+    def before_import(self, dataset, **kwargs):
+        super().before_import(dataset, **kwargs)
+        if not len(dataset):
+            return
+        ids = [str(value).strip() for value in dataset['id']]
+        parents = (
+            [str(value).strip() if value not in (None, '') else None for value in dataset['parent']]
+            if 'parent' in dataset.headers else [None] * len(ids)
+        )
+
+        # Parents outside the file must already exist: one query for all of them
+        external = {parent for parent in parents if parent} - set(ids)
+        if external:
+            missing = external - set(Location.objects.filter(pk__in=external).values_list('pk', flat=True))
+            if missing:
+                raise ValueError(f"Unknown parent locations: {', '.join(sorted(missing)[:10])}")
+
+        order = topological_order(list(zip(ids, parents)))
+        if order != sorted(order):
+            headers = dataset.headers
+            rows = [dataset[index] for index in order]
+            dataset.wipe()
+            dataset.headers = headers
+            for row in rows:
+                dataset.append(row)
+
+    def before_save_instance(self, instance, row, **kwargs):
+        super().before_save_instance(instance, row, **kwargs)
+        # bulk_update never applies auto_now, and the sharded sitemap detects
+        # changed countries by their latest updated_at
+        instance.updated_at = timezone.now()
+
+    def after_import(self, dataset, result, **kwargs):
+        super().after_import(dataset, result, **kwargs)
+        if result.has_errors() or result.has_validation_errors():
+            return
+        Location.objects.rebuild_paths()
+        bump_location_tree_version()
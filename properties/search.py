@@ -0,0 +1,112 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.core.exceptions import EmptyResultSet
+from django.db import connection
+from django.db.models import Case, F, Q, Value, When
+
+from .geo_search import LIST_FIELDS, published_accommodations
+from .language_detection import DEFAULT_TEXT_SEARCH_CONFIG, TEXT_SEARCH_CONFIGS, text_search_config
+from .models import Accommodation, Amenity, LocalizeAccommodation
+
+# Keyset order, matching idx_accommodation_search_score
+SEARCH_ORDERING = (('review_score', True), ('id', False), ('feed', False))
+
+
+def search_accommodations(params, permissions=None):
+    """
+    Filter accommodations by validated ``SearchParamsSerializer`` data.
+
+    Every filter maps onto an indexed column; ``feed`` additionally lets
+    PostgreSQL prune the scan to a single feed partition. Unpublished rows
+    (``published=False``) are narrowed to what the requesting user's
+    ``PermissionContext`` may see, and to nothing without one.
+    """
+    if params.get('published', True):
+        queryset = published_accommodations()
+    elif permissions is None:
+        return Accommodation.objects.none()
+    else:
+        queryset = permissions.visible(Accommodation.objects.filter(published=False).only(*LIST_FIELDS))
+
+    filters = {
+        'feed': 'feed',
+        'country_code': 'country_code',
+        'bedrooms_min': 'bedroom_count__gte',
+        'bedrooms_max': 'bedroom_count__lte',
+        'rate_min': 'usd_rate__gte',
+        'rate_max': 'usd_rate__lte',
+        'review_min': 'review_score__gte',
+    }
+    for param, lookup in filters.items():
+        if params.get(param) is not None:
+            queryset = queryset.filter(**{lookup: params[param]})
+
+    if params.get('amenities'):
+        amenity_ids = Amenity.objects.ids_for(params['amenities'])
+        if len(amenity_ids) < len(set(params['amenities'])):
+            # An amenity nobody has can never match
+            return queryset.none()
+        queryset = queryset.filter(amenity_ids__contains=amenity_ids)
+    return queryset
+
+
+def amenity_facet_counts(queryset, limit=50):
+    """
+    Count matching accommodations per amenity by unnesting the compact
+    ``amenity_ids`` arrays. Returns ``[(name, count), ...]``, most common first.
+    """
+    try:
+        sql, params = queryset.order_by().values('amenity_ids').query.sql_with_params()
+    except EmptyResultSet:
+        # e.g. ``queryset.none()`` for an amenity nobody has
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT amenity_id, count(*)
+            FROM ({sql}) AS matches, unnest(matches.amenity_ids) AS amenity_id
+            GROUP BY amenity_id
+            ORDER BY count(*) DESC, amenity_id
+            LIMIT %s
+            """,
+            (*params, limit),
+        )
+        counts = cursor.fetchall()
+    names = Amenity.objects.names_for([amenity_id for amenity_id, _ in counts])
+    return [(names[amenity_id], count) for amenity_id, count in counts if amenity_id in names]
+
+
+def search_localized(text, language=None, queryset=None):
+    """
+    Full-text search of localized descriptions, ranked by ``ts_rank``.
+
+    The query is parsed with the same config as the ``search_vector`` it is
+    matched against. With a ``language`` the scan is pruned to that language
+    partition; without one, each config gets its own indexed condition.
+    """
+    if queryset is None:
+        queryset = LocalizeAccommodation.objects.all()
+
+    if language:
+        query = SearchQuery(text, config=text_search_config(language), search_type='websearch')
+        queryset = queryset.filter(language=language, search_vector=query)
+    else:
+        configured = [code for code, config in TEXT_SEARCH_CONFIGS.items() if config != DEFAULT_TEXT_SEARCH_CONFIG]
+        condition = ~Q(language__in=configured) & Q(
+            search_vector=SearchQuery(text, config=DEFAULT_TEXT_SEARCH_CONFIG, search_type='websearch')
+        )
+        for code in configured:
+            condition |= Q(
+                language=code,
+                search_vector=SearchQuery(text, config=TEXT_SEARCH_CONFIGS[code], search_type='websearch'),
+            )
+        queryset = queryset.filter(condition)
+        # Only evaluated for matching rows, so a per-row config is fine here
+        query = SearchQuery(
+            text,
+            config=Case(
+                *(When(language=code, then=Value(TEXT_SEARCH_CONFIGS[code])) for code in configured),
+                default=Value(DEFAULT_TEXT_SEARCH_CONFIG),
+            ),
+            search_type='websearch',
+        )
+    return queryset.annotate(rank=SearchRank(F('search_vector'), query)).order_by('-rank', 'id')
@@ -0,0 +1,145 @@
+from rest_framework import serializers
+from .export import EXPORT_FORMATS
+from .facets import FACETS
+from .models import Accommodation, LocalizeAccommodation
+
+MAX_PAGE_SIZE = 500
+
+class AccommodationListSerializer(serializers.ModelSerializer):
+    """
+    Compact representation used by the search endpoints.
+    """
+    latitude = serializers.SerializerMethodField()
+    longitude = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Accommodation
+        fields = (
+            'id', 'feed', 'title', 'country_code', 'bedroom_count', 'review_score',
+            'usd_rate', 'latitude', 'longitude', 'location',
+        )
+
+    def get_latitude(self, obj):
+        return obj.center.y
+
+    def get_longitude(self, obj):
+        return obj.center.x
+
+class LocalizedSearchResultSerializer(serializers.ModelSerializer):
+    """
+    One ranked match of the localized full-text search.
+    """
+    title = serializers.CharField(source='accommodation.title')
+    rank = serializers.FloatField()
+
+    class Meta:
+        model = LocalizeAccommodation
+        fields = ('id', 'accommodation', 'title', 'language', 'description', 'rank')
+
+class GeoSearchParamsSerializer(serializers.Serializer):
+    """
+    Query parameters of the geo search endpoint.
+    """
+    mode = serializers.ChoiceField(choices=('radius', 'bbox', 'nearest'))
+    lat = serializers.FloatField(min_value=-90, max_value=90, required=False)
+    lng = serializers.FloatField(min_value=-180, max_value=180, required=False)
+    radius = serializers.FloatField(min_value=1, max_value=500_000, required=False)  # meters
+    bbox = serializers.CharField(required=False)  # min_lng,min_lat,max_lng,max_lat
+    limit = serializers.IntegerField(min_value=1, max_value=MAX_PAGE_SIZE, default=50)
+    cursor = serializers.CharField(required=False)
+
+    def validate_bbox(self, value):
+        try:
+            min_lng, min_lat, max_lng, max_lat = (float(part) for part in value.split(','))
+        except ValueError:
+            raise serializers.ValidationError('Expected min_lng,min_lat,max_lng,max_lat.')
+        if not (-180 <= min_lng < max_lng <= 180 and -90 <= min_lat < max_lat <= 90):
+            raise serializers.ValidationError('Bounding box is out of range.')
+        return (min_lng, min_lat, max_lng, max_lat)
+
+    def validate(self, attrs):
+        mode = attrs['mode']
+        required = {'radius': ('lat', 'lng', 'radius'), 'bbox': ('bbox',), 'nearest': ('lat', 'lng')}[mode]
+        missing = [name for name in required if name not in attrs]
+        if missing:
+            raise serializers.ValidationError({name: f"Required for mode '{mode}'." for name in missing})
+        return attrs
+
+class SearchParamsSerializer(serializers.Serializer):
+    """
+    Query parameters of the faceted search endpoint.
+    """
+    country_code = serializers.CharField(min_length=2, max_length=2, required=False)
+    feed = serializers.IntegerField(min_value=0, max_value=32767, required=False)
+    bedrooms_min = serializers.IntegerField(min_value=0, required=False)
+    bedrooms_max = serializers.IntegerField(min_value=0, required=False)
+    rate_min = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    rate_max = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    review_min = serializers.DecimalField(max_digits=3, decimal_places=1, required=False)
+    published = serializers.BooleanField(default=True)  # false: staff see all unpublished rows, owners their own
+    amenities = serializers.CharField(required=False)  # comma separated, all must match
+    facets = serializers.BooleanField(default=False)  # include amenity facet counts
+    limit = serializers.IntegerField(min_value=1, max_value=MAX_PAGE_SIZE, default=50)
+    cursor = serializers.CharField(required=False)
+
+    def validate_country_code(self, value):
+        return value.upper()
+
+    def validate_amenities(self, value):
+        return [amenity.strip() for amenity in value.split(',') if amenity.strip()]
+
+
+class LocalizedSearchParamsSerializer(serializers.Serializer):
+    """
+    Query parameters of the localized full-text search endpoint.
+    """
+    q = serializers.CharField(max_length=200)
+    language = serializers.CharField(min_length=2, max_length=2, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=MAX_PAGE_SIZE, default=50)
+
+    def validate_language(self, value):
+        return value.lower()
+
+
+class DetailParamsSerializer(serializers.Serializer):
+    """
+    Query parameters of the accommodation detail endpoint.
+    """
+    language = serializers.RegexField(r'^[A-Za-z]{2}$', default='en')
+
+    def validate_language(self, value):
+        return value.lower()
+
+
+class FacetParamsSerializer(serializers.Serializer):
+    """
+    Query parameters of the facet counts endpoint.
+    """
+    facets = serializers.CharField(required=False)  # comma separated, defaults to all
+    feeds = serializers.CharField(required=False)  # comma separated feed ids
+    limit = serializers.IntegerField(min_value=1, max_value=MAX_PAGE_SIZE, default=100)
+
+    def validate_facets(self, value):
+        facets = [facet.strip() for facet in value.split(',') if facet.strip()]
+        unknown = [facet for facet in facets if facet not in FACETS]
+        if unknown:
+            raise serializers.ValidationError(f"Unknown facets: {', '.join(unknown)}.")
+        return facets
+
+    def validate_feeds(self, value):
+        try:
+            return [int(feed) for feed in value.split(',') if feed.strip()]
+        except ValueError:
+            raise serializers.ValidationError('Expected comma separated feed ids.')
+
+
+class ExportParamsSerializer(serializers.Serializer):
+    """
+    Query parameters of the streaming export endpoint. ``export_format`` is
+    used because DRF reserves ``format`` for content negotiation.
+    """
+    export_format = serializers.ChoiceField(choices=EXPORT_FORMATS, default='jsonl')
+    gzip = serializers.BooleanField(default=False)
+    feed = serializers.IntegerField(min_value=0, max_value=32767, required=False)
+    country_code = serializers.CharField(min_length=2, max_length=2, required=False)
+    published_only = serializers.BooleanField(default=True)  # false adds the unpublished rows the user may see
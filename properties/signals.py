@@ -0,0 +1,133 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .accommodation_detail import clear_detail_cache, invalidate_detail, touch_accommodation
+from .facets import apply_delta, facet_state, stored_facet_state
+from .images import delete_variants, reuse_processed_result, schedule_processing
+from .location_tree import bump_location_tree_version
+from .tiles import get_tile_cache
+from .models import Accommodation, AccommodationImage, Amenity, ImageBlob, LocalizeAccommodation, Location
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def invalidate_location_tree(sender, instance, **kwargs):
+    """
+    Bump the Location tree version so every worker reloads its snapshot.
+    """
+    if kwargs.get('raw'):
+        return
+    bump_location_tree_version()
+
+
+@receiver(post_delete, sender=Amenity)
+def clear_amenity_cache(sender, instance, **kwargs):
+    """
+    Deleted amenities must not be resolved from the process-local cache.
+    """
+    Amenity.objects.clear_cache()
+
+
+@receiver(pre_save, sender=Accommodation)
+def remember_facet_state(sender, instance, **kwargs):
+    """
+    Capture the stored row so post_save can apply a rollup delta. Looked up
+    even for unsaved instances, since ids are assigned by the feeds.
+    """
+    if kwargs.get('raw'):
+        return
+    instance._facet_state_before = stored_facet_state(instance)
+
+
+@receiver(post_save, sender=Accommodation)
+def update_facet_rollups(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    apply_delta(getattr(instance, '_facet_state_before', None), facet_state(instance))
+
+
+@receiver(post_delete, sender=Accommodation)
+def remove_from_facet_rollups(sender, instance, **kwargs):
+    apply_delta(facet_state(instance), None)
+
+
+@receiver(post_save, sender=Accommodation)
+@receiver(post_delete, sender=Accommodation)
+def invalidate_map_tiles(sender, instance, **kwargs):
+    """
+    Drop cached tiles at the accommodation's old and new position once committed.
+    """
+    if kwargs.get('raw'):
+        return
+    before = getattr(instance, '_facet_state_before', None)
+    points = [point for point in (instance.center, before and before['center']) if point]
+
+    def invalidate():
+        cache = get_tile_cache()
+        for point in points:
+            cache.invalidate_point(point.x, point.y)
+
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=AccommodationImage)
+def process_uploaded_image(sender, instance, created, **kwargs):
+    """
+    Render variants of new uploads in the background once they are committed,
+    unless another row already has them for the same content.
+    """
+    if kwargs.get('raw') or not instance.image or instance.processed_at:
+        return
+    if reuse_processed_result(instance):
+        return
+    transaction.on_commit(lambda: schedule_processing(instance))
+
+
+@receiver(post_delete, sender=AccommodationImage)
+def release_image_files(sender, instance, **kwargs):
+    """
+    Drop the row's reference to its blob; releasing the last one deletes the
+    file and its variants. Rows stored without a blob own their variants
+    unless another row points at the same file.
+    """
+    if instance.blob_id:
+        ImageBlob.objects.release(instance.blob_id, instance.variants)
+        return
+    variants = instance.variants
+    if variants and not AccommodationImage.objects.filter(blob__isnull=True, image=instance.image.name).exists():
+        transaction.on_commit(lambda: delete_variants(variants))
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def invalidate_location_details(sender, instance, **kwargs):
+    """
+    Cached detail payloads embed the location chain; shared entries are keyed
+    by the tree version bumped above, so only this process's tier is cleared.
+    """
+    if kwargs.get('raw'):
+        return
+    clear_detail_cache()
+
+
+@receiver(post_save, sender=Accommodation)
+@receiver(post_delete, sender=Accommodation)
+def invalidate_accommodation_detail(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    invalidate_detail(instance.pk)
+
+
+@receiver(post_save, sender=AccommodationImage)
+@receiver(post_delete, sender=AccommodationImage)
+@receiver(post_save, sender=LocalizeAccommodation)
+@receiver(post_delete, sender=LocalizeAccommodation)
+def touch_parent_accommodation(sender, instance, **kwargs):
+    """
+    Images and localized rows are part of the detail payload, so a change
+    advances the accommodation's ``updated_at`` (its ETag) and drops the cache.
+    """
+    if kwargs.get('raw'):
+        return
+    touch_accommodation(instance.accommodation_id)
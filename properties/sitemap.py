@@ -0,0 +1,247 @@
+import gzip
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.utils.text import slugify
+
+from .models import Location
+
+# Columns needed to rebuild the sitemap; fetched once for the whole table.
+SITEMAP_FIELDS = ('id', 'title', 'parent_id', 'location_type')
+
+
+class LocationTreeRows:
+    """
+    Parent -> children index over Location rows, built from a single query.
+
+    Rows are kept as plain tuples of (id, title, location_type) so the
+    footprint stays small even for several hundred thousand locations.
+    """
+
+    def __init__(self):
+        self.countries = []
+        self.children = defaultdict(list)
+        self.updated_at = None
+
+    @classmethod
+    def load(cls, queryset=None, chunk_size=5000, track_changes=False):
+        """
+        Load the tree in one pass using a server-side cursor.
+        Rows arrive ordered by title, so every children list is already sorted.
+        With ``track_changes`` the ``updated_at`` of every row is kept as well,
+        which is what ``subtree_signature`` needs.
+        """
+        if queryset is None:
+            queryset = Location.objects.all()
+        tree = cls()
+        fields = SITEMAP_FIELDS
+        if track_changes:
+            tree.updated_at = {}
+            fields += ('updated_at',)
+        rows = queryset.order_by('title').values_list(*fields)
+        for row in rows.iterator(chunk_size=chunk_size):
+            location_id, title, parent_id, location_type = row[:4]
+            node = (location_id, title, location_type)
+            if location_type == 'country':
+                tree.countries.append(node)
+            if parent_id is not None:
+                tree.children[parent_id].append(node)
+            if track_changes:
+                tree.updated_at[location_id] = row[4]
+        # Match the historical output ordering (case-insensitive by country title).
+        tree.countries.sort(key=lambda node: node[1].lower())
+        return tree
+
+    def country_entry(self, country):
+        """
+        Build the sitemap entry for a single country.
+        """
+        country_id, country_title, _ = country
+        country_slug = slugify(country_title)
+        locations = []
+
+        for location_id, title, location_type in self.children.get(country_id, ()):
+            location_slug = slugify(title)
+            location_entry = {title: location_slug}
+
+            if location_type == 'state':
+                cities_list = [
+                    {city_title: f"{country_slug}/{location_slug}/{slugify(city_title)}"}
+                    for _, city_title, _ in self.children.get(location_id, ())
+                ]
+                if cities_list:
+                    location_entry['locations'] = cities_list
+
+            locations.append(location_entry)
+
+        return {country_title: country_slug, 'locations': locations}
+
+    def subtree_signature(self, country):
+        """
+        Return ``(latest updated_at, node count)`` for a country's whole subtree.
+        The count catches deletions, which leave no newer timestamp behind.
+        """
+        country_id = country[0]
+        latest = self.updated_at[country_id]
+        count = 0
+        stack = [country_id]
+        seen = set()
+        while stack:
+            location_id = stack.pop()
+            if location_id in seen:
+                continue
+            seen.add(location_id)
+            count += 1
+            latest = max(latest, self.updated_at[location_id])
+            stack.extend(child[0] for child in self.children.get(location_id, ()))
+        return latest, count
+
+    def iter_entries(self):
+        """
+        Yield country entries one at a time, in sitemap order.
+        """
+        for country in self.countries:
+            yield self.country_entry(country)
+
+
+def write_json_array(entries, fp, indent=4):
+    """
+    Stream an iterable of JSON-serialisable entries to ``fp`` as a JSON array.
+
+    The output is byte-for-byte what ``json.dump(list(entries), fp, indent=indent)``
+    would produce, but only one entry is held in memory at a time.
+    """
+    encoder = json.JSONEncoder(indent=indent)
+    prefix = '\n' + ' ' * indent
+    written = 0
+
+    fp.write('[')
+    for entry in entries:
+        fp.write(',' + prefix if written else prefix)
+        for chunk in encoder.iterencode(entry):
+            # JSON strings never contain raw newlines, so this only re-indents structure.
+            fp.write(chunk.replace('\n', prefix))
+        written += 1
+    fp.write('\n]' if written else ']')
+    return written
+
+
+def write_shard(path, entry):
+    """
+    Write a single country entry as gzipped JSON.
+
+    Kept at module level so it can be shipped to a process pool; it only
+    receives plain data and never touches the database.
+    """
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        json.dump(entry, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+    return path
+
+
+class ShardedSitemapWriter:
+    """
+    Writes one gzipped shard per country plus an ``index.json`` file.
+
+    A small state file records the subtree signature each shard was built
+    from, so later runs only rewrite shards whose countries changed.
+    """
+
+    STATE_FILE = '.sitemap_state.json'
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, output_dir, workers=1, parallel_threshold=8):
+        self.output_dir = output_dir
+        self.workers = workers
+        self.parallel_threshold = parallel_threshold
+
+    @staticmethod
+    def shard_name(country_id):
+        return f"{slugify(country_id)}.json.gz"
+
+    def load_state(self):
+        try:
+            with open(os.path.join(self.output_dir, self.STATE_FILE)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {'countries': {}}
+
+    def save_state(self, state):
+        path = os.path.join(self.output_dir, self.STATE_FILE)
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(state, f)
+        os.replace(f"{path}.tmp", path)
+
+    def write(self, tree, force=False):
+        """
+        Regenerate dirty shards, drop shards of removed countries and rewrite the index.
+        Returns a ``(written, skipped, removed)`` tuple of shard counts.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        previous = self.load_state()['countries']
+        countries = {}
+        index = []
+        jobs = []
+
+        for country in tree.countries:
+            country_id, title, _ = country
+            latest, count = tree.subtree_signature(country)
+            shard = self.shard_name(country_id)
+            signature = {'shard': shard, 'updated_at': latest.isoformat(), 'count': count}
+            countries[country_id] = signature
+            index.append({
+                'title': title,
+                'slug': slugify(title),
+                'shard': shard,
+                'updated_at': signature['updated_at'],
+            })
+
+            path = os.path.join(self.output_dir, shard)
+            if force or previous.get(country_id) != signature or not os.path.exists(path):
+                jobs.append((path, country))
+
+        self._run(tree, jobs)
+
+        removed = 0
+        live_shards = {signature['shard'] for signature in countries.values()}
+        for country_id, signature in previous.items():
+            if country_id not in countries and signature['shard'] not in live_shards:
+                try:
+                    os.remove(os.path.join(self.output_dir, signature['shard']))
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+
+        index_path = os.path.join(self.output_dir, self.INDEX_FILE)
+        with open(f"{index_path}.tmp", 'w') as f:
+            write_json_array(index, f, indent=4)
+        os.replace(f"{index_path}.tmp", index_path)
+
+        self.save_state({'countries': countries})
+        return len(jobs), len(countries) - len(jobs), removed
+
+    def _run(self, tree, jobs):
+        """
+        Write shards, fanning out to a process pool when many countries are dirty.
+        Entries are built lazily and at most ``workers * 2`` are submitted at
+        a time, so only in-flight shards are held in memory.
+        """
+        entries = ((path, tree.country_entry(country)) for path, country in jobs)
+        if self.workers > 1 and len(jobs) >= self.parallel_threshold:
+            window = self.workers * 2
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                in_flight = set()
+                for path, entry in entries:
+                    if len(in_flight) >= window:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            future.result()
+                    in_flight.add(executor.submit(write_shard, path, entry))
+                for future in in_flight:
+                    future.result()
+        else:
+            for path, entry in entries:
+                write_shard(path, entry)
@@ -0,0 +1,295 @@
+'use strict';
+{
+    // Reads the point layers of the /tiles/{z}/{x}/{y}.mvt vector tiles and
+    // draws them on canvas tiles, so the admin map runs no third-party script.
+
+    const zigzag = n => (n % 2 ? -(n + 1) / 2 : n / 2);
+
+    class ProtobufReader {
+        constructor(buffer) {
+            this.bytes = new Uint8Array(buffer);
+            this.view = new DataView(buffer);
+            this.pos = 0;
+        }
+
+        varint() {
+            let result = 0;
+            let shift = 1;
+            let byte;
+            do {
+                byte = this.bytes[this.pos++];
+                result += (byte & 0x7f) * shift;
+                shift *= 128;
+            } while (byte & 0x80);
+            return result;
+        }
+
+        // End offset of the length-delimited field at the current position
+        end() {
+            const length = this.varint();
+            return this.pos + length;
+        }
+
+        string() {
+            const end = this.end();
+            const text = new TextDecoder().decode(this.bytes.subarray(this.pos, end));
+            this.pos = end;
+            return text;
+        }
+
+        packed() {
+            const end = this.end();
+            const values = [];
+            while (this.pos < end) {
+                values.push(this.varint());
+            }
+            return values;
+        }
+
+        skip(type) {
+            if (type === 0) {
+                this.varint();
+            } else if (type === 1) {
+                this.pos += 8;
+            } else if (type === 2) {
+                this.pos = this.end();
+            } else if (type === 5) {
+                this.pos += 4;
+            } else {
+                throw new Error(`Unsupported protobuf wire type ${type}`);
+            }
+        }
+
+        // Call read(field) for each field up to end; fields it returns false for are skipped
+        fields(end, read) {
+            while (this.pos < end) {
+                const tag = this.varint();
+                if (!read(tag >> 3)) {
+                    this.skip(tag & 7);
+                }
+            }
+        }
+    }
+
+    function readValue(reader) {
+        let value = null;
+        reader.fields(reader.end(), field => {
+            if (field === 1) {
+                value = reader.string();
+            } else if (field === 2) {
+                value = reader.view.getFloat32(reader.pos, true);
+                reader.pos += 4;
+            } else if (field === 3) {
+                value = reader.view.getFloat64(reader.pos, true);
+                reader.pos += 8;
+            } else if (field === 4 || field === 5) {
+                value = reader.varint();
+            } else if (field === 6) {
+                value = zigzag(reader.varint());
+            } else if (field === 7) {
+                value = Boolean(reader.varint());
+            } else {
+                return false;
+            }
+            return true;
+        });
+        return value;
+    }
+
+    function readFeature(reader) {
+        const feature = {tags: [], geometry: []};
+        reader.fields(reader.end(), field => {
+            if (field === 2) {
+                feature.tags = reader.packed();
+            } else if (field === 4) {
+                feature.geometry = reader.packed();
+            } else {
+                return false;
+            }
+            return true;
+        });
+        return feature;
+    }
+
+    // MoveTo positions of a point geometry, in tile extent units
+    function geometryPoints(geometry) {
+        const points = [];
+        let x = 0;
+        let y = 0;
+        let i = 0;
+        while (i < geometry.length) {
+            const command = geometry[i] & 7;
+            const count = geometry[i] >> 3;
+            i++;
+            if (command === 7) {
+                continue;  // ClosePath has no parameters
+            }
+            for (let n = 0; n < count; n++) {
+                x += zigzag(geometry[i++]);
+                y += zigzag(geometry[i++]);
+                if (command === 1) {
+                    points.push([x, y]);
+                }
+            }
+        }
+        return points;
+    }
+
+    function readLayer(reader) {
+        const layer = {name: '', extent: 4096, keys: [], values: [], features: []};
+        reader.fields(reader.end(), field => {
+            if (field === 1) {
+                layer.name = reader.string();
+            } else if (field === 2) {
+                layer.features.push(readFeature(reader));
+            } else if (field === 3) {
+                layer.keys.push(reader.string());
+            } else if (field === 4) {
+                layer.values.push(readValue(reader));
+            } else if (field === 5) {
+                layer.extent = reader.varint();
+            } else {
+                return false;
+            }
+            return true;
+        });
+        return layer;
+    }
+
+    // {layer name: [{properties, points: [[x, y], ...] as fractions of the tile}]}
+    function readTile(buffer) {
+        const reader = new ProtobufReader(buffer);
+        const layers = {};
+        reader.fields(reader.bytes.length, field => {
+            if (field !== 3) {
+                return false;
+            }
+            const layer = readLayer(reader);
+            layers[layer.name] = layer.features.map(feature => {
+                const properties = {};
+                for (let i = 0; i + 1 < feature.tags.length; i += 2) {
+                    properties[layer.keys[feature.tags[i]]] = layer.values[feature.tags[i + 1]];
+                }
+                const points = geometryPoints(feature.geometry).map(
+                    ([x, y]) => [x / layer.extent, y / layer.extent]
+                );
+                return {properties, points};
+            });
+            return true;
+        });
+        return layers;
+    }
+
+    const STYLES = {
+        accommodations: () => ({radius: 4, fillColor: '#d33', fillOpacity: 0.8}),
+        clusters: properties => ({
+            radius: Math.min(24, 4 + 2 * Math.log2(properties.point_count)),
+            fillColor: '#36c',
+            fillOpacity: 0.7,
+        }),
+    };
+
+    const AccommodationLayer = L.GridLayer.extend({
+        initialize(tileUrl, options) {
+            L.GridLayer.prototype.initialize.call(this, options);
+            this.tileUrl = tileUrl;
+            this.markers = new Map();
+            this.on('tileunload', event => this.markers.delete(this.key(event.coords)));
+        },
+
+        key(coords) {
+            return `${coords.x}:${coords.y}:${coords.z}`;
+        },
+
+        createTile(coords, done) {
+            const size = this.getTileSize();
+            const canvas = L.DomUtil.create('canvas', 'leaflet-tile');
+            canvas.width = size.x;
+            canvas.height = size.y;
+
+            const count = 2 ** coords.z;
+            const x = ((coords.x % count) + count) % count;
+            const url = this.tileUrl.replace('{z}', coords.z).replace('{x}', x).replace('{y}', coords.y);
+            fetch(url, {credentials: 'same-origin'})
+                .then(response => (response.ok ? response.arrayBuffer() : new ArrayBuffer(0)))
+                .then(buffer => {
+                    this.markers.set(this.key(coords), this.draw(canvas, readTile(buffer)));
+                    done(null, canvas);
+                })
+                .catch(error => done(error, canvas));
+            return canvas;
+        },
+
+        draw(canvas, layers) {
+            const context = canvas.getContext('2d');
+            const markers = [];
+            for (const [name, features] of Object.entries(layers)) {
+                const style = STYLES[name];
+                if (!style) {
+                    continue;
+                }
+                for (const feature of features) {
+                    const {radius, fillColor, fillOpacity} = style(feature.properties);
+                    for (const [x, y] of feature.points) {
+                        const px = x * canvas.width;
+                        const py = y * canvas.height;
+                        context.beginPath();
+                        context.arc(px, py, radius, 0, 2 * Math.PI);
+                        context.globalAlpha = fillOpacity;
+                        context.fillStyle = fillColor;
+                        context.fill();
+                        context.globalAlpha = 1;
+                        context.lineWidth = 1;
+                        context.strokeStyle = '#fff';
+                        context.stroke();
+                        markers.push({x: px, y: py, radius, properties: feature.properties});
+                    }
+                }
+            }
+            return markers;
+        },
+
+        // Feature drawn under a map point, if any
+        featureAt(latlng) {
+            const zoom = Math.round(this._map.getZoom());
+            const size = this.getTileSize();
+            const point = this._map.project(latlng, zoom);
+            const x = Math.floor(point.x / size.x);
+            const y = Math.floor(point.y / size.y);
+            const dx = point.x - x * size.x;
+            const dy = point.y - y * size.y;
+            let found = null;
+            let best = Infinity;
+            for (const marker of this.markers.get(this.key({x, y, z: zoom})) || []) {
+                const distance = Math.hypot(marker.x - dx, marker.y - dy);
+                if (distance <= marker.radius + 2 && distance < best) {
+                    found = marker.properties;
+                    best = distance;
+                }
+            }
+            return found;
+        },
+    });
+
+    const element = document.getElementById('accommodation-map');
+    const changeUrl = element.dataset.changeUrl;
+    const map = L.map(element).setView([20, 0], 2);
+    L.tileLayer('https://tile.openstreetmap.org/{z}/{x}/{y}.png', {
+        maxZoom: 19,
+        attribution: '&copy; OpenStreetMap contributors'
+    }).addTo(map);
+
+    const tileUrl = element.dataset.tileUrl.replace('0/0/0.mvt', '{z}/{x}/{y}.mvt');
+    const accommodations = new AccommodationLayer(tileUrl).addTo(map);
+    map.on('click', event => {
+        const properties = accommodations.featureAt(event.latlng);
+        if (!properties) {
+            return;
+        }
+        if (properties.id) {
+            window.location = changeUrl.replace('__id__', encodeURIComponent(properties.id));
+        } else {
+            map.setView(event.latlng, map.getZoom() + 2);
+        }
+    });
+}
@@ -0,0 +1,17 @@
+'use strict';
+{
+    const $ = django.jQuery;
+
+    // Reload the changelist with the chosen location, keeping other filters
+    $(document).on('change', '.location-autocomplete-filter', function() {
+        const params = new URLSearchParams(window.location.search);
+        const name = this.dataset.parameterName;
+        if (this.value) {
+            params.set(name, this.value);
+        } else {
+            params.delete(name);
+        }
+        params.delete('p');
+        window.location.search = params.toString();
+    });
+}
@@ -0,0 +1,82 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+# Content-addressed files live under this prefix, fanned out by hash
+BLOB_PREFIX = 'accommodations/blobs'
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def content_digest(file, chunk_size=HASH_CHUNK_SIZE):
+    """
+    SHA-256 hex digest and size of a Django ``File``, read in chunks so
+    large uploads are never held in memory. Rewinds the file afterwards.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in file.chunks(chunk_size):
+        digest.update(chunk)
+        size += len(chunk)
+    if file.seekable():
+        file.seek(0)
+    return digest.hexdigest(), size
+
+
+def blob_name(digest, extension):
+    """
+    ``accommodations/blobs/ab/cd/abcd....jpg`` for a digest and file extension.
+    """
+    return f"{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension.lower()}"
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage where a name identifies its content: saving a name
+    that already exists keeps the stored file instead of writing a copy
+    under a new name.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        if self.exists(name):
+            return name
+
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        # Write beside the target and rename, so concurrent uploads of the
+        # same content never expose a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                for chunk in content.chunks():
+                    fp.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp_path, self.file_permissions_mode)
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return str(name).replace('\\', '/')
+
+
+_image_storage = None
+
+
+def image_storage():
+    """
+    Storage of AccommodationImage files (a callable, so settings such as
+    ``MEDIA_ROOT`` are read at runtime rather than frozen in migrations).
+    """
+    global _image_storage
+    if _image_storage is None:
+        _image_storage = ContentAddressedStorage()
+    return _image_storage
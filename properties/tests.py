@@ -15,6 +15,23 @@ from properties.models import (
     upload_accommodation_image
 )
 
+@pytest.fixture(autouse=True)
+def reset_process_caches():
+    """Process-local caches must not outlive a test's rolled-back transaction."""
+    from django.core.cache import cache
+    from properties.accommodation_detail import clear_detail_cache
+    from properties.location_resolver import clear_city_index
+    from properties.location_tree import clear_location_tree
+    from properties.models import Amenity
+    from properties.partitioning import get_registry
+
+    Amenity.objects.clear_cache()
+    get_registry().clear()
+    clear_location_tree()
+    clear_city_index()
+    clear_detail_cache()
+    cache.clear()
+
 @pytest.fixture
 def sample_location():
     """Create a sample Location instance for testing."""
@@ -78,6 +95,7 @@ def test_validate_amenities():
 def test_accommodation_model(sample_accommodation):
     """Test Accommodation model creation and constraints."""
     assert str(sample_accommodation) == 'Luxury Apartment - New York City'
+    assert sample_accommodation.location_label() == 'New York City'
     assert sample_accommodation.bedroom_count == 2
     assert sample_accommodation.review_score == Decimal('4.5')
     assert sample_accommodation.amenities == ['WiFi', 'Kitchen']
@@ -216,4 +234,996 @@ def test_signup_view_invalid_form(client):
 def pytest_configure(config):
     """Configure pytest settings."""
     import os
-    os.environ['DJANGO_SETTINGS_MODULE'] = 'your_project.settings'
\ No newline at end of file
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'your_project.settings'
+
+# management commands
+import json
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+@pytest.fixture
+def location_hierarchy():
+    """Create a small country -> state -> city hierarchy."""
+    country = Location.objects.create(
+        id='US', title='United States', center=Point(-98.5, 39.8),
+        location_type='country', country_code='US'
+    )
+    state = Location.objects.create(
+        id='US_NY', title='New York', center=Point(-75.0, 43.0), parent=country,
+        location_type='state', country_code='US', state_abbr='NY'
+    )
+    city = Location.objects.create(
+        id='US_NY_NYC', title='New York City', center=Point(-74.0060, 40.7128), parent=state,
+        location_type='city', country_code='US', state_abbr='NY', city='New York City'
+    )
+    return country, state, city
+
+@pytest.mark.django_db
+def test_generate_sitemap_single_query(location_hierarchy, settings, tmp_path):
+    """The sitemap is built from one Location query and streamed to disk."""
+    settings.BASE_DIR = tmp_path
+
+    with CaptureQueriesContext(connection) as queries:
+        call_command('generate_sitemap')
+
+    assert len(queries) == 1
+    with open(tmp_path / 'sitemap.json') as f:
+        data = json.load(f)
+    assert data == [{
+        'United States': 'united-states',
+        'locations': [{
+            'New York': 'new-york',
+            'locations': [{'New York City': 'united-states/new-york/new-york-city'}],
+        }],
+    }]
+
+@pytest.mark.django_db
+def test_generate_sitemap_sharded_is_incremental(location_hierarchy, tmp_path):
+    """Sharded mode only rewrites countries whose subtree changed since the last run."""
+    import gzip
+    output_dir = tmp_path / 'sitemap'
+
+    call_command('generate_sitemap', '--sharded', '--output-dir', str(output_dir))
+    shard = output_dir / 'us.json.gz'
+    with gzip.open(shard, 'rt') as f:
+        assert json.load(f)['United States'] == 'united-states'
+    with open(output_dir / 'index.json') as f:
+        assert json.load(f)[0]['shard'] == 'us.json.gz'
+
+    first_mtime = shard.stat().st_mtime_ns
+    call_command('generate_sitemap', '--sharded', '--output-dir', str(output_dir))
+    assert shard.stat().st_mtime_ns == first_mtime
+
+    _, _, city = location_hierarchy
+    city.title = 'NYC'
+    city.save()
+    call_command('generate_sitemap', '--sharded', '--output-dir', str(output_dir))
+    with gzip.open(shard, 'rt') as f:
+        cities = json.load(f)['locations'][0]['locations']
+    assert cities == [{'NYC': 'united-states/new-york/nyc'}]
+
+@pytest.mark.django_db
+def test_location_path_index(location_hierarchy, sample_user):
+    """Materialized paths drive descendants/ancestors and follow a reparent."""
+    country, state, city = location_hierarchy
+    assert city.path == 'US/US_NY/US_NY_NYC/'
+    assert list(country.descendants().order_by('depth')) == [state, city]
+    assert list(city.ancestors()) == [country, state]
+
+    accommodation = Accommodation.objects.create(
+        id='PROP1', feed=1, title='Loft', country_code='US', bedroom_count=1,
+        usd_rate=100, center=Point(-74.0, 40.7), location=city, user=sample_user
+    )
+    assert list(Accommodation.objects.in_location_subtree(country)) == [accommodation]
+
+    other_state = Location.objects.create(
+        id='US_NJ', title='New Jersey', center=Point(-74.5, 40.0), parent=country,
+        location_type='state', country_code='US', state_abbr='NJ'
+    )
+    state.parent = other_state
+    state.save()
+    city.refresh_from_db()
+    assert city.path == 'US/US_NJ/US_NY/US_NY_NYC/'
+    assert city.depth == 3
+    assert list(Accommodation.objects.in_location_subtree(other_state)) == [accommodation]
+
+@pytest.mark.django_db
+def test_location_tree_cache(location_hierarchy, django_assert_num_queries):
+    """Cached tree lookups stay off the database until a Location changes."""
+    from properties.location_tree import get_location_tree
+
+    country, state, city = location_hierarchy
+    tree = get_location_tree()
+    with django_assert_num_queries(0):
+        tree = get_location_tree()
+        assert tree.breadcrumbs(city.id) == [
+            ('US', 'United States'), ('US_NY', 'New York'), ('US_NY_NYC', 'New York City')
+        ]
+        assert tree.slug_path(city.id) == 'united-states/new-york/new-york-city'
+        assert tree.children_of(country.id) == [state.id]
+
+    city.title = 'NYC'
+    city.save()
+    assert get_location_tree().get(city.id).title == 'NYC'
+
+@pytest.mark.django_db(transaction=True)
+def test_ingest_feed_upserts_valid_rows(sample_location, tmp_path):
+    """Valid rows are COPY-loaded and upserted; invalid ones are rejected."""
+    feed_file = tmp_path / 'feed.jsonl'
+    rows = [
+        {'id': 'F1', 'title': 'Harbour View', 'country_code': 'us', 'bedroom_count': 2,
+         'usd_rate': '120.50', 'latitude': 40.71, 'longitude': -74.0,
+         'location_id': 'US_NY_NYC', 'amenities': ['WiFi'], 'published': True},
+        {'id': 'F2', 'title': 'Bad Amenities', 'country_code': 'US', 'bedroom_count': 1,
+         'usd_rate': '80', 'latitude': 40.7, 'longitude': -74.0,
+         'location_id': 'US_NY_NYC', 'amenities': ['A' * 101]},
+    ]
+    feed_file.write_text('\n'.join(json.dumps(row) for row in rows))
+
+    call_command('ingest_feed', '7', str(feed_file))
+    accommodation = Accommodation.objects.get(id='F1', feed=7)
+    assert accommodation.country_code == 'US'
+    assert accommodation.usd_rate == Decimal('120.50')
+    assert accommodation.amenities == ['WiFi']
+    assert not Accommodation.objects.filter(id='F2').exists()
+
+    rows[0]['title'] = 'Harbour View Deluxe'
+    feed_file.write_text(json.dumps(rows[0]))
+    call_command('ingest_feed', '7', str(feed_file))
+    assert Accommodation.objects.get(id='F1', feed=7).title == 'Harbour View Deluxe'
+
+def test_clean_feed_row_validates_center():
+    """A WKT center must be a WGS84 point in range, or the row is rejected."""
+    from properties.ingestion import clean_feed_row
+
+    row = {'id': 'C1', 'title': 'Center', 'country_code': 'US', 'bedroom_count': 1, 'usd_rate': '90'}
+    center = clean_feed_row({**row, 'center': 'POINT(-74 40.7)'}, 7)[7]
+    assert center == 'SRID=4326;POINT(-74.0 40.7)'
+
+    for bad, message in (
+        ('POINT(-74', 'not valid WKT'),
+        ('LINESTRING(0 0, 1 1)', 'must be a point'),
+        ('POINT(200 40)', 'out of range'),
+    ):
+        with pytest.raises(ValidationError, match=message):
+            clean_feed_row({**row, 'center': bad}, 7)
+
+    for rate in ('NaN', 'Infinity', '-inf'):
+        with pytest.raises(ValidationError, match='must be a number'):
+            clean_feed_row({**row, 'center': 'POINT(-74 40.7)', 'usd_rate': rate}, 7)
+
+@pytest.mark.django_db(transaction=True)
+def test_ingest_feed_reports_malformed_csv(tmp_path):
+    """A CSV the parser rejects ends in a CommandError, not a traceback."""
+    from django.core.management.base import CommandError
+
+    feed_file = tmp_path / 'feed.csv'
+    feed_file.write_text('id,title\nX1,"' + 'a' * 200000 + '"\n')
+    with pytest.raises(CommandError, match='Malformed CSV'):
+        call_command('ingest_feed', '7', str(feed_file))
+
+@pytest.mark.django_db(transaction=True)
+def test_ingest_feed_replace_swaps_partition(sample_location, sample_user, tmp_path):
+    """A full snapshot replaces the feed's rows but keeps sibling feeds of the range."""
+    for accommodation_id, feed in (('OLD', 7), ('SIBLING', 8)):
+        Accommodation.objects.create(
+            id=accommodation_id, feed=feed, title='Existing', country_code='US', bedroom_count=1,
+            usd_rate=50, center=Point(-74.0, 40.7), location=sample_location, user=sample_user
+        )
+    feed_file = tmp_path / 'snapshot.jsonl'
+    feed_file.write_text(json.dumps({
+        'id': 'NEW', 'title': 'Snapshot Row', 'country_code': 'US', 'bedroom_count': 3,
+        'usd_rate': '99', 'latitude': 40.7, 'longitude': -74.0, 'location_id': 'US_NY_NYC',
+    }))
+
+    call_command('ingest_feed', '7', str(feed_file), '--replace')
+
+    assert list(Accommodation.objects.filter(feed=7).values_list('id', flat=True)) == ['NEW']
+    assert Accommodation.objects.filter(id='SIBLING', feed=8).exists()
+
+    # Sibling writes landing after the copy are caught up before the swap
+    from properties.partitioning.feed_swap import FeedPartitionSwap
+
+    build = FeedPartitionSwap._build
+
+    def build_then_write(swap, *args):
+        loaded = build(swap, *args)
+        Accommodation.objects.filter(id='SIBLING', feed=8).update(title='Renamed')
+        Accommodation.objects.create(
+            id='LATE', feed=9, title='Late', country_code='US', bedroom_count=1,
+            usd_rate=50, center=Point(-74.0, 40.7), location=sample_location, user=sample_user
+        )
+        return loaded
+
+    with patch.object(FeedPartitionSwap, '_build', build_then_write):
+        call_command('ingest_feed', '7', str(feed_file), '--replace')
+
+    assert Accommodation.objects.get(id='SIBLING', feed=8).title == 'Renamed'
+    assert Accommodation.objects.filter(id='LATE', feed=9).exists()
+
+@pytest.mark.django_db(transaction=True)
+def test_ingest_feed_resolves_nearest_city(sample_location, tmp_path):
+    """Rows without a location_id get the nearest city in range from the grid index."""
+    from properties.location_resolver import CityIndex
+
+    index = CityIndex([('US_NY_NYC', -74.0060, 40.7128), ('FR_PARIS', 2.35, 48.85), ('FIJI', 179.9, -17.0)])
+    assert index.nearest(-73.95, 40.75)[0] == 'US_NY_NYC'
+    assert index.nearest(-179.9, -17.0)[0] == 'FIJI'
+    assert index.nearest(-70.0, 40.7) == (None, None)
+    assert index.resolve_many([(2.3, 48.9), (-74.0, 40.7), (2.3, 48.9)]) == ['FR_PARIS', 'US_NY_NYC', 'FR_PARIS']
+
+    feed_file = tmp_path / 'feed.jsonl'
+    rows = [
+        {'id': 'NEAR', 'title': 'Brooklyn Loft', 'country_code': 'US', 'bedroom_count': 1,
+         'usd_rate': '90', 'latitude': 40.68, 'longitude': -73.94},
+        {'id': 'NOWHERE', 'title': 'Mid Atlantic', 'country_code': 'US', 'bedroom_count': 1,
+         'usd_rate': '90', 'latitude': 35.0, 'longitude': -40.0},
+    ]
+    feed_file.write_text('\n'.join(json.dumps(row) for row in rows))
+
+    call_command('ingest_feed', '7', str(feed_file))
+    assert Accommodation.objects.get(id='NEAR', feed=7).location_id == 'US_NY_NYC'
+    assert not Accommodation.objects.filter(id='NOWHERE').exists()
+
+@pytest.mark.django_db
+def test_reassign_locations_keeps_descendants_of_the_nearest_city(location_hierarchy, sample_user):
+    """Rows already below their nearest city keep their location; coarser ones move down."""
+    from io import StringIO
+
+    _, state, city = location_hierarchy
+    district = Location.objects.create(
+        id='US_NY_NYC_QNS', title='Queens', center=Point(-73.5, 40.9), parent=city,
+        location_type='city', country_code='US', state_abbr='NY'
+    )
+    for accommodation_id, location in (('IN_DISTRICT', district), ('IN_STATE', state)):
+        Accommodation.objects.create(
+            id=accommodation_id, feed=1, title='Midtown', country_code='US', bedroom_count=1,
+            usd_rate=100, center=Point(-74.0, 40.7), location=location, user=sample_user
+        )
+
+    call_command('reassign_locations', stdout=StringIO())
+
+    assert Accommodation.objects.get(id='IN_DISTRICT').location_id == 'US_NY_NYC_QNS'
+    assert Accommodation.objects.get(id='IN_STATE').location_id == 'US_NY_NYC'
+
+@pytest.mark.django_db
+def test_partition_registry_discovers_and_creates_partitions():
+    """Partitions are read from the catalog and created on demand."""
+    from properties.partitioning import get_registry
+
+    registry = get_registry()
+    registry.refresh()
+    assert registry.language_partition('en') == 'properties_localizeaccommodation_en'
+    assert registry.feed_partition(1500)[:2] == (1000, 5000)
+
+    assert registry.language_partition('es') is None
+    assert registry.language_partition('es', create=True) == 'properties_localizeaccommodation_es'
+    assert registry.feed_partition(12345, create=True) == (12000, 13000, 'properties_accommodation_feed_12000_13000')
+
+@pytest.mark.django_db
+def test_partition_registry_covers_the_last_feed():
+    """The range holding SMALLINT_MAX ends at MAXVALUE and survives a catalog re-read."""
+    from properties.partitioning import get_registry
+    from properties.partitioning.partition_manager import FEED_UPPER_LIMIT
+
+    registry = get_registry()
+    lower, upper, table = registry.feed_partition(32767, create=True)
+    assert lower <= 32767 < upper == FEED_UPPER_LIMIT
+
+    registry.clear()
+    assert registry.feed_partition(32767) == (lower, upper, table)
+
+@pytest.mark.django_db
+def test_partition_registry_forgets_rolled_back_partitions():
+    """A partition created in a rolled-back savepoint is not served from the cache."""
+    from django.db import transaction
+    from properties.partitioning import get_registry
+
+    registry = get_registry()
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            assert registry.language_partition('pt', create=True) == 'properties_localizeaccommodation_pt'
+            raise RuntimeError
+
+    assert 'pt' not in registry.language_partitions
+    assert registry.language_partition('pt') is None
+
+@pytest.mark.django_db
+def test_bulk_insert_into_partitions(sample_accommodation):
+    """Rows are batched per language partition; unknown languages fall back per row."""
+    from properties.partitioning import bulk_insert_into_partitions
+
+    rows = [
+        LocalizeAccommodation(accommodation=sample_accommodation, language=language,
+                              description=f'Description {n}', policy={'pets': False})
+        for n, language in enumerate(['en', 'fr', 'en', 'it', 'it'])
+    ]
+    stats = bulk_insert_into_partitions(iter(rows), batch_size=2)
+
+    assert stats['properties_localizeaccommodation_en']['rows'] == 2
+    assert stats['properties_localizeaccommodation_fr']['rows'] == 1
+    assert stats['properties_localizeaccommodation_it']['rows'] == 2
+    assert LocalizeAccommodation.objects.filter(language='it').count() == 2
+    assert LocalizeAccommodation.objects.filter(language='en').first().policy == {'pets': False}
+
+    # A bad row late in the stream leaves nothing behind
+    rows = [
+        LocalizeAccommodation(accommodation=sample_accommodation, language=language, description='Late')
+        for language in ['en', 'en', 'fr', 'e1']
+    ]
+    with pytest.raises(ValueError, match="Invalid language code 'e1'"):
+        bulk_insert_into_partitions(iter(rows), batch_size=2)
+    assert not LocalizeAccommodation.objects.filter(description='Late').exists()
+
+@pytest.mark.django_db
+def test_detect_languages_flags_mismatches(sample_accommodation):
+    """The backfill stores detections and flags rows whose declared language disagrees."""
+    from io import StringIO
+
+    LocalizeAccommodation.objects.create(
+        accommodation=sample_accommodation,
+        language='en',
+        description="Un appartement de luxe au coeur de la ville, avec une vue magnifique sur le fleuve."
+    )
+    out = StringIO()
+    call_command('detect_languages', '--workers', '1', stdout=out)
+
+    localized = LocalizeAccommodation.objects.get(language='en')
+    assert localized.detected_language == 'fr'
+    assert localized.description_hash is not None
+    assert localized.language_mismatch
+    assert '1 rows flagged' in out.getvalue()
+
+@pytest.mark.django_db
+def test_localized_full_text_search(client, admin_client, sample_accommodation):
+    """Descriptions are stemmed with their language's config and ranked."""
+    from properties.search import search_localized
+
+    for language, description in (
+        ('en', 'Bright apartments with river views and a quiet garden.'),
+        ('fr', 'Appartements lumineux avec vue sur le fleuve.'),
+        ('de', 'Helle Wohnungen mit Blick auf den Fluss.'),
+    ):
+        LocalizeAccommodation.objects.create(accommodation=sample_accommodation, language=language, description=description)
+
+    assert [row.language for row in search_localized('apartment', language='en')] == ['en']
+    assert [row.language for row in search_localized('appartement lumineux', language='fr')] == ['fr']
+    assert [row.language for row in search_localized('Wohnung')] == ['de']
+    assert not search_localized('apartment', language='fr').exists()
+
+    response = client.get(reverse('localized_search'), {'q': 'river view', 'language': 'EN'})
+    assert response.status_code == 200
+    result, = response.json()['results']
+    assert result['accommodation'] == 'PROP123' and result['title'] == 'Luxury Apartment'
+    assert result['rank'] > 0
+
+    response = admin_client.get(reverse('admin:properties_localizeaccommodation_changelist'), {'q': 'fleuve'})
+    assert [row.language for row in response.context['cl'].result_list] == ['fr']
+
+def test_parse_importtime():
+    """-X importtime lines are parsed into module timings with nesting depth."""
+    from properties.management.commands.profile_imports import parse_importtime
+
+    entries = parse_importtime([
+        'import time: self [us] | cumulative | imported package',
+        'import time:       120 |        120 |     langdetect.utils',
+        'import time:       300 |        420 |   langdetect',
+        'import time:        50 |       2000 | mysite.wsgi',
+    ])
+    assert entries == [
+        ('langdetect.utils', 120, 120, 2),
+        ('langdetect', 300, 420, 1),
+        ('mysite.wsgi', 50, 2000, 0),
+    ]
+
+
+# api
+@pytest.fixture
+def published_accommodations(sample_location, sample_user):
+    """Three published accommodations around New York City and one far away."""
+    rows = [
+        ('GEO1', 1, -74.0060, 40.7128, Decimal('4.5')),
+        ('GEO2', 1, -74.0100, 40.7150, Decimal('4.8')),
+        ('GEO3', 2, -73.9900, 40.7300, Decimal('3.9')),
+        ('FAR1', 1, 2.3522, 48.8566, Decimal('4.9')),
+    ]
+    return [
+        Accommodation.objects.create(
+            id=accommodation_id, feed=feed, title=accommodation_id, country_code='US',
+            bedroom_count=2, review_score=score, usd_rate=100, center=Point(lng, lat),
+            location=sample_location, user=sample_user, published=True
+        )
+        for accommodation_id, feed, lng, lat, score in rows
+    ]
+
+@pytest.mark.django_db
+def test_geo_search_radius_bbox_and_nearest(client, published_accommodations):
+    """Radius, bbox and K-nearest queries return published rows with keyset pages."""
+    url = reverse('accommodation_geo_search')
+
+    response = client.get(url, {'mode': 'radius', 'lat': 40.7128, 'lng': -74.0060, 'radius': 5000, 'limit': 2})
+    assert response.status_code == 200
+    first_page = [row['id'] for row in response.json()['results']]
+    assert first_page == ['GEO1', 'GEO2']
+    cursor = response.json()['next_cursor']
+    response = client.get(url, {'mode': 'radius', 'lat': 40.7128, 'lng': -74.0060, 'radius': 5000, 'cursor': cursor})
+    assert [row['id'] for row in response.json()['results']] == ['GEO3']
+    assert response.json()['next_cursor'] is None
+
+    response = client.get(url, {'mode': 'bbox', 'bbox': '0,45,5,50'})
+    assert [row['id'] for row in response.json()['results']] == ['FAR1']
+
+    response = client.get(url, {'mode': 'nearest', 'lat': 48.85, 'lng': 2.35, 'limit': 2})
+    assert [row['id'] for row in response.json()['results']] == ['FAR1', 'GEO3']
+
+    response = client.get(url, {'mode': 'radius', 'lat': 40.7})
+    assert response.status_code == 400
+
+@pytest.mark.django_db
+def test_search_filters_and_keyset_pages(client, published_accommodations):
+    """Facet filters apply and pages follow (review_score DESC, id, feed)."""
+    url = reverse('accommodation_search')
+
+    response = client.get(url, {'limit': 2})
+    assert [row['id'] for row in response.json()['results']] == ['FAR1', 'GEO2']
+    response = client.get(url, {'limit': 2, 'cursor': response.json()['next_cursor']})
+    assert [row['id'] for row in response.json()['results']] == ['GEO1', 'GEO3']
+
+    # Cursor values must match their ordering column's type
+    from properties.pagination import encode_cursor
+    for values in (['high', 'GEO1', 1], ['4.5', 'GEO1', 'one'], ['4.5', ['GEO1'], 1], ['4.5', 'GEO1', 99999]):
+        response = client.get(url, {'cursor': encode_cursor(values)})
+        assert response.status_code == 400
+
+    response = client.get(url, {'review_min': '4.0', 'feed': 1, 'rate_max': '150'})
+    assert [row['id'] for row in response.json()['results']] == ['FAR1', 'GEO2', 'GEO1']
+
+    # Unpublished rows are listed only to staff and to their owner
+    Accommodation.objects.filter(pk='GEO2').update(published=False)
+    response = client.get(url, {'published': 'false'})
+    assert response.json()['results'] == []
+    User.objects.create_user(username='stranger', password='12345')
+    client.login(username='stranger', password='12345')
+    assert client.get(url, {'published': 'false'}).json()['results'] == []
+    client.login(username='testuser', password='12345')
+    assert [row['id'] for row in client.get(url, {'published': 'false'}).json()['results']] == ['GEO2']
+    assert 'GEO2' not in [row['id'] for row in client.get(url).json()['results']]
+
+@pytest.mark.django_db
+def test_search_plan_uses_index_and_prunes_partitions(published_accommodations):
+    """EXPLAIN shows an index scan confined to the feed's partition."""
+    from properties.search import SEARCH_ORDERING, search_accommodations
+    from properties.pagination import order_by_fields
+
+    queryset = search_accommodations({'feed': 1, 'review_min': Decimal('4.0')})
+    queryset = queryset.order_by(*order_by_fields(SEARCH_ORDERING))[:50]
+    with connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = queryset.explain()
+        # Per-partition copies of the search index, keyed by partition
+        cursor.execute("""
+            SELECT t.relname, c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_index x ON x.indexrelid = c.oid
+            JOIN pg_class t ON t.oid = x.indrelid
+            WHERE i.inhparent = 'idx_accommodation_search_score'::regclass
+        """)
+        partition_indexes = dict(cursor.fetchall())
+
+    assert f"using {partition_indexes['properties_accommodation_feed_0_1000']}" in plan
+    for partition, index in partition_indexes.items():
+        if partition != 'properties_accommodation_feed_0_1000':
+            assert partition not in plan and index not in plan
+    assert 'properties_accommodation_feed_default' not in plan
+
+@pytest.mark.django_db
+def test_amenities_are_interned_and_filterable(client, sample_accommodation):
+    """Amenity strings map to shared ids used for filtering and facet counts."""
+    from properties.models import Amenity
+
+    assert sorted(Amenity.objects.values_list('name', flat=True)) == ['Kitchen', 'WiFi']
+    assert sample_accommodation.amenity_ids == Amenity.objects.ids_for(['WiFi', 'Kitchen'])
+
+    url = reverse('accommodation_search')
+    response = client.get(url, {'amenities': 'WiFi,Kitchen', 'facets': 'true'})
+    assert [row['id'] for row in response.json()['results']] == ['PROP123']
+    assert response.json()['facets']['amenities'] == {'Kitchen': 1, 'WiFi': 1}
+
+    response = client.get(url, {'amenities': 'Sauna'})
+    assert response.json()['results'] == []
+
+    response = client.get(url, {'amenities': 'Sauna', 'facets': 'true'})
+    assert response.status_code == 200
+    assert response.json()['facets'] == {'amenities': {}}
+
+@pytest.mark.django_db
+def test_amenity_cache_ignores_rolled_back_names():
+    """Ids interned inside a transaction that rolls back are never cached."""
+    from django.db import transaction
+    from properties.models import Amenity
+
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            assert len(Amenity.objects.ids_for(['Hot Tub'], create=True)) == 1
+            raise RuntimeError
+
+    # No reset of the process cache in between
+    assert 'Hot Tub' not in Amenity.objects._ids
+    assert Amenity.objects.ids_for(['Hot Tub']) == []
+
+@pytest.mark.django_db
+def test_facet_rollups_follow_saves_and_match_live_counts(client, sample_accommodation):
+    """Rollups are updated on save/delete and agree with a live aggregate."""
+    from io import StringIO
+    from properties.facets import rollup_mismatches
+
+    url = reverse('accommodation_facets')
+    facets = client.get(url).json()['facets']
+    assert facets['country'] == {'US': 1}
+    assert facets['bedrooms'] == {'2': 1}
+    assert facets['amenity'] == {'Kitchen': 1, 'WiFi': 1}
+
+    sample_accommodation.bedroom_count = 6
+    sample_accommodation.amenities = ['WiFi']
+    sample_accommodation.save()
+    facets = client.get(url, {'facets': 'bedrooms,amenity', 'feeds': '1'}).json()['facets']
+    assert facets == {'bedrooms': {'5+': 1}, 'amenity': {'WiFi': 1}}
+    assert rollup_mismatches(1) == []
+
+    sample_accommodation.published = False
+    sample_accommodation.save()
+    assert client.get(url).json()['facets']['country'] == {}
+
+    # Drift introduced behind the signals' back is reported and repaired
+    Accommodation.objects.filter(pk='PROP123').update(published=True)
+    out = StringIO()
+    call_command('check_facet_rollups', '--fix', stdout=out)
+    assert 'Feed 1: ' in out.getvalue()
+    assert rollup_mismatches(1) == []
+
+    sample_accommodation.refresh_from_db()
+    sample_accommodation.delete()
+    assert client.get(url).json()['facets']['location'] == {}
+
+@pytest.mark.django_db
+def test_facet_counts_limit_per_facet_and_feed_scoped_ids(sample_accommodation):
+    """The top keys per facet come from SQL; the same id in another feed is a new row."""
+    from properties.facets import facet_counts, rollup_mismatches
+
+    Accommodation.objects.create(
+        id='PROP123', feed=2, title='Same Id, Other Feed', country_code='FR', bedroom_count=1,
+        usd_rate=90, center=Point(2.35, 48.85), location=sample_accommodation.location,
+        user=sample_accommodation.user, amenities=['WiFi'], published=True
+    )
+    assert rollup_mismatches(1) == [] and rollup_mismatches(2) == []
+
+    counts = facet_counts(facets=('amenity', 'country'), limit=1)
+    assert counts == {'amenity': {'WiFi': 2}, 'country': {'FR': 1}}
+    assert facet_counts(facets=('country',), feeds=[1]) == {'country': {'US': 1}}
+
+# admin
+
+@pytest.fixture
+def admin_client(client):
+    superuser = User.objects.create_superuser(username='admin', password='admin12345')
+    client.force_login(superuser)
+    return client
+
+@pytest.mark.django_db
+def test_accommodation_changelist_filters_by_location(admin_client, sample_accommodation):
+    """The changelist joins Location, filters by it and defers geometry."""
+    url = reverse('admin:properties_accommodation_changelist')
+    response = admin_client.get(url, {'location__id__exact': 'US_NY_NYC'})
+    assert response.status_code == 200
+    page = list(response.context['cl'].result_list)
+    assert [accommodation.pk for accommodation in page] == ['PROP123']
+    assert 'center' in page[0].get_deferred_fields()
+
+    response = admin_client.get(url, {'location__id__exact': 'NOWHERE'})
+    assert response.context['cl'].result_count == 0
+
+@pytest.mark.django_db
+def test_estimated_count_paginator(sample_accommodation):
+    """Small or unanalysed sets are counted exactly; large ones use the planner."""
+    from properties.pagination import EstimatedCountPaginator
+
+    assert EstimatedCountPaginator(Accommodation.objects.order_by('pk'), 10).count == 1
+
+    paginator = EstimatedCountPaginator(Accommodation.objects.filter(feed=1).order_by('pk'), 10)
+    paginator.exact_count_threshold = 0
+    assert isinstance(paginator.count, int)
+    assert paginator.count == paginator.estimated_count()
+
+@pytest.fixture
+def owner_client(client, sample_user):
+    """A staff Property Owner with the group's accommodation permissions."""
+    from django.contrib.auth.models import Permission
+
+    group = Group.objects.create(name='Property Owners')
+    group.permissions.set(Permission.objects.filter(
+        codename__in=['add_accommodation', 'change_accommodation', 'view_accommodation']
+    ))
+    sample_user.is_staff = True
+    sample_user.save()
+    sample_user.groups.add(group)
+    client.force_login(sample_user)
+    return client
+
+@pytest.mark.django_db
+def test_owner_changelist_query_count_is_constant(owner_client, sample_location, sample_user):
+    """Group membership and permissions are resolved once per request, not per row."""
+    other = User.objects.create_user(username='other', password='12345')
+
+    def add_rows(start, count, user):
+        for number in range(start, start + count):
+            Accommodation.objects.create(
+                id=f'OWN{number}', feed=1, title=f'Owned {number}', country_code='US',
+                bedroom_count=1, usd_rate=100, center=Point(-74.0, 40.7),
+                location=sample_location, user=user, published=True
+            )
+
+    url = reverse('admin:properties_accommodation_changelist')
+    add_rows(0, 2, sample_user)
+    add_rows(100, 2, other)
+    with CaptureQueriesContext(connection) as small_page:
+        response = owner_client.get(url)
+    assert sorted(row.pk for row in response.context['cl'].result_list) == ['OWN0', 'OWN1']
+
+    add_rows(2, 10, sample_user)
+    with CaptureQueriesContext(connection) as large_page:
+        response = owner_client.get(url)
+    assert len(response.context['cl'].result_list) == 12
+    assert len(large_page) == len(small_page)
+
+    # Other users' rows cannot be opened for editing
+    response = owner_client.get(reverse('admin:properties_accommodation_change', args=['OWN100']))
+    assert response.status_code in (302, 404)
+
+@pytest.mark.django_db
+def test_bulk_actions_update_per_partition(admin_client, published_accommodations):
+    """Admin actions update the selection set-based, one statement per partition."""
+    from properties.bulk_actions import apply_bulk_update, feed_partition_bounds
+    from properties.facets import rollup_mismatches
+    from properties.models import BulkJob
+
+    url = reverse('admin:properties_accommodation_changelist')
+    response = admin_client.post(url, {
+        'action': 'unpublish', 'index': 0, '_selected_action': ['GEO1', 'GEO3'],
+    })
+    assert response.status_code == 302
+    assert sorted(Accommodation.objects.filter(published=False).values_list('pk', flat=True)) == ['GEO1', 'GEO3']
+    assert rollup_mismatches(1) == [] and rollup_mismatches(2) == []
+
+    new_owner = User.objects.create_user(username='newowner', password='12345')
+    job = BulkJob.objects.create(action='reassign_user', changes={'user_id': new_owner.pk})
+    updated = apply_bulk_update(Accommodation.objects.filter(feed=1), job.changes, job=job)
+    assert updated == 3
+    job.refresh_from_db()
+    assert job.partitions_done == job.partitions_total == len(feed_partition_bounds())
+    assert job.rows_updated == 3
+    assert Accommodation.objects.filter(user=new_owner).count() == 3
+
+    # Rows already holding the value are not rewritten
+    assert apply_bulk_update(Accommodation.objects.filter(feed=1), job.changes) == 0
+
+@pytest.mark.django_db
+def test_bulk_jobs_run_from_stored_selection(admin_client, published_accommodations, sample_location, sample_user):
+    """Select-across queues a job the worker runs; an interrupted job is resumed."""
+    from io import StringIO
+    from properties.models import BulkJob
+
+    url = reverse('admin:properties_accommodation_changelist')
+    response = admin_client.post(url, {
+        'action': 'unpublish', 'index': 0, 'select_across': '1',
+        '_selected_action': ['GEO1'],
+    })
+    assert response.status_code == 302
+    job = BulkJob.objects.get()
+    assert job.status == 'pending' and job.selection == {'1': ['FAR1', 'GEO1', 'GEO2'], '2': ['GEO3']}
+    assert Accommodation.objects.filter(published=False).count() == 0
+    # Rows added after the job was queued are not part of its selection
+    Accommodation.objects.create(
+        id='LATE1', feed=1, title='Late', country_code='US', bedroom_count=1, usd_rate=50,
+        center=Point(-74.0, 40.7), location=sample_location, user=sample_user, published=True
+    )
+
+    call_command('run_bulk_jobs', '--once', stdout=StringIO())
+    job.refresh_from_db()
+    assert (job.status, job.attempts) == ('done', 1)
+    assert list(Accommodation.objects.filter(published=True).values_list('pk', flat=True)) == ['LATE1']
+
+    # A worker died mid-way: nobody holds the job's lock, so it runs again
+    BulkJob.objects.filter(pk=job.pk).update(status='running', changes={'published': True})
+    call_command('run_bulk_jobs', '--once', stdout=StringIO())
+    job.refresh_from_db()
+    assert (job.status, job.attempts) == ('done', 2)
+    assert job.partitions_done == job.partitions_total
+    assert not Accommodation.objects.filter(published=False).exists()
+
+# images
+
+@pytest.mark.django_db
+def test_image_variants_and_backfill(sample_accommodation, settings, tmp_path):
+    """Variants are never upscaled, dimensions and placeholder are recorded."""
+    from io import BytesIO, StringIO
+    from django.core.files.storage import default_storage
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from PIL import Image
+    from properties.models import AccommodationImage
+
+    settings.MEDIA_ROOT = str(tmp_path)
+    buffer = BytesIO()
+    Image.new('RGB', (800, 400), (200, 30, 30)).save(buffer, 'JPEG')
+    image = AccommodationImage.objects.create(
+        accommodation=sample_accommodation,
+        image=SimpleUploadedFile('Beach View.jpg', buffer.getvalue(), content_type='image/jpeg'),
+    )
+    assert image.processed_at is None
+
+    out = StringIO()
+    call_command('process_images', '--workers', '1', stdout=out)
+    image.refresh_from_db()
+    assert (image.width, image.height) == (800, 400)
+    assert sorted(image.variants['webp'], key=int) == ['320', '640', '800']
+    assert image.placeholder.startswith('data:image/jpeg;base64,')
+    with default_storage.open(image.variants['jpeg']['320']) as fp:
+        assert Image.open(fp).size == (320, 160)
+    assert '640w' in image.srcset()
+
+    # Already processed images are skipped on the next run
+    out = StringIO()
+    call_command('process_images', '--workers', '1', stdout=out)
+    assert 'Processed 0 images' in out.getvalue()
+
+@pytest.mark.django_db
+def test_identical_images_share_one_blob(sample_accommodation, settings, tmp_path, django_capture_on_commit_callbacks):
+    """Uploads are content addressed and reference counted."""
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from properties.models import AccommodationImage, ImageBlob
+    from properties.storage import image_storage
+
+    settings.MEDIA_ROOT = str(tmp_path)
+
+    def upload(filename, content):
+        return AccommodationImage.objects.create(
+            accommodation=sample_accommodation,
+            image=SimpleUploadedFile(filename, content, content_type='image/jpeg'),
+        )
+
+    first = upload('front.jpg', b'same bytes')
+    second = upload('copy-of-front.JPG', b'same bytes')
+    other = upload('back.jpg', b'other bytes')
+
+    assert first.image.name == second.image.name != other.image.name
+    assert first.image.name.startswith('accommodations/blobs/')
+    assert ImageBlob.objects.get(pk=first.blob_id).ref_count == 2
+    path = image_storage().path(first.image.name)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        first.delete()
+    assert ImageBlob.objects.get(pk=second.blob_id).ref_count == 1
+    assert os.path.exists(path)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        second.delete()
+    assert not ImageBlob.objects.filter(pk=second.blob_id).exists()
+    assert not os.path.exists(path)
+
+@pytest.mark.django_db
+def test_replaced_image_releases_old_blob_and_variants(sample_accommodation, settings, tmp_path, django_capture_on_commit_callbacks):
+    """Uploading a new file drops the old blob's reference, file and variants."""
+    from django.core.files.base import ContentFile
+    from django.core.files.storage import default_storage
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from properties.models import AccommodationImage, ImageBlob
+
+    settings.MEDIA_ROOT = str(tmp_path)
+    image = AccommodationImage.objects.create(
+        accommodation=sample_accommodation,
+        image=SimpleUploadedFile('front.jpg', b'old bytes', content_type='image/jpeg'),
+    )
+    old_blob = image.blob_id
+    variant = default_storage.save('accommodations/variants/front-320.webp', ContentFile(b'variant'))
+    AccommodationImage.objects.filter(pk=image.pk).update(variants={'webp': {'320': variant}})
+    image.refresh_from_db()
+
+    image.image = SimpleUploadedFile('front.jpg', b'new bytes', content_type='image/jpeg')
+    with django_capture_on_commit_callbacks(execute=True):
+        image.save()
+
+    assert image.blob_id != old_blob
+    assert image.variants == {}
+    assert not ImageBlob.objects.filter(pk=old_blob).exists()
+    assert not default_storage.exists(variant)
+
+# location import
+
+@pytest.mark.django_db
+def test_bulk_location_import_orders_parents_and_rebuilds_paths():
+    """Children listed before parents import in bulk with correct paths."""
+    from tablib import Dataset
+    from properties.resources import BulkLocationResource, topological_order
+
+    assert topological_order([('c', 'b'), ('b', 'a'), ('a', None)]) == [2, 1, 0]
+    with pytest.raises(ValueError):
+        topological_order([('a', 'b'), ('b', 'a')])
+
+    dataset = Dataset(headers=['id', 'title', 'center', 'parent', 'location_type', 'country_code'])
+    dataset.append(['FR_IDF_PAR', 'Paris', 'POINT(2.3522 48.8566)', 'FR_IDF', 'city', 'FR'])
+    dataset.append(['FR_IDF', 'Ile-de-France', 'SRID=4326;POINT(2.5 48.7)', 'FR', 'state', 'FR'])
+    dataset.append(['FR', 'France', 'POINT(2.2 46.2)', '', 'country', 'FR'])
+
+    with CaptureQueriesContext(connection) as queries:
+        result = BulkLocationResource().import_data(dataset, dry_run=False, raise_errors=True)
+    assert not result.has_errors()
+    assert len(queries) < 15
+
+    paris = Location.objects.get(pk='FR_IDF_PAR')
+    assert paris.path == 'FR/FR_IDF/FR_IDF_PAR/'
+    assert paris.depth == 2
+    assert (paris.center.x, paris.center.y) == (2.3522, 48.8566)
+
+    dataset = Dataset(headers=['id', 'title', 'center', 'parent', 'location_type', 'country_code'])
+    dataset.append(['XX_1', 'Orphan', 'POINT(0 0)', 'NOPE', 'city', 'XX'])
+    result = BulkLocationResource().import_data(dataset, dry_run=False)
+    assert result.has_errors()
+    assert 'Unknown parent locations: NOPE' in str(result.base_errors[0].error)
+    assert not Location.objects.filter(pk='XX_1').exists()
+
+@pytest.mark.django_db
+def test_bulk_location_import_regenerates_changed_sitemap_shard(location_hierarchy, tmp_path):
+    """Rows updated by a bulk import advance updated_at, so their shard is rewritten."""
+    import gzip
+    from tablib import Dataset
+    from properties.resources import BulkLocationResource
+
+    output_dir = tmp_path / 'sitemap'
+    call_command('generate_sitemap', '--sharded', '--output-dir', str(output_dir))
+    shard = output_dir / 'us.json.gz'
+
+    dataset = Dataset(headers=['id', 'title', 'center', 'parent', 'location_type', 'country_code'])
+    dataset.append(['US_NY_NYC', 'Big Apple', 'POINT(-74.006 40.7128)', 'US_NY', 'city', 'US'])
+    result = BulkLocationResource().import_data(dataset, dry_run=False, raise_errors=True)
+    assert not result.has_errors()
+
+    call_command('generate_sitemap', '--sharded', '--output-dir', str(output_dir))
+    with gzip.open(shard, 'rt') as f:
+        cities = json.load(f)['locations'][0]['locations']
+    assert cities == [{'Big Apple': 'united-states/new-york/big-apple'}]
+
+# export
+
+@pytest.mark.django_db
+def test_streaming_export_formats(client, sample_accommodation):
+    """The export endpoint streams JSONL, GeoJSON and gzipped CSV to authenticated users."""
+    import gzip
+    from properties.models import LocalizeAccommodation
+
+    LocalizeAccommodation.objects.create(
+        accommodation=sample_accommodation, language='en', description='A bright flat.'
+    )
+    url = reverse('accommodation_export')
+    assert client.get(url).status_code in (401, 403)
+
+    client.force_login(User.objects.create_user(username='partner', password='12345'))
+    response = client.get(url, {'export_format': 'jsonl'})
+    assert response.streaming
+    lines = b''.join(response.streaming_content).decode().splitlines()
+    record = json.loads(lines[0])
+    assert len(lines) == 1
+    assert record['location']['id'] == 'US_NY_NYC'
+    assert record['localized'] == [{'language': 'en', 'description': 'A bright flat.', 'policy': None}]
+
+    response = client.get(url, {'export_format': 'geojson'})
+    collection = json.loads(b''.join(response.streaming_content))
+    assert collection['features'][0]['geometry']['coordinates'] == [-74.006, 40.7128]
+
+    response = client.get(url, {'export_format': 'csv', 'gzip': 'true'})
+    assert response['Content-Disposition'].endswith('accommodations.csv.gz"')
+    rows = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+    assert rows[0].startswith('id,feed,title') and rows[1].startswith('PROP123,1,')
+
+    # Unpublished rows only go to staff and their owner, and only on request
+    Accommodation.objects.filter(pk='PROP123').update(published=False)
+    for params in ({}, {'published_only': 'false'}):
+        assert b''.join(client.get(url, params).streaming_content) == b''
+    client.force_login(sample_accommodation.user)
+    assert b''.join(client.get(url).streaming_content) == b''
+    assert b'PROP123' in b''.join(client.get(url, {'published_only': 'false'}).streaming_content)
+
+# map tiles
+
+@pytest.mark.django_db
+def test_vector_tiles_are_cached_and_invalidated(client, published_accommodations, settings, tmp_path, django_capture_on_commit_callbacks):
+    """Tiles render with ST_AsMVT, are cached on disk and dropped when a point moves."""
+    from properties.tiles import CLUSTER_MAX_ZOOM, TileCache, tile_for_point
+
+    cache = TileCache(str(tmp_path / 'tiles'), max_bytes=1024 * 1024)
+    with patch('properties.tiles._tile_cache', cache):
+        z = CLUSTER_MAX_ZOOM
+        x, y = tile_for_point(-74.0060, 40.7128, z)
+        response = client.get(reverse('accommodation_tile', args=[z, x, y]))
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'application/vnd.mapbox-vector-tile'
+        assert len(response.content) > 0
+        assert cache.get(z, x, y) == response.content
+
+        # Low zooms serve clusters
+        assert client.get(reverse('accommodation_tile', args=[0, 0, 0])).status_code == 200
+        assert client.get(reverse('accommodation_tile', args=[1, 5, 0])).status_code == 404
+
+        accommodation = published_accommodations[0]
+        accommodation.center = Point(2.35, 48.85)
+        with django_capture_on_commit_callbacks(execute=True):
+            accommodation.save()
+        assert cache.get(z, x, y) is None
+        assert cache.get(0, 0, 0) is None
+
+def test_tile_cache_discards_stale_and_expired_tiles(tmp_path):
+    """A tile rendered before an invalidation is never served, even if written after it."""
+    import time
+    from properties.tiles import TileCache
+
+    cache = TileCache(str(tmp_path / 'tiles'), max_bytes=1024 * 1024, max_age=60)
+    started = time.time() - 5
+    cache.invalidate_point(-74.0, 40.7)
+    cache.put(0, 0, 0, b'stale', started)
+    assert cache.get(0, 0, 0) is None
+
+    cache.put(0, 0, 0, b'fresh', time.time() + 2 * TileCache.MTIME_SLACK)
+    assert cache.get(0, 0, 0) == b'fresh'
+
+    cache.put(1, 0, 0, b'old', time.time() - 120)
+    assert cache.get(1, 0, 0) is None
+
+    cache.clear()
+    cache.put(1, 1, 1, b'racing', started)
+    assert cache.get(1, 1, 1) is None
+
+# accommodation detail
+
+@pytest.mark.django_db
+def test_accommodation_detail_is_cached_with_language_fallback(client, location_hierarchy, sample_user, django_assert_num_queries):
+    """The payload takes two queries, is served from cache and revalidated by ETag."""
+    from properties.accommodation_detail import build_detail
+    from properties.location_tree import get_location_tree
+    from properties.partitioning import get_registry
+
+    country, state, city = location_hierarchy
+    accommodation = Accommodation.objects.create(
+        id='DETAIL1', feed=1, title='Riverside Studio', country_code='US', bedroom_count=1,
+        usd_rate=120, center=Point(-74.0, 40.7), location=city, user=sample_user, published=True
+    )
+    LocalizeAccommodation.objects.create(accommodation=accommodation, language='en', description='A calm studio.')
+    LocalizeAccommodation.objects.create(accommodation=accommodation, language='fr', description='Un studio calme.')
+    get_location_tree()
+    get_registry().language_partitions
+
+    with django_assert_num_queries(2):
+        payload = build_detail('DETAIL1', 'fr')
+    assert [link['id'] for link in payload['location_chain']] == ['US', 'US_NY', 'US_NY_NYC']
+    assert payload['localized'] == {'language': 'fr', 'description': 'Un studio calme.', 'policy': None, 'fallback': False}
+
+    url = reverse('accommodation_detail', args=['DETAIL1'])
+    response = client.get(url, {'language': 'de'})
+    assert response.status_code == 200
+    assert response.json()['localized']['language'] == 'en'
+    assert response.json()['localized']['fallback'] is True
+    etag = response['ETag']
+
+    with django_assert_num_queries(0):
+        response = client.get(url, {'language': 'de'}, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+    english = LocalizeAccommodation.objects.get(accommodation=accommodation, language='en')
+    english.description = 'A calm studio by the river.'
+    english.save()
+    response = client.get(url, {'language': 'de'}, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+    assert response.json()['localized']['description'] == 'A calm studio by the river.'
+
+    assert client.get(reverse('accommodation_detail', args=['MISSING'])).status_code == 404
+
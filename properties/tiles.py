@@ -0,0 +1,279 @@
+import math
+import os
+import shutil
+import struct
+import threading
+import time
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Accommodation
+
+MAX_ZOOM = 22
+
+# Below this zoom points are aggregated into grid clusters
+CLUSTER_MAX_ZOOM = getattr(settings, 'TILE_CLUSTER_MAX_ZOOM', 10)
+
+# Cluster cells per tile side
+CLUSTER_GRID = 64
+
+# Width of the Web Mercator world in meters
+WORLD_WIDTH = 2 * math.pi * 6378137
+
+TILE_CACHE_DIR = getattr(settings, 'TILE_CACHE_DIR', os.path.join(settings.BASE_DIR, 'tile_cache'))
+TILE_CACHE_MAX_BYTES = getattr(settings, 'TILE_CACHE_MAX_BYTES', 256 * 1024 * 1024)
+# Tiles rendered longer ago than this many seconds are re-rendered
+TILE_CACHE_MAX_AGE = getattr(settings, 'TILE_CACHE_MAX_AGE', 3600)
+
+# Every cached tile starts with the time its render began
+TILE_HEADER = struct.Struct('>d')
+
+ACCOMMODATION_TABLE = Accommodation._meta.db_table
+
+POINTS_SQL = f"""
+    WITH bounds AS (SELECT ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS geom),
+    features AS (
+        SELECT ST_AsMVTGeom(ST_Transform(a.center, 3857), bounds.geom) AS geom,
+               a.id, a.feed, a.title, a.review_score::float8 AS review_score, a.usd_rate::float8 AS usd_rate
+        FROM {ACCOMMODATION_TABLE} a, bounds
+        WHERE a.published AND a.center && ST_Transform(bounds.geom, 4326)
+    )
+    SELECT ST_AsMVT(features.*, 'accommodations') FROM features
+"""
+
+CLUSTERS_SQL = f"""
+    WITH bounds AS (SELECT ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS geom),
+    points AS (
+        SELECT ST_Transform(a.center, 3857) AS geom
+        FROM {ACCOMMODATION_TABLE} a, bounds
+        WHERE a.published AND a.center && ST_Transform(bounds.geom, 4326)
+    ),
+    clusters AS (
+        SELECT count(*) AS point_count, ST_Centroid(ST_Collect(geom)) AS geom
+        FROM points
+        GROUP BY ST_SnapToGrid(geom, %(cell)s)
+    ),
+    features AS (
+        SELECT ST_AsMVTGeom(clusters.geom, bounds.geom) AS geom, clusters.point_count
+        FROM clusters, bounds
+    )
+    SELECT ST_AsMVT(features.*, 'clusters') FROM features
+"""
+
+
+def valid_tile(z, x, y):
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def tile_for_point(lng, lat, z):
+    """
+    ``(x, y)`` of the Web Mercator tile containing the point at zoom ``z``.
+    """
+    lat = max(min(lat, 85.0511), -85.0511)
+    n = 2 ** z
+    x = int((lng + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def render_tile(z, x, y):
+    """
+    Build one Mapbox Vector Tile in PostGIS: individual accommodations from
+    ``CLUSTER_MAX_ZOOM`` on, grid clusters with a ``point_count`` below it.
+    """
+    if z < CLUSTER_MAX_ZOOM:
+        sql = CLUSTERS_SQL
+        params = {'z': z, 'x': x, 'y': y, 'cell': WORLD_WIDTH / 2 ** z / CLUSTER_GRID}
+    else:
+        sql = POINTS_SQL
+        params = {'z': z, 'x': x, 'y': y}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        tile = cursor.fetchone()[0]
+    return bytes(tile) if tile else b''
+
+
+class TileCache:
+    """
+    On-disk tile cache shared by all worker processes, bounded to
+    ``max_bytes`` by evicting the least recently read tiles (by mtime).
+
+    Each tile carries the time its render began. Invalidations leave a
+    marker file behind, so a tile whose render started before the last
+    invalidation of its position (or of the whole cache) is never served,
+    even if it was written afterwards; tiles older than ``max_age`` expire.
+    """
+
+    INVALIDATED_SUFFIX = '.invalidated'
+    CLEARED_MARKER = '.cleared'
+
+    # Allowance for filesystems that store mtimes at a coarse resolution
+    MTIME_SLACK = 1.0
+
+    # Sweeps trim the cache to this share of max_bytes, so the next one is
+    # only due after that much has been written
+    LOW_WATER = 0.9
+
+    def __init__(self, root, max_bytes, max_age=TILE_CACHE_MAX_AGE):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        # Size found by the last sweep plus what this process wrote since;
+        # unknown until the first sweep
+        self._estimated_bytes = None
+        self._lock = threading.Lock()
+
+    def path(self, z, x, y):
+        return os.path.join(self.root, str(z), str(x), f"{y}.mvt")
+
+    def _mtime(self, path):
+        try:
+            return os.stat(path).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def _touch(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb'):
+            pass
+        now = time.time()
+        os.utime(path, (now, now))
+
+    def get(self, z, x, y):
+        path = self.path(z, x, y)
+        try:
+            with open(path, 'rb') as fp:
+                data = fp.read()
+        except FileNotFoundError:
+            return None
+        if len(data) < TILE_HEADER.size:
+            return None
+        (rendered_at,) = TILE_HEADER.unpack_from(data)
+        if rendered_at < time.time() - self.max_age:
+            return None
+        for marker in (path + self.INVALIDATED_SUFFIX, os.path.join(self.root, self.CLEARED_MARKER)):
+            invalidated_at = self._mtime(marker)
+            if invalidated_at is not None and rendered_at <= invalidated_at + self.MTIME_SLACK:
+                return None
+        try:
+            # Reads refresh the LRU position
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return data[TILE_HEADER.size:]
+
+    def put(self, z, x, y, data, rendered_at):
+        """
+        Store a tile whose render began at ``rendered_at`` (a ``time.time()``).
+        """
+        path = self.path(z, x, y)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid4().hex[:8]}.tmp"
+        with open(tmp_path, 'wb') as fp:
+            fp.write(TILE_HEADER.pack(rendered_at))
+            fp.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._estimated_bytes is not None:
+                self._estimated_bytes += TILE_HEADER.size + len(data)
+            sweep = self._estimated_bytes is None or self._estimated_bytes > self.max_bytes
+        if sweep:
+            self.evict()
+
+    def evict(self):
+        """
+        Delete least recently used tiles until the cache fits in
+        ``LOW_WATER * max_bytes``, along with expired invalidation markers.
+        """
+        entries = []
+        total = 0
+        expired = time.time() - self.max_age
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                path = os.path.join(directory, name)
+                if name.endswith(self.INVALIDATED_SUFFIX):
+                    invalidated_at = self._mtime(path)
+                    # Tiles rendered before it have expired anyway
+                    if invalidated_at is not None and invalidated_at + self.MTIME_SLACK < expired:
+                        try:
+                            os.unlink(path)
+                        except FileNotFoundError:
+                            pass
+                    continue
+                if not name.endswith('.mvt'):
+                    continue
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        entries.sort()
+        target = self.max_bytes * self.LOW_WATER
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        with self._lock:
+            self._estimated_bytes = total
+
+    def invalidate_point(self, lng, lat):
+        """
+        Drop the tile containing the point at every zoom level.
+        """
+        for z in range(MAX_ZOOM + 1):
+            x, y = tile_for_point(lng, lat, z)
+            path = self.path(z, x, y)
+            self._touch(path + self.INVALIDATED_SUFFIX)
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        """
+        Drop every tile. The directory is renamed first so readers never see
+        a half-deleted cache; the marker left behind voids tiles whose render
+        was already under way.
+        """
+        if os.path.isdir(self.root):
+            stale = f"{self.root}.stale-{uuid4().hex[:8]}"
+            try:
+                os.rename(self.root, stale)
+            except FileNotFoundError:
+                stale = None
+            if stale:
+                shutil.rmtree(stale, ignore_errors=True)
+        self._touch(os.path.join(self.root, self.CLEARED_MARKER))
+        with self._lock:
+            self._estimated_bytes = 0
+
+
+_tile_cache = None
+
+
+def get_tile_cache():
+    global _tile_cache
+    if _tile_cache is None:
+        _tile_cache = TileCache(TILE_CACHE_DIR, TILE_CACHE_MAX_BYTES)
+    return _tile_cache
+
+
+def get_tile(z, x, y):
+    """
+    Cached tile bytes, rendering and storing them on a miss.
+    """
+    cache = get_tile_cache()
+    data = cache.get(z, x, y)
+    if data is None:
+        rendered_at = time.time()
+        data = render_tile(z, x, y)
+        cache.put(z, x, y, data, rendered_at)
+    return data
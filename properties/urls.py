@@ -5,5 +5,12 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('signup/', views.signup, name='signup'),
     path('signup/success/', views.signup_success, name='signup_success'),
+    path('api/accommodations/search/', views.AccommodationSearchView.as_view(), name='accommodation_search'),
+    path('api/accommodations/export/', views.AccommodationExportView.as_view(), name='accommodation_export'),
+    path('api/accommodations/facets/', views.AccommodationFacetsView.as_view(), name='accommodation_facets'),
+    path('api/accommodations/localized/search/', views.LocalizedSearchView.as_view(), name='localized_search'),
+    path('api/accommodations/geo/', views.AccommodationGeoSearchView.as_view(), name='accommodation_geo_search'),
+    path('api/accommodations/<str:pk>/', views.AccommodationDetailView.as_view(), name='accommodation_detail'),
+    path('tiles/<int:z>/<int:x>/<int:y>.mvt', views.accommodation_tile, name='accommodation_tile'),
 ]
 
@@ -1,8 +1,31 @@
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.http import parse_etags
 from django.contrib.auth.models import Group
 from django.contrib import messages
 from django.shortcuts import render, redirect
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .accommodation_detail import get_detail
+from .export import CONTENT_TYPES, encode_stream, export_queryset, iter_export
+from .facets import FACETS, facet_counts
 from .forms import SignUpForm
+from .geo_search import geo_search
+from .models import LocalizeAccommodation
+from .pagination import paginate_keyset
+from .permissions import IsOwnerOrReadOnly, get_permission_context
+from .search import SEARCH_ORDERING, amenity_facet_counts, search_accommodations, search_localized
+from .serializers import (
+    AccommodationListSerializer,
+    DetailParamsSerializer,
+    ExportParamsSerializer,
+    FacetParamsSerializer,
+    GeoSearchParamsSerializer,
+    LocalizedSearchParamsSerializer,
+    LocalizedSearchResultSerializer,
+    SearchParamsSerializer,
+)
+from .tiles import get_tile, valid_tile
 import logging
 
 logger = logging.getLogger(__name__)
@@ -51,3 +74,166 @@ def signup_success(request):
     View for displaying a success message after the user signs up.
     """
     return render(request, 'signup_success.html')
+
+
+class AccommodationGeoSearchView(APIView):
+    """
+    Read-only radius, bounding-box and K-nearest search over published
+    accommodations, with keyset pagination via an opaque ``cursor``.
+    """
+    permission_classes = [IsOwnerOrReadOnly]
+
+    def get(self, request):
+        params = GeoSearchParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        queryset, ordering = geo_search(params.validated_data)
+        rows, next_cursor = paginate_keyset(
+            queryset, ordering, params.validated_data['limit'], params.validated_data.get('cursor')
+        )
+        return Response({
+            'results': AccommodationListSerializer(rows, many=True).data,
+            'next_cursor': next_cursor,
+        })
+
+
+class AccommodationSearchView(APIView):
+    """
+    Faceted accommodation search ordered by review score, paginated with a
+    keyset ``cursor`` on ``(review_score, id, feed)`` instead of OFFSET.
+    """
+    permission_classes = [IsOwnerOrReadOnly]
+
+    def get(self, request):
+        params = SearchParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        queryset = search_accommodations(params.validated_data, get_permission_context(request))
+        rows, next_cursor = paginate_keyset(
+            queryset, SEARCH_ORDERING, params.validated_data['limit'], params.validated_data.get('cursor')
+        )
+        data = {
+            'results': AccommodationListSerializer(rows, many=True).data,
+            'next_cursor': next_cursor,
+        }
+        if params.validated_data['facets']:
+            data['facets'] = {'amenities': dict(amenity_facet_counts(queryset))}
+        return Response(data)
+
+
+class LocalizedSearchView(APIView):
+    """
+    Ranked full-text search over localized descriptions of published
+    accommodations, pruned to one language partition when ``language`` is given.
+    """
+    permission_classes = [IsOwnerOrReadOnly]
+
+    def get(self, request):
+        params = LocalizedSearchParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        candidates = (
+            LocalizeAccommodation.objects
+            .filter(accommodation__published=True)
+            .select_related('accommodation')
+            .only('id', 'language', 'description', 'accommodation', 'accommodation__title')
+        )
+        queryset = search_localized(
+            params.validated_data['q'],
+            language=params.validated_data.get('language'),
+            queryset=candidates,
+        )
+        rows = queryset[:params.validated_data['limit']]
+        return Response({'results': LocalizedSearchResultSerializer(rows, many=True).data})
+
+
+class AccommodationDetailView(APIView):
+    """
+    One published accommodation with its location chain, images and the
+    localized row in ``language`` (falling back to English), served from the
+    two-tier detail cache and revalidated with ``If-None-Match``.
+    """
+    permission_classes = [IsOwnerOrReadOnly]
+
+    def get(self, request, pk):
+        params = DetailParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        payload, etag = get_detail(pk, params.validated_data['language'])
+        if payload is None:
+            raise Http404("No such accommodation.")
+
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            candidates = parse_etags(if_none_match)
+            if '*' in candidates or etag in (candidate.removeprefix('W/') for candidate in candidates):
+                response = Response(status=304)
+                response['ETag'] = etag
+                return response
+
+        response = Response(payload)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'public, max-age=0, must-revalidate'
+        return response
+
+
+class AccommodationFacetsView(APIView):
+    """
+    Counts of published accommodations per country, location, bedroom bucket
+    and amenity, served from the per-feed rollups instead of a live aggregate.
+    """
+    permission_classes = [IsOwnerOrReadOnly]
+
+    def get(self, request):
+        params = FacetParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        counts = facet_counts(
+            facets=params.validated_data.get('facets') or FACETS,
+            feeds=params.validated_data.get('feeds'),
+            limit=params.validated_data['limit'],
+        )
+        return Response({'facets': counts})
+
+
+class AccommodationExportView(APIView):
+    """
+    Streams every accommodation visible to the user (published ones unless
+    ``published_only=false``), with its location and localized rows, as CSV,
+    JSONL or GeoJSON, optionally gzipped on the fly.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        params = ExportParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        options = params.validated_data
+
+        queryset = export_queryset(
+            feed=options.get('feed'),
+            country_code=options.get('country_code'),
+            published_only=options['published_only'],
+        )
+        context = get_permission_context(request)
+        queryset = context.visible(context.scope(queryset))
+
+        export_format = options['export_format']
+        filename = f"accommodations.{export_format}"
+        content_type = CONTENT_TYPES[export_format]
+        if options['gzip']:
+            filename += '.gz'
+            content_type = 'application/gzip'
+
+        response = StreamingHttpResponse(
+            encode_stream(iter_export(queryset, export_format), compress=options['gzip']),
+            content_type=content_type,
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+def accommodation_tile(request, z, x, y):
+    """
+    Mapbox Vector Tile of published accommodations, clustered at low zooms
+    and served from the on-disk tile cache.
+    """
+    if not valid_tile(z, x, y):
+        raise Http404("Tile out of range.")
+    response = HttpResponse(get_tile(z, x, y), content_type='application/vnd.mapbox-vector-tile')
+    response['Cache-Control'] = 'public, max-age=60'
+    return response